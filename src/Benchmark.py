@@ -0,0 +1,285 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+
+import argparse
+import json
+import multiprocessing
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+# the five lane freeway of 50 km, long enough for the largest sweeps
+DEFAULT_CONFIG_FILE = "cfg/freeway_test.sumocfg"
+DEFAULT_HISTORY_FILE = "benchmark_history.json"
+DEFAULT_DURATION = 60
+# a case is flagged as regressed when a measurement grows by more than this fraction of its baseline
+DEFAULT_THRESHOLD = 0.1
+
+# the case every sweep varies one parameter of
+DEFAULT_CASE = {"vehicles": 1000, "platoons": 4, "platoon_length": 6, "v2v_share": 0.5}
+SWEEPS = {
+    "vehicles": (100, 1000, 5000, 20000),
+    "platoons": (1, 4, 16),
+    "platoon_length": (2, 6, 16),
+    "v2v_share": (0.0, 0.5, 1.0),
+}
+QUICK_SWEEPS = {
+    "vehicles": (100, 1000),
+    "platoons": (1, 4),
+    "platoon_length": (6,),
+    "v2v_share": (0.0, 1.0),
+}
+
+# the measurements compared against the baseline, all of which are better when lower
+MEASUREMENTS = ("wall_per_simulated_second", "calls_per_step", "python_peak_rss_kb", "sumo_peak_rss_kb")
+
+# room between the platoons and to the background traffic, in meters
+PLATOON_SPACING = 50
+# the length of the space a background vehicle is placed in, in meters
+SLOT_LENGTH = 12
+
+
+def get_cases(sweeps):
+    """
+    Returns the benchmark cases: the default case with one parameter varied at a time, each case once
+
+    :param sweeps: a dictionary from the parameter to the values it is swept over
+    :return: a list of dictionaries of the parameters of each case
+    """
+    cases = list()
+    for parameter, values in sweeps.items():
+        for value in values:
+            case = dict(DEFAULT_CASE, **{parameter: value})
+            if case not in cases:
+                cases.append(case)
+    return cases
+
+
+def get_case_name(case):
+    """
+    Returns the name a case is stored under in the history
+    """
+    return ",".join(f"{parameter}={case[parameter]}" for parameter in DEFAULT_CASE)
+
+
+def add_traffic(simulation, case, seed):
+    """
+    Add the platoons and background vehicles of a case. The platoons start at the beginning of the freeway, one per
+    lane side by side, and the background vehicles are spread over random slots ahead of them
+
+    :param simulation: the Simulation to add to
+    :param case: the parameters of the case
+    :param seed: the seed of the random traffic
+    """
+    rng = random.Random(seed)
+    connection = simulation.connection
+    lanes = connection.edge.getLaneNumber("freeway")
+    length = connection.lane.getLength("freeway_0")
+    platoon_length = case["platoon_length"] * (connection.vehicletype.getLength('PlatoonCar') +
+                                               connection.vehicletype.getMinGap('PlatoonCar'))
+
+    rows = -(-case["platoons"] // lanes)
+    for i in range(case["platoons"]):
+        row = rows - 1 - i // lanes
+        simulation.add_platoon(platoon_length=case["platoon_length"],
+                               platoon_start_position=platoon_length + row * (platoon_length + PLATOON_SPACING),
+                               platoon_start_lane=i % lanes)
+
+    start = rows * (platoon_length + PLATOON_SPACING) + PLATOON_SPACING
+    slots = int((length - start) // SLOT_LENGTH) * lanes
+    if case["vehicles"] > slots:
+        raise ValueError(f"{case['vehicles']} vehicles do not fit onto the freeway")
+    for slot in rng.sample(range(slots), case["vehicles"]):
+        simulation.add_vehicle(vehicle_start_position=start + (slot // lanes) * SLOT_LENGTH,
+                               vehicle_start_lane=slot % lanes, vehicle_start_speed=rng.randint(25, 45),
+                               v2v=rng.random() < case["v2v_share"])
+
+
+def run_case(case, duration, config_file, seed):
+    """
+    Run one case in the calling process and measure it
+
+    :param case: the parameters of the case
+    :param duration: the simulated time in seconds
+    :param config_file: the sumo configuration file
+    :param seed: the seed of the random traffic
+    :return: a dictionary of the measurements
+    """
+    # imported here, so that the history can be compared without the simulation modules
+    from Simulation import Simulation
+    from SimulationContext import SimulationContext
+
+    simulation = Simulation(context=SimulationContext(label="benchmark"), gui=False, config_file=config_file)
+    instrumentation = simulation.instrument()
+    start = time.perf_counter()
+    add_traffic(simulation, case, seed)
+    setup = time.perf_counter()
+    simulation.set_simulation_time_length(duration)
+    simulated_time, _ = simulation.run()
+    end = time.perf_counter()
+    steps = instrumentation.calls_per_step.count
+    return {
+        "setup_seconds": setup - start,
+        "wall_seconds": end - setup,
+        "simulated_seconds": simulated_time,
+        "steps": steps,
+        "wall_per_simulated_second": (end - setup) / simulated_time if simulated_time else None,
+        "calls_per_step": instrumentation.calls_per_step.total / steps if steps else None,
+        # SUMO is a child of this process, which has waited for it once the simulation was closed
+        "python_peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "sumo_peak_rss_kb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    }
+
+
+def serve_case(pipe, case, duration, config_file, seed):
+    """
+    Run one case in a worker process and send its measurements, or the error it failed with, over the pipe
+    """
+    try:
+        pipe.send(run_case(case, duration, config_file, seed))
+    except Exception as e:
+        pipe.send({"error": repr(e)})
+    finally:
+        pipe.close()
+
+
+def run_suite(cases, duration=DEFAULT_DURATION, config_file=DEFAULT_CONFIG_FILE, seed=1):
+    """
+    Run every case in a fresh worker process, so that the peak memory of one case does not hide that of the next
+
+    :param cases: the parameters of each case
+    :param duration: the simulated time of each case in seconds
+    :param config_file: the sumo configuration file
+    :param seed: the seed of the random traffic
+    :return: a dictionary from the case name to its parameters and measurements
+    """
+    results = dict()
+    for case in cases:
+        pipe, worker_pipe = multiprocessing.Pipe()
+        worker = multiprocessing.Process(target=serve_case, args=(worker_pipe, case, duration, config_file, seed))
+        worker.start()
+        result = pipe.recv()
+        worker.join()
+        results[get_case_name(case)] = dict(case, **result)
+        print(get_case_name(case), json.dumps(result), file=sys.stderr)
+    return results
+
+
+def get_revision():
+    """
+    Returns the git commit of the working tree, if it is a git checkout
+    """
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def make_entry(results, duration, seed):
+    """
+    Returns a history entry of the results of a suite, describing where and when it ran
+    """
+    return {
+        "time": datetime.now(timezone.utc).isoformat(),
+        "revision": get_revision(),
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "duration": duration,
+        "seed": seed,
+        "results": results,
+    }
+
+
+def append_history(path, entry):
+    """
+    Append an entry to the JSON history file, creating it if needed
+    """
+    try:
+        with open(path) as f:
+            history = json.load(f)
+    except FileNotFoundError:
+        history = list()
+    history.append(entry)
+    with open(path, "w") as f:
+        json.dump(history, f, indent=2)
+
+
+def compare(entry, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare the measurements of the cases both entries ran
+
+    :param entry: the history entry to check
+    :param baseline: the history entry to compare against
+    :param threshold: the fraction a measurement may grow by before the case is flagged as regressed
+    :return: a dictionary from the case name to the ratio of each measurement to its baseline, and the list of
+    regressions as (case name, measurement, ratio) tuples
+    """
+    ratios = dict()
+    regressions = list()
+    for name, result in entry["results"].items():
+        reference = baseline["results"].get(name)
+        if reference is None:
+            continue
+        for measurement in MEASUREMENTS:
+            value = result.get(measurement)
+            base = reference.get(measurement)
+            if not value or not base:
+                continue
+            ratio = value / base
+            ratios.setdefault(name, dict())[measurement] = ratio
+            if ratio > 1 + threshold:
+                regressions.append((name, measurement, ratio))
+    return ratios, regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the simulation speed, traci calls per step and peak memory "
+                                                 "while sweeping the traffic, and compare them against a baseline")
+    parser.add_argument("--quick", action="store_true", help="sweep fewer and smaller cases")
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION, help="the simulated seconds per case")
+    parser.add_argument("--config", default=DEFAULT_CONFIG_FILE, help="the sumo configuration file")
+    parser.add_argument("--seed", type=int, default=1, help="the seed of the random traffic")
+    parser.add_argument("--history", default=DEFAULT_HISTORY_FILE, help="the JSON history file to append to")
+    parser.add_argument("--baseline", help="a JSON file holding the history entry to compare against")
+    parser.add_argument("--save-baseline", help="write the history entry of this run to this JSON file")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="the fraction a measurement may grow by before it counts as a regression")
+    arguments = parser.parse_args()
+
+    cases = get_cases(QUICK_SWEEPS if arguments.quick else SWEEPS)
+    entry = make_entry(run_suite(cases, arguments.duration, arguments.config, arguments.seed), arguments.duration,
+                       arguments.seed)
+    append_history(arguments.history, entry)
+    if arguments.save_baseline:
+        with open(arguments.save_baseline, "w") as f:
+            json.dump(entry, f, indent=2)
+    if arguments.baseline:
+        with open(arguments.baseline) as f:
+            ratios, regressions = compare(entry, json.load(f), arguments.threshold)
+        print(json.dumps(ratios, indent=2))
+        for name, measurement, ratio in regressions:
+            print(f"regression: {name} {measurement} x{ratio:.2f}")
+        sys.exit(1 if regressions else 0)
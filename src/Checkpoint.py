@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+import json
+import os
+import random
+
+import ccparams as cc
+from Platoon import Platoon
+from PlatoonState import PlatoonState
+from Vehicle import Vehicle
+from VehicleCommand import VehicleCommand
+from utils import FIX_LC, set_cc_parameters, set_par
+
+
+class Checkpoint:
+    """
+    Class which saves a simulation to a directory and restores it into a freshly started simulation of the same
+    configuration, e.g. to run many variants of a scenario from the end of one shared warm-up. The SUMO state is
+    saved with saveState, the platoons, vehicles, vehicle counter and random generator which only exist on the
+    Python side next to it as JSON. Streaming metrics, recorders and traces are not part of a checkpoint, they start
+    over with the restored simulation.
+    """
+    STATE_FILE = "state.xml"
+    CONTEXT_FILE = "checkpoint.json"
+
+    def __init__(self, directory):
+        """
+        :param directory: the directory of the checkpoint
+        """
+        self.directory = directory
+
+    def save(self, simulation):
+        """
+        Save the current step of a simulation. Lane changes which are still in progress are not saved, so save at a
+        quiet moment such as the end of a warm-up
+
+        :param simulation: the Simulation to save
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        context = simulation.context
+        simulation.connection.simulation.saveState(os.path.join(self.directory, self.STATE_FILE))
+
+        version, state, gauss_next = random.getstate()
+        data = {
+            "step": simulation.step,
+            "vehicle_counter": context.vehicle_counter.i,
+            "platoons": [p.to_dict() for p in context.platoon_manager.platoons],
+            "vehicles": [v.to_dict() for v in context.vehicle_manager.vehicles.values()],
+            "random": [version, list(state), gauss_next],
+        }
+        with open(os.path.join(self.directory, self.CONTEXT_FILE), "w") as f:
+            json.dump(data, f)
+
+    def load(self, simulation):
+        """
+        Restore the checkpoint into a simulation to which no platoons or vehicles were added yet
+
+        :param simulation: the freshly started Simulation to restore into
+        """
+        with open(os.path.join(self.directory, self.CONTEXT_FILE)) as f:
+            data = json.load(f)
+
+        context = simulation.context
+        context.reset()
+        simulation.connection.simulation.loadState(os.path.join(self.directory, self.STATE_FILE))
+        simulation.step = data["step"]
+        context.vehicle_counter.i = data["vehicle_counter"]
+
+        for v in data["vehicles"]:
+            vehicle = self.restore_vehicle(context, v)
+            context.vehicle_manager.add_vehicle(vehicle)
+            self.restore_controller(simulation.connection, vehicle.vid, vehicle.min_gap, vehicle.desired_speed,
+                                    cc.ACC)
+
+        for p in data["platoons"]:
+            platoon = self.restore_platoon(context, p)
+            context.platoon_manager.add_platoon(platoon)
+            for vid in platoon.vehicles:
+                self.restore_controller(simulation.connection, vid, platoon.min_gap, platoon.desired_speed,
+                                        platoon.get_active_controller(vid))
+
+        version, state, gauss_next = data["random"]
+        random.setstate((version, tuple(state), gauss_next))
+
+    @staticmethod
+    def restore_vehicle(context, data):
+        """
+        Returns the Vehicle described by the result of Vehicle.to_dict
+
+        :param context: the SimulationContext the vehicle drives in
+        :param data: the dictionary of the vehicle
+        """
+        commands = {int(step): VehicleCommand[command] for step, command in data["commands"].items()}
+        return Vehicle(data["vid"], commands=commands, v2v=data["v2v"], context=context,
+                       desired_speed=data["desired_speed"])
+
+    @staticmethod
+    def restore_platoon(context, data):
+        """
+        Returns the Platoon described by the result of Platoon.to_dict
+
+        :param context: the SimulationContext the platoon drives in
+        :param data: the dictionary of the platoon
+        """
+        platoon = Platoon(vehicles=data["vehicles"], speed=data["desired_speed"], context=context)
+        platoon.leader = data["leader"]
+        platoon.state = PlatoonState[data["state"]]
+        platoon.last_state_change_step = data["last_state_change_step"]
+        platoon.step = data["step"]
+        return platoon
+
+    @staticmethod
+    def restore_controller(connection, vid, cacc_spacing, speed, controller, lane=None):
+        """
+        Apply the settings which SUMO does not save in its state to a restored vehicle: the parameters and active
+        controller of the CC car following model, and the lane change mode which keeps the vehicle in its lane
+
+        :param connection: the traci connection of the simulation
+        :param vid: the traci vehicle id
+        :param cacc_spacing: the spacing of the CACC
+        :param speed: the desired speed of the cruise control
+        :param controller: the active controller
+        :param lane: the lane index to keep the vehicle in, the current lane of the vehicle if None
+        """
+        if lane is None:
+            lane = connection.vehicle.getLaneIndex(vid)
+        connection.vehicle.setLaneChangeMode(vid, FIX_LC)
+        connection.vehicle.changeLane(vid, lane, 1000000.0)
+        set_cc_parameters(vid, cacc_spacing, speed, connection)
+        set_par(vid, cc.PAR_ACTIVE_CONTROLLER, controller, connection)
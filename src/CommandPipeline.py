@@ -0,0 +1,253 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+
+import struct
+from time import perf_counter_ns
+
+import traci
+import traci.constants as tc
+from traci.exceptions import FatalTraCIError, TraCIException
+
+from Instrumentation import InstrumentedConnection
+
+try:
+    from traci.connection import _RESULTS, Connection
+    from traci.domain import _parse
+except ImportError:
+    # a traci version without the internals the pipeline is built on, commands are executed one by one
+    _RESULTS = Connection = _parse = None
+
+# the internals of traci.connection.Connection a pipelined connection needs, as of traci 1.15
+CONNECTION_INTERNALS = ("_pack", "_recvExact", "_socket")
+
+# the names the queued commands are reported to an Instrumentation by
+COMMAND_NAMES = {
+    (tc.CMD_SET_VEHICLE_VARIABLE, tc.VAR_PARAMETER): "vehicle.setParameter",
+    (tc.CMD_GET_VEHICLE_VARIABLE, tc.VAR_PARAMETER): "vehicle.getParameter",
+    (tc.CMD_SET_VEHICLE_VARIABLE, tc.VAR_LANECHANGE_MODE): "vehicle.setLaneChangeMode",
+    (tc.CMD_SET_VEHICLE_VARIABLE, tc.CMD_CHANGELANE): "vehicle.changeLane",
+}
+
+
+def supports_pipelining(connection):
+    """
+    Returns whether the commands for a connection can be sent in a single message, which needs the internals of
+    traci.connection.Connection that the installed traci version may not have
+
+    :param connection: the traci connection to send the commands over
+    """
+    if Connection is None or _parse is None or _RESULTS is None or not isinstance(connection, Connection):
+        return False
+    return (all(hasattr(connection, name) for name in CONNECTION_INTERNALS)
+            and hasattr(connection.vehicle, "_retValFunc"))
+
+
+class PipelinedReply:
+    """
+    Result of a command issued through a CommandPipeline, which becomes available once the pipeline is flushed
+    """
+    __slots__ = ("pipeline", "done", "value", "error")
+
+    def __init__(self, pipeline, value=None):
+        """
+        :param pipeline: the pipeline the command is queued in, or None if the value is already known
+        :param value: the value of a command that was executed right away
+        """
+        self.pipeline = pipeline
+        self.done = pipeline is None
+        self.value = value
+        self.error = None
+
+    def result(self):
+        """
+        Returns the result of the command, flushing the pipeline first if it is still queued
+
+        :raises TraCIException: if sumo rejected the command
+        """
+        if not self.done:
+            self.pipeline.flush()
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class PipelinedVehicle:
+    """
+    Stands in for the vehicle domain of a connection. The commands utils issues are queued in the pipeline, any other
+    method is looked up on the vehicle domain of the connection after flushing the pipeline
+    """
+
+    def __init__(self, pipeline):
+        """
+        :param pipeline: the pipeline to queue commands in
+        """
+        self.pipeline = pipeline
+
+    def setParameter(self, vid, param, value):
+        if self.pipeline.raw is None:
+            self.pipeline.connection.vehicle.setParameter(vid, param, value)
+        else:
+            self.pipeline.queue(tc.CMD_SET_VEHICLE_VARIABLE, tc.VAR_PARAMETER, vid, "tss", 2, param, value)
+
+    def getParameter(self, vid, param):
+        if self.pipeline.raw is None:
+            return PipelinedReply(None, self.pipeline.connection.vehicle.getParameter(vid, param))
+        return self.pipeline.queue(tc.CMD_GET_VEHICLE_VARIABLE, tc.VAR_PARAMETER, vid, "s", param)
+
+    def setLaneChangeMode(self, vid, lcm):
+        if self.pipeline.raw is None:
+            self.pipeline.connection.vehicle.setLaneChangeMode(vid, lcm)
+        else:
+            self.pipeline.queue(tc.CMD_SET_VEHICLE_VARIABLE, tc.VAR_LANECHANGE_MODE, vid, "i", lcm)
+
+    def changeLane(self, vid, lane, duration):
+        if self.pipeline.raw is None:
+            self.pipeline.connection.vehicle.changeLane(vid, lane, duration)
+        else:
+            self.pipeline.queue(tc.CMD_SET_VEHICLE_VARIABLE, tc.CMD_CHANGELANE, vid, "tbd", 2, lane, duration)
+
+    def __getattr__(self, name):
+        self.pipeline.flush()
+        return getattr(self.pipeline.connection.vehicle, name)
+
+
+class CommandPipeline:
+    """
+    Collects the vehicle commands issued during a phase of a simulation step and sends them to sumo in a single TraCI
+    message, so that the phase costs one round trip instead of one per command. It can be passed as the connection
+    of utils.set_par, utils.get_par and utils.change_lane, the latter returning a PipelinedReply instead of the
+    value. Commands are sent when the pipeline is flushed, when the result of a reply is asked for, when any other
+    traci method is looked up through it, or when the with block it is used in ends.
+
+    The traci client offers no public way to send several commands at once, so the message is assembled and parsed
+    with the internals of traci.connection.Connection. If the installed traci lacks any of them, see
+    supports_pipelining, the commands are executed one by one instead. An InstrumentedConnection is pipelined like
+    the connection it wraps: every queued command is reported as a call of its command and every message as a call
+    of CommandPipeline.flush. Connections of other types are not pipelined and every command is executed right away
+    """
+
+    def __init__(self, connection=traci):
+        """
+        :param connection: the traci connection to send the commands over, defaults to the current one
+        """
+        self.connection = connection
+        # the Instrumentation the commands are reported to, if the connection is instrumented
+        self.instrumentation = None
+        if isinstance(connection, InstrumentedConnection):
+            self.instrumentation = connection._instrumentation
+            connection = connection._connection
+        if connection is traci:
+            connection = getattr(traci.main, "_connections", dict()).get("")
+        # the connection whose socket the pipeline writes to, None if the commands are executed one by one
+        self.raw = connection if supports_pipelining(connection) else None
+        self.vehicle = PipelinedVehicle(self)
+        # (command id, variable id, object id, reply) of every queued command, the reply is None for set commands
+        self.commands = []
+        self.message = bytes()
+        # number of messages sent, for measuring
+        self.flushes = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
+
+    def __getattr__(self, name):
+        # any other domain is used directly, after the commands queued so far
+        self.flush()
+        return getattr(self.connection, name)
+
+    def queue(self, command, variable, vid, format="", *values):
+        """
+        Appends a command to the message being assembled, encoded like traci.connection.Connection._sendCmd does
+
+        :param command: the TraCI command id
+        :param variable: the TraCI variable id
+        :param vid: the id of the vehicle the command is for
+        :param format: the traci format string of the values
+        :param values: the values of the command
+        :return: a PipelinedReply for get commands, None for set commands
+        """
+        start = perf_counter_ns()
+        packed = self.raw._pack(format, *values)
+        length = 1 + 1 + 1 + 4 + len(vid) + len(packed)
+        if length <= 255:
+            self.message += struct.pack("!BB", length, command)
+        else:
+            self.message += struct.pack("!BiB", 0, length + 4, command)
+        self.message += struct.pack("!Bi", variable, len(vid)) + vid.encode("latin1") + packed
+        reply = PipelinedReply(self) if command == tc.CMD_GET_VEHICLE_VARIABLE else None
+        self.commands.append((command, variable, vid, reply))
+        if self.instrumentation is not None:
+            self.instrumentation.add_call(COMMAND_NAMES[command, variable], start)
+        return reply
+
+    def flush(self):
+        """
+        Sends all queued commands in one message and resolves the replies of the get commands
+
+        :raises TraCIException: for the first command sumo rejected, after all others have been resolved
+        """
+        if not self.commands:
+            return
+        commands, message = self.commands, self.message
+        self.commands, self.message = [], bytes()
+        raw = self.raw
+        if raw._socket is None:
+            raise FatalTraCIError("Connection already closed.")
+        start = perf_counter_ns()
+        raw._socket.send(struct.pack("!i", len(message) + 4) + message)
+        self.flushes += 1
+        result = raw._recvExact()
+        if self.instrumentation is not None:
+            self.instrumentation.add_call("CommandPipeline.flush", start)
+        if not result:
+            raw._socket.close()
+            raw._socket = None
+            raise FatalTraCIError("connection closed by SUMO")
+
+        # sumo answers every command with a status, followed by the value for get commands that succeeded
+        error = None
+        for command, variable, vid, reply in commands:
+            _, status_command, status = result.read("!BBB")
+            description = result.readString()
+            if status_command != command:
+                raise FatalTraCIError("Received answer %s for command %s." % (status_command, command))
+            if status or description:
+                exception = TraCIException(description, status_command, _RESULTS[status])
+                error = error or exception
+                if reply is not None:
+                    reply.error = exception
+                    reply.done = True
+                continue
+            if reply is not None:
+                result.readLength()
+                response, response_variable = result.read("!BB")
+                response_vid = result.readString()
+                if response - command != 16 or response_variable != variable or response_vid != vid:
+                    raise FatalTraCIError("Received answer %s,%s,%s for command %s,%s,%s."
+                                          % (response, response_variable, response_vid, command, variable, vid))
+                reply.value = _parse(raw.vehicle._retValFunc, variable, result)
+                reply.done = True
+        if error is not None:
+            raise error
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+import json
+
+
+class EventLog:
+    """
+    Class for a levelled log of structured simulation events (state changes, V2V requests, splits, lane changes).
+    Events are kept in an in-memory ring buffer. If a file is attached, the buffer is appended to it as JSON lines
+    whenever it is full, instead of wrapping around.
+    """
+    DEBUG = 10
+    INFO = 20
+    WARNING = 30
+    DISABLED = 100
+
+    LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING"}
+
+    DEFAULT_BUFFER_SIZE = 4096
+
+    def __init__(self, level=INFO, buffer_size=DEFAULT_BUFFER_SIZE):
+        """
+        :param level: events below this level are dropped before anything is formatted
+        :param buffer_size: the number of events kept in memory
+        """
+        self.level = level
+        self.buffer = [None] * buffer_size
+        self.index = 0
+        self.wrapped = False
+        self.file = None
+        # the simulation step which events are logged for
+        self.step = 0
+
+    def open(self, path, level=None):
+        """
+        Append all further events to a JSON lines file
+
+        :param path: the path of the file
+        :param level: if given, change the level of the log
+        """
+        self.close()
+        self.index = 0
+        self.wrapped = False
+        self.file = open(path, "w")
+        if level is not None:
+            self.level = level
+
+    def is_enabled(self, level):
+        """
+        Returns whether events of the given level are logged. Check this before building expensive event fields
+
+        :param level: the level to check
+        """
+        return level >= self.level
+
+    def log(self, level, event, **fields):
+        """
+        Log an event. Fields are stored as they are and only formatted when they are written to the file
+
+        :param level: the level of the event
+        :param event: the name of the event
+        :param fields: the values describing the event
+        """
+        if level < self.level:
+            return
+        self.buffer[self.index] = (self.step, level, event, fields)
+        self.index += 1
+        if self.index == len(self.buffer):
+            if self.file is not None:
+                self.flush()
+            else:
+                self.index = 0
+                self.wrapped = True
+
+    def get_events(self):
+        """
+        Returns the events currently held in the buffer, oldest first, as (step, level, event, fields) tuples
+        """
+        if self.wrapped:
+            return self.buffer[self.index:] + self.buffer[:self.index]
+        return self.buffer[:self.index]
+
+    def flush(self):
+        """
+        Append the buffered events to the file, if one is attached
+        """
+        if self.file is None:
+            return
+        lines = list()
+        for step, level, event, fields in self.buffer[:self.index]:
+            record = {"step": step, "level": self.LEVEL_NAMES.get(level, level), "event": event}
+            record.update(fields)
+            lines.append(json.dumps(record))
+            lines.append("\n")
+        self.file.write("".join(lines))
+        self.index = 0
+
+    def close(self):
+        """
+        Write the remaining events and detach the file
+        """
+        if self.file is None:
+            return
+        self.flush()
+        self.file.close()
+        self.file = None
+
+    def reset(self):
+        """
+        Drop all buffered events
+        """
+        self.index = 0
+        self.wrapped = False
+        self.step = 0
+
+
+event_log = EventLog()
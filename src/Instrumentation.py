@@ -0,0 +1,234 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+import json
+import os
+import sys
+from time import perf_counter_ns
+
+from traci.domain import Domain
+
+# modules whose functions only forward traci calls, so the call site is looked up further up the stack
+FORWARDING_MODULES = {"utils", "Instrumentation", "CommandPipeline", "TraciRecording", "StateEstimator"}
+
+
+class LogHistogram:
+    """
+    Histogram with one bucket per power of two, so that adding a value costs a single integer operation
+    """
+    BUCKETS = 64
+
+    def __init__(self):
+        self.buckets = [0] * self.BUCKETS
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def add(self, value):
+        """
+        Add a non-negative integer value to the histogram
+
+        :param value: the value to add
+        """
+        self.buckets[min(value.bit_length(), self.BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def get_percentile(self, percentile):
+        """
+        Returns an upper bound of the given percentile, i.e. the upper end of the bucket the percentile falls into
+
+        :param percentile: the percentile between 0 and 100
+        """
+        threshold = self.count * percentile / 100
+        seen = 0
+        for i, count in enumerate(self.buckets):
+            seen += count
+            if count > 0 and seen >= threshold:
+                return min((1 << i) - 1, self.max)
+        return self.max
+
+    def to_dict(self):
+        """
+        Returns the histogram as a dictionary
+        """
+        if self.count == 0:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count,
+            "max": self.max,
+            "p50": self.get_percentile(50),
+            "p90": self.get_percentile(90),
+            "p99": self.get_percentile(99),
+            "buckets": {f"<{1 << i}": count for i, count in enumerate(self.buckets) if count > 0},
+        }
+
+
+class Instrumentation:
+    """
+    Class which collects traci call counts by command and call site, traci call latencies and the duration of each
+    phase of a simulation step. It is opt-in: only an instrumented connection and Simulation.run report to it, so it
+    costs nothing while disabled.
+    """
+    PHASE_SIMULATION_STEP = "simulationStep"
+    PHASE_PLATOON_TICK = "platoon tick"
+    PHASE_VEHICLE_TICK = "vehicle tick"
+    PHASE_STEP = "step"
+
+    def __init__(self):
+        # (command, call site) -> count
+        self.calls = dict()
+        # command -> LogHistogram of the call latency in ns
+        self.call_durations = dict()
+        # phase -> LogHistogram of the phase duration in ns
+        self.phases = {phase: LogHistogram() for phase in (self.PHASE_SIMULATION_STEP, self.PHASE_PLATOON_TICK,
+                                                           self.PHASE_VEHICLE_TICK, self.PHASE_STEP)}
+        self.calls_per_step = LogHistogram()
+        self.call_count = 0
+        self.last_step_call_count = 0
+
+    def add_call(self, command, start):
+        """
+        Account for a traci call which has just returned
+
+        :param command: the name of the command, e.g. vehicle.getParameter
+        :param start: the perf_counter_ns() value when the call was issued
+        """
+        duration = perf_counter_ns() - start
+        site = get_call_site(sys._getframe(2))
+        key = (command, site)
+        self.calls[key] = self.calls.get(key, 0) + 1
+        self.call_count += 1
+        histogram = self.call_durations.get(command)
+        if histogram is None:
+            histogram = self.call_durations[command] = LogHistogram()
+        histogram.add(duration)
+
+    def add_step(self, start, simulated, platoons_ticked, end):
+        """
+        Account for the phases of one simulation step, given as perf_counter_ns() values
+
+        :param start: before traci.simulationStep()
+        :param simulated: after traci.simulationStep()
+        :param platoons_ticked: after PlatoonManager.tick()
+        :param end: after VehicleManager.tick()
+        """
+        self.phases[self.PHASE_SIMULATION_STEP].add(simulated - start)
+        self.phases[self.PHASE_PLATOON_TICK].add(platoons_ticked - simulated)
+        self.phases[self.PHASE_VEHICLE_TICK].add(end - platoons_ticked)
+        self.phases[self.PHASE_STEP].add(end - start)
+        self.calls_per_step.add(self.call_count - self.last_step_call_count)
+        self.last_step_call_count = self.call_count
+
+    def to_dict(self):
+        """
+        Returns everything collected so far as a dictionary. Durations are in nanoseconds
+        """
+        calls = dict()
+        for (command, site), count in sorted(self.calls.items(), key=lambda item: -item[1]):
+            calls.setdefault(command, dict())[site] = count
+        return {
+            "phases": {phase: histogram.to_dict() for phase, histogram in self.phases.items()},
+            "calls_per_step": self.calls_per_step.to_dict(),
+            "calls": calls,
+            "call_durations": {command: histogram.to_dict() for command, histogram in self.call_durations.items()},
+        }
+
+    def dump(self, path):
+        """
+        Write everything collected so far to a JSON file
+
+        :param path: the path of the JSON file
+        """
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+def get_call_site(frame):
+    """
+    Returns the name of the function which issued a traci call, skipping helpers which only forward it
+
+    :param frame: the frame which called the instrumented traci function
+    """
+    while frame is not None:
+        code = frame.f_code
+        module = os.path.splitext(os.path.basename(code.co_filename))[0]
+        if module not in FORWARDING_MODULES:
+            return f"{module}.{code.co_name}"
+        frame = frame.f_back
+    return "unknown"
+
+
+def instrument_function(function, command, instrumentation):
+    """
+    Returns a wrapper of the given traci function which reports every call to the instrumentation
+    """
+    def call(*args, **kwargs):
+        start = perf_counter_ns()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            instrumentation.add_call(command, start)
+    return call
+
+
+class InstrumentedDomain:
+    """
+    Proxy of a traci domain (vehicle, edge, ...) which reports every call to an Instrumentation
+    """
+
+    def __init__(self, domain, instrumentation):
+        self._domain = domain
+        self._instrumentation = instrumentation
+
+    def __getattr__(self, name):
+        attribute = getattr(self._domain, name)
+        if not callable(attribute):
+            return attribute
+        call = instrument_function(attribute, f"{self._domain._name}.{name}", self._instrumentation)
+        # cache the wrapper, so that __getattr__ is only hit on the first call of each function
+        setattr(self, name, call)
+        return call
+
+
+class InstrumentedConnection:
+    """
+    Proxy of a traci connection which reports every call to an Instrumentation
+    """
+
+    def __init__(self, connection, instrumentation):
+        self._connection = connection
+        self._instrumentation = instrumentation
+
+    def __getattr__(self, name):
+        attribute = getattr(self._connection, name)
+        if isinstance(attribute, Domain):
+            wrapped = InstrumentedDomain(attribute, self._instrumentation)
+        elif callable(attribute):
+            wrapped = instrument_function(attribute, name, self._instrumentation)
+        else:
+            return attribute
+        setattr(self, name, wrapped)
+        return wrapped
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+
+import traci.constants as tc
+
+# variables subscribed for every lane next to a platoon, delivered together with each simulation step
+SUBSCRIBED_VARIABLES = (tc.LAST_STEP_VEHICLE_NUMBER, tc.LAST_STEP_OCCUPANCY)
+
+
+class LaneMonitor:
+    """
+    Keeps lane subscriptions for the lanes next to the platoons, so that a platoon can tell from the aggregate data of
+    a lane whether it is free or blocked alongside the whole platoon before checking each platoon member for
+    neighbours
+    """
+    # the adjacent lane is empty alongside the whole platoon
+    FREE = "free"
+    # the adjacent lane is too crowded for any platoon member to change into it
+    BLOCKED = "blocked"
+
+    # vehicles on the neighbouring edges within this distance of the ends of an edge, in meters, may still be
+    # neighbours of a platoon member, so the data of the edge alone does not tell whether the lane is free
+    EDGE_MARGIN = 25.0
+
+    def __init__(self, context, blocked_occupancy=None):
+        """
+        :param context: the SimulationContext of the simulation whose lanes are monitored
+        :param blocked_occupancy: the occupancy of a lane, as the fraction of its length covered by vehicles, from
+        which it is taken as blocked without checking each platoon member. None to never take a lane as blocked,
+        which keeps the lane change decisions exactly as without monitoring
+        """
+        self.context = context
+        self.blocked_occupancy = blocked_occupancy
+        # lane id -> length of the lane, for every subscribed lane
+        self.lengths = dict()
+        # edge id -> number of lanes
+        self.lane_counts = dict()
+        self.free = 0
+        self.blocked = 0
+        self.ambiguous = 0
+
+    def get_lane(self, lane_id):
+        """
+        Returns the (vehicle count, occupancy) of a lane during the last simulation step, subscribing to it the first
+        time
+
+        :param lane_id: the traci lane id
+        """
+        lane = self.context.connection.lane
+        if lane_id not in self.lengths:
+            lane.subscribe(lane_id, SUBSCRIBED_VARIABLES)
+            self.lengths[lane_id] = lane.getLength(lane_id)
+        values = lane.getSubscriptionResults(lane_id)
+        return values[tc.LAST_STEP_VEHICLE_NUMBER], values[tc.LAST_STEP_OCCUPANCY]
+
+    def get_lane_count(self, edge_id):
+        """
+        Returns the number of lanes of an edge
+
+        :param edge_id: the traci edge id
+        """
+        if edge_id not in self.lane_counts:
+            self.lane_counts[edge_id] = self.context.connection.edge.getLaneNumber(edge_id)
+        return self.lane_counts[edge_id]
+
+    def get_status(self, platoon, direction):
+        """
+        Returns FREE or BLOCKED if the adjacent lane in the given direction is so alongside the whole platoon, or
+        None if the platoon members have to be checked one by one. That is the case when the lane is neither empty
+        nor crowded, when the platoon is changing lanes, spans two edges or is close to the end of an edge
+
+        :param platoon: the Platoon
+        :param direction: the direction of the adjacent lane
+        """
+        neighbourhood = platoon.neighbourhood
+        first = platoon.vehicles[0]
+        last = platoon.vehicles[-1]
+        edge_id = neighbourhood.getRoadID(first)
+        lane_index = neighbourhood.getLaneIndex(first)
+        target = lane_index + direction
+        if edge_id.startswith(":") or edge_id != neighbourhood.getRoadID(last) \
+                or not 0 <= target < self.get_lane_count(edge_id) \
+                or any(neighbourhood.getLaneIndex(vid) != lane_index for vid in platoon.vehicles[1:]):
+            self.ambiguous += 1
+            return None
+
+        lane_id = "%s_%d" % (edge_id, target)
+        count, occupancy = self.get_lane(lane_id)
+        if count == 0 and neighbourhood.getLanePosition(first) + self.EDGE_MARGIN <= self.lengths[lane_id] \
+                and neighbourhood.getLanePosition(last) - platoon.vehicle_length - self.EDGE_MARGIN >= 0:
+            self.free += 1
+            return self.FREE
+        if self.blocked_occupancy is not None and occupancy >= self.blocked_occupancy:
+            self.blocked += 1
+            return self.BLOCKED
+        self.ambiguous += 1
+        return None
+
+    def reset(self):
+        """
+        Forget the subscribed lanes, e.g. because SUMO is restarted
+        """
+        self.lengths = dict()
+        self.lane_counts = dict()
+        self.free = 0
+        self.blocked = 0
+        self.ambiguous = 0
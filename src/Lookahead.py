@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+import json
+import math
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from Checkpoint import Checkpoint
+from EventLog import EventLog
+from TerminationCondition import TerminationCondition
+
+
+class Horizon(TerminationCondition):
+    """
+    Condition which ends a simulated option after the given time and measures the progress of a platoon just before
+    """
+
+    def __init__(self, seconds, vehicles):
+        """
+        :param seconds: the time to simulate in seconds
+        :param vehicles: the vehicles of the platoon which made the decision
+        """
+        self.seconds = seconds
+        self.vehicles = vehicles
+        self.progress = None
+
+    def start(self, simulation, step_length):
+        self.end_step = simulation.step + self.seconds / step_length
+
+    def is_met(self, simulation):
+        if simulation.step < self.end_step:
+            return False
+        distances = [simulation.connection.vehicle.getDistance(vid) for vid in self.vehicles]
+        self.progress = sum(distances) / len(distances)
+        return True
+
+
+class Lookahead:
+    """
+    Class which decides between the manoeuvres of a blocked platoon by simulating each option for a short horizon,
+    each in a SUMO instance of its own in a worker process, all started from a checkpoint taken at the decision.
+    The option whose platoon vehicles drove the farthest on average made the best progress. Every decision is
+    reported, and the best option is only applied if asked to, otherwise the platoon keeps its fixed priorities.
+
+    Taking the checkpoint in the middle of a step is an approximation: the platoons after the deciding one in the
+    tick order skip that step in the simulated options.
+    """
+    DEFAULT_HORIZON = 5
+
+    def __init__(self, simulation, worker, horizon=DEFAULT_HORIZON, apply=False, max_workers=None):
+        """
+        :param simulation: the Simulation to decide for
+        :param worker: the function simulating an option, see Simulation.simulate_option
+        :param horizon: the time to simulate each option for in seconds
+        :param apply: whether to apply the best option instead of the one with the highest priority
+        :param max_workers: the maximum number of worker processes
+        """
+        self.simulation = simulation
+        self.worker = worker
+        self.horizon = horizon
+        self.apply = apply
+        self.max_workers = max_workers
+        self.executor = None
+        # leader vid -> (step, option) of the last decision, which holds for the horizon
+        self.last_decisions = dict()
+        self.decisions = list()
+
+    def choose(self, platoon, options):
+        """
+        Returns the option the platoon should make
+
+        :param platoon: the Platoon which decides
+        :param options: the options returned by Platoon.get_options, in the order of priority
+        """
+        step = self.simulation.step
+        leader = platoon.vehicles[0]
+        last_decision = self.last_decisions.get(leader)
+        if last_decision is not None:
+            decision_step, option = last_decision
+            if (step - decision_step) * self.simulation.step_length < self.horizon and option in options:
+                return option
+
+        progress, errors = self.simulate(platoon, options)
+        best = max(range(len(options)), key=lambda i: -math.inf if progress[i] is None else progress[i])
+        chosen = best if self.apply else 0
+        self.decisions.append({
+            "step": step,
+            "leader": leader,
+            "options": [{"manoeuvre": manoeuvre.name, "direction": direction,
+                         "argument": sorted(argument) if isinstance(argument, set) else argument,
+                         "progress": progress[i], "error": errors[i]}
+                        for i, (manoeuvre, direction, argument) in enumerate(options)],
+            "best": best,
+            "chosen": chosen,
+        })
+        self.last_decisions[leader] = (step, options[chosen])
+        return options[chosen]
+
+    def simulate(self, platoon, options):
+        """
+        Returns the progress of the platoon for each option, or None for an option whose simulation failed, and
+        the error of each option whose simulation failed, or None. Failures are logged as warnings
+
+        :param platoon: the Platoon which decides
+        :param options: the options to simulate
+        """
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        directory = tempfile.mkdtemp(prefix="lookahead.")
+        try:
+            Checkpoint(directory).save(self.simulation)
+            futures = [self.executor.submit(self.worker, self.simulation.config_file, directory, platoon.vehicles[0],
+                                            option, self.horizon)
+                       for option in options]
+            progress = list()
+            errors = list()
+            for (manoeuvre, direction, _), future in zip(options, futures):
+                try:
+                    progress.append(future.result())
+                    errors.append(None)
+                except Exception as e:
+                    progress.append(None)
+                    errors.append(f"{type(e).__name__}: {e}")
+                    self.simulation.context.event_log.log(EventLog.WARNING, "lookahead_option_failed",
+                                                          leader=platoon.vehicles[0], manoeuvre=manoeuvre.name,
+                                                          direction=direction, error=errors[-1])
+            return progress, errors
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def dump(self, path):
+        """
+        Write the reported decisions to a JSON file
+
+        :param path: the path of the file
+        """
+        with open(path, "w") as f:
+            json.dump({"horizon": self.horizon, "apply": self.apply, "decisions": self.decisions}, f, indent=1)
+
+    def close(self):
+        """
+        Stop the worker processes
+        """
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
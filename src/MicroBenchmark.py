@@ -0,0 +1,322 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+
+import argparse
+import atexit
+import json
+import math
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+import ccparams as cc
+import SumoOutput
+from Direction import Direction
+from Platoon import Platoon
+from SimulationContext import SimulationContext
+from V2VSnapshot import V2VSnapshot
+
+DEFAULT_SIZES = (4, 16, 64, 256)
+# the time each measurement is repeated for, split into DEFAULT_REPEAT rounds of which the fastest counts
+DEFAULT_MIN_TIME = 0.2
+DEFAULT_REPEAT = 5
+
+# the platoon members drive on the middle of three lanes, with one neighbour on each side of every member
+LANES = 3
+PLATOON_LANE = 1
+LANE_WIDTH = 3.2
+VEHICLE_LENGTH = 4.0
+MIN_GAP = 5.0
+# the distances of the neighbours to the platoon members: alongside, within the length of a vehicle, or out of reach
+ALONGSIDE = 1.0
+OUT_OF_REACH = 20.0
+
+
+class SyntheticConnection:
+    """
+    Stand-in for a traci connection answering the queries of the decision logic from synthetic data: a platoon of
+    (size) members on the middle lane and one neighbour on each side of every member, at a fixed distance. Every
+    neighbour is V2V enabled, see get_v2v_snapshot()
+    """
+
+    def __init__(self, size, distance):
+        """
+        :param size: the number of platoon members
+        :param distance: the distance of the neighbours to the platoon members, in meters
+        """
+        self.vehicle = self
+        self.vehicletype = self
+        self.edge = self
+        self.members = [f"platoon.{i}" for i in range(size)]
+        self.lanes = dict()
+        self.states = dict()
+        self.neighbours = {Direction.LEFT: dict(), Direction.RIGHT: dict()}
+        for i, vid in enumerate(self.members):
+            position = 10000.0 - i * (VEHICLE_LENGTH + MIN_GAP)
+            self.add(vid, PLATOON_LANE, position)
+            for direction in (Direction.LEFT, Direction.RIGHT):
+                neighbour = f"v.{2 * i + (direction == Direction.RIGHT)}"
+                self.add(neighbour, PLATOON_LANE + direction, position)
+                self.neighbours[direction][vid] = ((neighbour, distance),)
+
+    def add(self, vid, lane, position):
+        self.lanes[vid] = lane
+        self.states[vid] = cc.pack(30.0, 0.0, 0.0, position, lane * LANE_WIDTH, 0.0, 0, 0, 0)
+
+    def get_v2v_snapshot(self):
+        """
+        Returns the V2VSnapshot of all neighbours
+        """
+        ids = [vid for vid in self.states if not vid.startswith("platoon.")]
+        return V2VSnapshot(ids, [cc.unpack(self.states[vid])[:6] for vid in ids])
+
+    def getRoadID(self, vid):
+        return "freeway"
+
+    def getLaneIndex(self, vid):
+        return self.lanes[vid]
+
+    def getLaneNumber(self, edge_id):
+        return LANES
+
+    def getParameter(self, vid, key):
+        return self.states[vid]
+
+    def getLength(self, type_id):
+        return VEHICLE_LENGTH
+
+    def getMinGap(self, type_id):
+        return MIN_GAP
+
+    def getLeftLeaders(self, vid):
+        return self.neighbours[Direction.LEFT][vid]
+
+    def getLeftFollowers(self, vid):
+        return ()
+
+    def getRightLeaders(self, vid):
+        return self.neighbours[Direction.RIGHT][vid]
+
+    def getRightFollowers(self, vid):
+        return ()
+
+
+def make_platoon(size, distance):
+    """
+    Returns a platoon of (size) members driving in a SyntheticConnection, and that connection
+    """
+    connection = SyntheticConnection(size, distance)
+    context = SimulationContext(label="micro")
+    context.connection = connection
+    return Platoon(vehicles=list(connection.members), speed=30.0, context=context), connection
+
+
+def bench_pack(size):
+    values = [1.5 * i for i in range(size)]
+    return lambda: cc.pack(*values), None
+
+
+def bench_unpack(size):
+    packed = cc.pack(*[1.5 * i for i in range(size)])
+    return lambda: cc.unpack(packed), None
+
+
+def bench_is_target_vehicle_gps_match(size):
+    # the snapshot holds two neighbours per platoon member, the target is the last of them
+    platoon, connection = make_platoon(size // 2 or 1, ALONGSIDE)
+    snapshot = connection.get_v2v_snapshot()
+    target = snapshot.ids[-1]
+    return lambda: platoon.is_target_vehicle_gps_match(target, snapshot), None
+
+
+def bench_are_target_vehicles_gps_match(size):
+    platoon, connection = make_platoon(size // 2 or 1, ALONGSIDE)
+    snapshot = connection.get_v2v_snapshot()
+    targets = list(snapshot.ids)
+    return lambda: platoon.are_target_vehicles_gps_match(targets, snapshot), None
+
+
+def bench_get_v2v_vehicles_up_to_index(size):
+    # every member has a V2V neighbour alongside, so the whole platoon is checked
+    platoon, connection = make_platoon(size, ALONGSIDE)
+    snapshot = connection.get_v2v_snapshot()
+    return lambda: platoon.get_v2v_vehicles_up_to_index(Direction.LEFT, snapshot), None
+
+
+def bench_get_lane_change_split_index(size):
+    # the neighbours are out of reach, so every member is checked
+    platoon, _ = make_platoon(size, OUT_OF_REACH)
+    return lambda: platoon.get_lane_change_split_index(Direction.LEFT), None
+
+
+def bench_split(size):
+    platoon, connection = make_platoon(size, OUT_OF_REACH)
+
+    def setup():
+        # split shortens the platoon, so every split starts from the whole platoon
+        platoon.vehicles = list(connection.members)
+    return lambda: platoon.split(size // 2), setup
+
+
+def write_fcd(path, size, vehicles=100):
+    """
+    Write an FCD output of (size) records, (vehicles) per time step, like SUMO writes it
+
+    :param path: the path of the file
+    :param size: the number of vehicle records
+    :param vehicles: the number of vehicles per time step
+    """
+    with open(path, "w") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<fcd-export>\n')
+        for step in range(math.ceil(size / vehicles)):
+            f.write(f'    <timestep time="{step / 100:.2f}">\n')
+            for i in range(min(vehicles, size - step * vehicles)):
+                position = 100.0 + step * 0.3 + i * 9.0
+                f.write(f'        <vehicle id="v.{i}" x="{position:.2f}" y="{i % 5 * 3.2:.2f}" angle="90.00" '
+                        f'type="V2V_Car" speed="30.00" pos="{position:.2f}" lane="freeway_{i % 5}" slope="0.00"/>\n')
+            f.write('    </timestep>\n')
+        f.write('</fcd-export>\n')
+
+
+def bench_sumo_output_load(size):
+    # the size is the number of records, the columns of which take 48 bytes per record
+    directory = tempfile.mkdtemp()
+    atexit.register(shutil.rmtree, directory, True)
+    path = os.path.join(directory, "fcd.xml")
+    write_fcd(path, size)
+    return lambda: SumoOutput.load(path, SumoOutput.FCD), None
+
+
+ROUTINES = {
+    "ccparams.pack": bench_pack,
+    "ccparams.unpack": bench_unpack,
+    "Platoon.is_target_vehicle_gps_match": bench_is_target_vehicle_gps_match,
+    "Platoon.are_target_vehicles_gps_match": bench_are_target_vehicles_gps_match,
+    "Platoon.get_v2v_vehicles_up_to_index": bench_get_v2v_vehicles_up_to_index,
+    "Platoon.get_lane_change_split_index": bench_get_lane_change_split_index,
+    "Platoon.split": bench_split,
+    "SumoOutput.load": bench_sumo_output_load,
+}
+
+
+def time_operation(operation, setup, number):
+    """
+    Returns the time in ns (number) calls of the operation take, without the time of the setup before each call
+    """
+    if setup is None:
+        start = time.perf_counter_ns()
+        for _ in range(number):
+            operation()
+        return time.perf_counter_ns() - start
+    total = 0
+    for _ in range(number):
+        setup()
+        start = time.perf_counter_ns()
+        operation()
+        total += time.perf_counter_ns() - start
+    return total
+
+
+def measure(operation, setup=None, min_time=DEFAULT_MIN_TIME, repeat=DEFAULT_REPEAT):
+    """
+    Measure an operation
+
+    :param operation: the function to measure
+    :param setup: a function to call before each call of the operation, outside of the measurement, or None
+    :param min_time: the time in seconds the measurement takes at least
+    :param repeat: the number of rounds min_time is split into, the fastest of which counts
+    :return: a dictionary of the time in ns per call and the bytes allocated by one call: the peak of the memory
+    allocated during the call and the memory still allocated after it
+    """
+    # run the operation until a round takes long enough
+    number = 1
+    while True:
+        elapsed = time_operation(operation, setup, number)
+        if elapsed >= min_time / repeat * 1e9:
+            break
+        number *= 2 if elapsed == 0 else max(2, min(10, int(min_time / repeat * 1e9 / elapsed) + 1))
+    best = min([elapsed] + [time_operation(operation, setup, number) for _ in range(repeat - 1)])
+
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before, _ = tracemalloc.get_traced_memory()
+    operation()
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"ns_per_op": best / number, "peak_bytes": peak - before, "retained_bytes": after - before}
+
+
+def get_scaling(results):
+    """
+    Returns the exponent k of the time per call growing like size ** k between the smallest and the largest size
+
+    :param results: a dictionary from the input size to the measurement of that size
+    """
+    sizes = sorted(results)
+    if len(sizes) < 2 or results[sizes[0]]["ns_per_op"] <= 0:
+        return None
+    return math.log(results[sizes[-1]]["ns_per_op"] / results[sizes[0]]["ns_per_op"]) / math.log(sizes[-1] / sizes[0])
+
+
+def run(routines=None, sizes=DEFAULT_SIZES, min_time=DEFAULT_MIN_TIME, repeat=DEFAULT_REPEAT):
+    """
+    Measure the routines for each input size
+
+    :param routines: the names of the routines to measure, see ROUTINES, all if None
+    :param sizes: the input sizes: the number of packed values, V2V vehicles or platoon members
+    :param min_time: the time in seconds each measurement takes at least
+    :param repeat: the number of rounds each measurement is split into
+    :return: a dictionary from the routine to its measurement of each size and the scaling exponent
+    """
+    report = dict()
+    for name in routines or ROUTINES:
+        results = {size: measure(*ROUTINES[name](size), min_time=min_time, repeat=repeat) for size in sizes}
+        report[name] = {"sizes": results, "scaling": get_scaling(results)}
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the decision logic hot functions on synthetic data")
+    parser.add_argument("routines", nargs="*", help=f"the routines to measure, all by default: {', '.join(ROUTINES)}")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="the input sizes")
+    parser.add_argument("--min-time", type=float, default=DEFAULT_MIN_TIME,
+                        help="the seconds each measurement takes at least")
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    arguments = parser.parse_args()
+    unknown = set(arguments.routines) - set(ROUTINES)
+    if unknown:
+        parser.error(f"unknown routines: {', '.join(sorted(unknown))}")
+
+    report = run(arguments.routines, arguments.sizes, arguments.min_time)
+    for name, result in report.items():
+        scaling = result["scaling"]
+        print(f"{name}" + ("" if scaling is None else f"  ~ n^{scaling:.2f}"))
+        for size, measurement in result["sizes"].items():
+            print(f"  {size:>6}  {measurement['ns_per_op']:>12.0f} ns/op  {measurement['peak_bytes']:>9} B peak  "
+                  f"{measurement['retained_bytes']:>9} B retained")
+    if arguments.output:
+        with open(arguments.output, "w") as f:
+            json.dump(report, f, indent=2)
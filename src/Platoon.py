@@ -19,29 +19,19 @@
 # along with this program.  If not, see http://www.gnu.org/licenses/.
 #
 
-import math
-from enum import Enum, auto
-
-import traci
-
 import ccparams as cc
+from CommandPipeline import CommandPipeline
 from Direction import Direction
-from PlatoonManager import platoon_manager
-from V2V import v2v
-from Vehicle import vehicle_counter, is_platoon_vehicle
-from utils import add_vehicle, set_par, change_lane, get_distance, get_par
-
-
-class PlatoonState(Enum):
-    """
-    Class for Platoon state
-    """
-    STATE_CRUISING = auto()
-    STATE_OVERTAKING_RIGHT = auto()
-    STATE_OVERTAKING_LEFT = auto()
-    STATE_REQUEST_LEADER_LANE_CHANGE = auto()
-    STATE_REQUEST_LEFT_VEHICLES_LANE_CHANGE = auto()
-    STATE_REQUEST_RIGHT_VEHICLES_LANE_CHANGE = auto()
+from EventLog import EventLog
+from LaneMonitor import LaneMonitor
+from Manoeuvre import Manoeuvre
+from PlatoonState import PlatoonState
+from SimulationContext import default_context
+from StreamingMetrics import PlatoonMetrics
+from Surroundings import Surroundings
+from TraceExporter import NULL_SPAN, TraceExporter
+from Vehicle import is_platoon_vehicle
+from utils import add_vehicle, set_par, change_lane, communicate
 
 
 class Platoon():
@@ -53,6 +43,63 @@ class Platoon():
     M = 3
     # cruising speed
     SPEED = 130 / 3.6
+    # maximum number of steps between re-evaluations of the lane change decisions while nothing around the platoon
+    # changes
+    DEBOUNCE_STEPS = 10
+    # the lane change decisions are re-evaluated whenever the gap to the vehicle ahead changed by this much, in meters
+    GAP_RESOLUTION = 0.5
+    # number of steps to wait after a state change before a requested lane change or split is made
+    STATE_CHANGE_DELAY = 100
+
+    @property
+    def connection(self):
+        """
+        The traci connection of the simulation this platoon drives in
+        """
+        return self.context.connection
+
+    @property
+    def neighbourhood(self):
+        """
+        Answers the radar and neighbour queries of the platoon: the vehicle domain of traci, or the Surroundings of
+        the platoon if the simulation subscribes to the surroundings of platoons
+        """
+        if self.context.radar_distance is None:
+            return self.connection.vehicle
+        if self.surroundings is None:
+            self.surroundings = Surroundings(self, self.context.radar_distance)
+            self.surroundings.update()
+        return self.surroundings
+
+    def trace(self, name, category=TraceExporter.CATEGORY_DECISION, **args):
+        """
+        Returns a context manager which traces the time spent inside of it on the track of this platoon, if the
+        simulation is traced
+
+        :param name: the name of the span
+        :param category: the category of the span
+        :param args: additional values to show with the span
+        """
+        if self.context.tracer is None:
+            return NULL_SPAN
+        return self.context.tracer.span(name, category, f"platoon {self.vehicles[0]}", **args)
+
+    def trace_instant(self, name, **args):
+        """
+        Trace an event without duration on the track of this platoon, if the simulation is traced
+
+        :param name: the name of the event
+        :param args: additional values to show with the event
+        """
+        if self.context.tracer is not None:
+            self.context.tracer.instant(name, TraceExporter.CATEGORY_PLATOON, f"platoon {self.vehicles[0]}", **args)
+
+    def to_dict(self):
+        """
+        Returns the state of this platoon which is not kept by SUMO, as a dictionary
+        """
+        return {"vehicles": self.vehicles, "leader": self.leader, "desired_speed": self.desired_speed,
+                "state": self.state.name, "last_state_change_step": self.last_state_change_step, "step": self.step}
 
     def get_length(self):
         """
@@ -66,17 +113,24 @@ class Platoon():
 
         :param direction: the direction to change lanes
         """
-        lane = self.get_lane()
-        destination_lane = lane + direction
+        with self.trace("Platoon.change_lane", direction=direction):
+            lane = self.get_lane()
+            destination_lane = lane + direction
 
-        for vid in self.vehicles:
-            change_lane(vid, destination_lane)
+            with CommandPipeline(self.connection) as pipeline:
+                for vid in self.vehicles:
+                    change_lane(vid, destination_lane, pipeline)
+        # the lane change completes with the next simulation step
+        self.evaluate_at(self.step + 1)
+        self.metrics.lane_changes += 1
+        self.context.event_log.log(EventLog.INFO, "platoon_lane_change", leader=self.vehicles[0],
+                                   lane=destination_lane)
 
     def get_lane(self):
         """
         Return the current lane index that the platoon is driving in
         """
-        return traci.vehicle.getLaneIndex(self.vehicles[0])
+        return self.neighbourhood.getLaneIndex(self.vehicles[0])
 
     def set_desired_speed(self, speed):
         """
@@ -85,8 +139,8 @@ class Platoon():
         :param speed: the desired speed to set
         """
         self.desired_speed = speed
-        set_par(self.vehicles[0], cc.PAR_CC_DESIRED_SPEED, speed)
-        set_par(self.vehicles[0], cc.PAR_ACTIVE_CONTROLLER, cc.ACC)
+        set_par(self.vehicles[0], cc.PAR_CC_DESIRED_SPEED, speed, self.connection)
+        set_par(self.vehicles[0], cc.PAR_ACTIVE_CONTROLLER, cc.ACC, self.connection)
 
     def get_leader(self, radar_front_distance=160):
         """
@@ -94,7 +148,7 @@ class Platoon():
 
         :param radar_front_distance: the front radar distance of the platoon
         """
-        vehicle = traci.vehicle.getLeader(self.vehicles[0], radar_front_distance)
+        vehicle = self.neighbourhood.getLeader(self.vehicles[0], radar_front_distance)
         if vehicle is not None:
             # simulate real radar distance
             if vehicle[1] <= radar_front_distance:
@@ -111,37 +165,53 @@ class Platoon():
         if leader is None:
             self.set_desired_speed(self.desired_speed)
         else:
-            set_par(self.vehicles[0], cc.PAR_ACTIVE_CONTROLLER, cc.FAKED_CACC)
+            set_par(self.vehicles[0], cc.PAR_ACTIVE_CONTROLLER, cc.FAKED_CACC, self.connection)
 
-    def communicate(self):
+    def get_active_controller(self, vid):
         """
-        Update inter vehicular data for cooperative adaptive cruise control settings for making platooning possible
+        Returns the controller which drives the given platoon member
+
+        :param vid: the traci vehicle id of the platoon member
+        """
+        if vid != self.vehicles[0]:
+            return cc.CACC
+        if self.leader is None:
+            return cc.ACC
+        return cc.FAKED_CACC
+
+    def get_topology(self):
         """
+        Returns a dictionary pointing each platoon member whose CACC is fed with data to its platoon leader and front
+        vehicle, in the form utils.communicate expects. The platoon leader is fed the data of the vehicle it follows,
+        if any
+        """
+        topology = dict()
         for i, vid in enumerate(self.vehicles):
             if i == 0:
-                if self.leader is None:
-                    continue
-                leader = self.leader
-                front = self.leader
+                if self.leader is not None:
+                    topology[vid] = {"leader": self.leader, "front": self.leader}
             else:
-                leader = self.vehicles[0]
-                front = self.vehicles[i - 1]
-
-            # get data about platoon leader
-            leader_data = get_par(leader, cc.PAR_SPEED_AND_ACCELERATION)
-            (l_v, l_a, l_u, l_x, l_y, l_t, _, _, _) = cc.unpack(leader_data)
-            leader_data = cc.pack(l_v, l_u, l_x, l_y, l_t)
-            # get data about front vehicle
-            front_data = get_par(front, cc.PAR_SPEED_AND_ACCELERATION)
-            (f_v, f_a, f_u, f_x, f_y, f_t, _, _, _) = cc.unpack(front_data)
-            front_data = cc.pack(f_v, f_u, f_x, f_y, f_t)
-            # pass leader and front vehicle data to CACC
-            set_par(vid, cc.PAR_LEADER_SPEED_AND_ACCELERATION, leader_data)
-            set_par(vid, cc.PAR_PRECEDING_SPEED_AND_ACCELERATION, front_data)
-            # compute GPS distance and pass it to the fake CACC
-            f_d = get_distance(vid, front)
-            set_par(vid, cc.PAR_LEADER_FAKE_DATA, cc.pack(l_v, l_u))
-            set_par(vid, cc.PAR_FRONT_FAKE_DATA, cc.pack(f_v, f_u, f_d))
+                topology[vid] = {"leader": self.vehicles[0], "front": self.vehicles[i - 1]}
+        return topology
+
+    def communicate(self):
+        """
+        Update inter vehicular data for cooperative adaptive cruise control settings for making platooning possible
+        """
+        self.set_communicated(communicate(self.get_topology(), self.connection, self.context.estimator))
+
+    def set_communicated(self, data):
+        """
+        Take note of the data which was passed to the CACC of the platoon members this step
+
+        :param data: the result of utils.communicate for a topology containing the one of this platoon
+        """
+        self.speed = None
+        for vid in self.vehicles[1:]:
+            l_v, f_d = data[vid]
+            self.speed = l_v
+            self.metrics.gap.add(f_d)
+        self.communicated_step = self.step
 
     def set_state(self, state):
         """
@@ -149,25 +219,113 @@ class Platoon():
 
         :param state: the new state to be changed to
         """
+        if state != self.state:
+            self.metrics.add_state_transition(self.state, state)
+            self.trace_instant("Platoon.set_state", previous=self.state.name, next=state.name)
+            self.context.event_log.log(EventLog.INFO, "platoon_state_change", leader=self.vehicles[0],
+                                       previous=self.state.name, next=state.name)
         self.last_state_change_step = self.step
         self.state = state
 
+    def get_neighbours(self):
+        """
+        Returns the outermost vehicles in the adjacent lanes which drive alongside the platoon: the followers of the
+        platoon leader and the leaders of the last platoon vehicle which are within the length of the platoon
+        """
+        window = self.get_total_length() + self.vehicle_length
+        first = self.vehicles[0]
+        last = self.vehicles[-1]
+        neighbours = (self.neighbourhood.getLeftFollowers(first), self.neighbourhood.getRightFollowers(first),
+                      self.neighbourhood.getLeftLeaders(last), self.neighbourhood.getRightLeaders(last))
+        return tuple(tuple(vid for vid, dist in vehicles if dist <= window) for vehicles in neighbours)
+
+    def get_inputs(self, leader):
+        """
+        Returns the inputs of the lane change decisions which are compared from step to step, see should_evaluate().
+        They are taken from what the platoon knows already: the vehicle ahead and the gap to it, the state and the
+        length of the platoon. The vehicles alongside are only part of them if the platoon subscribes to its
+        surroundings, since they are looked up at most once per step and would cost four traci queries otherwise
+
+        :param leader: the vehicle id of the vehicle driving in front of the platoon
+        """
+        if self.context.radar_distance is not None and self.neighbours_step != self.step:
+            self.neighbours = self.get_neighbours()
+            self.neighbours_step = self.step
+        gap = None if self.leader_distance is None else int(self.leader_distance // self.GAP_RESOLUTION)
+        return leader, gap, self.state, len(self.vehicles), self.neighbours
+
+    def should_evaluate(self, leader):
+        """
+        Returns whether the lane change decisions have to be evaluated this step. They are only evaluated again when
+        the vehicle ahead of the platoon or the gap to it changed, the state or the length of the platoon changed, a
+        lane change of the platoon completed, or the debounce timer expired. Vehicles entering or leaving the adjacent
+        lanes are noticed right away only if the platoon subscribes to its surroundings, and after the debounce timer
+        otherwise
+
+        :param leader: the vehicle id of the vehicle driving in front of the platoon
+        """
+        if self.evaluation_step == self.step:
+            return True
+        inputs = self.get_inputs(leader)
+        if self.step < self.next_evaluation_step and inputs == self.inputs:
+            return False
+        if not self.context.platoon_manager.acquire_evaluation(self):
+            # over the budget of this step, so try again next step
+            return False
+        self.inputs = inputs
+        self.evaluation_step = self.step
+        self.next_evaluation_step = self.step + self.DEBOUNCE_STEPS
+        return True
+
+    def get_urgency(self):
+        """
+        Returns the number of steps until the platoon reaches the minimum gap to the vehicle ahead of it at the
+        current closing speed, or None if it does not approach a vehicle
+        """
+        if self.leader_distance is None:
+            return None
+        if self.leader_distance < self.min_gap:
+            return 0
+        if self.closing_speed <= 0:
+            return None
+        return (self.leader_distance - self.min_gap) / self.closing_speed
+
+    def evaluate_at(self, step):
+        """
+        Make sure that the lane change decisions are evaluated at the given step, even if nothing changes until then
+
+        :param step: the step at which to evaluate the decisions
+        """
+        self.next_evaluation_step = min(self.next_evaluation_step, step)
+
     def tick(self):
         """
         Run these commands every simulation step
         """
-        # update cacc values
-        self.communicate()
+        # update cacc values, unless the PlatoonManager did for the whole fleet already
+        if self.communicated_step != self.step:
+            with self.trace("Platoon.communicate"):
+                self.communicate()
+
+        # move the subscription to the surroundings along with the platoon leader and length
+        if self.surroundings is not None:
+            self.surroundings.update()
 
         # check for leader vehicles
         leader, distance = self.get_leader()
+        if leader is not None and leader == self.leader and self.leader_distance is not None:
+            self.closing_speed = self.leader_distance - distance
+        else:
+            self.closing_speed = 0
+        self.leader_distance = distance
 
         if leader is None:
             self.set_leader(None)
             if self.state == PlatoonState.STATE_REQUEST_LEADER_LANE_CHANGE:
                 self.set_state(PlatoonState.STATE_CRUISING)
 
-        if self.state == PlatoonState.STATE_OVERTAKING_LEFT or self.state == PlatoonState.STATE_OVERTAKING_RIGHT:
+        if (self.state == PlatoonState.STATE_OVERTAKING_LEFT or self.state == PlatoonState.STATE_OVERTAKING_RIGHT) \
+                and self.should_evaluate(leader):
             # keep checking left lane for chance to change back
             index_right = self.get_lane_change_split_index(Direction.RIGHT)
             index_left = self.get_lane_change_split_index(Direction.LEFT)
@@ -193,13 +351,14 @@ class Platoon():
             self.set_leader(leader)
 
             # if we have approached the leading vehicle
-            if distance < self.min_gap and self.get_speed() < self.desired_speed:
+            if distance < self.min_gap and self.get_speed() < self.desired_speed and self.should_evaluate(leader):
 
                 # we cannot lane change, so check front vehicle has v2v
-                v2v_response = v2v.request_coordinates()
+                with self.trace("V2V.request_coordinates"):
+                    v2v_response = self.context.v2v.request_coordinates()
                 if self.is_target_vehicle_gps_match(leader, v2v_response):
                     # leader is v2v enabled. so send request to change lanes.
-                    v2v.request_lane_change_maneuver(self.vehicles[0], leader)
+                    self.context.v2v.request_lane_change_maneuver(self.vehicles[0], leader)
                     self.set_state(PlatoonState.STATE_REQUEST_LEADER_LANE_CHANGE)
                 else:
                     # check lane change availability
@@ -210,10 +369,11 @@ class Platoon():
                     # right_lane_vehicles = self.get_right_lane_vehicles()
 
                     # check lane change availability
-                    right_lane_vehicles_index, right_lane_vehicles = self.get_v2v_vehicles_up_to_index(Direction.RIGHT,
-                                                                                                       v2v_response)
-                    left_lane_vehicles_index, left_lane_vehicles = self.get_v2v_vehicles_up_to_index(Direction.LEFT,
-                                                                                                     v2v_response)
+                    with self.trace("Platoon.get_v2v_vehicles_up_to_index"):
+                        right_lane_vehicles_index, right_lane_vehicles = \
+                            self.get_v2v_vehicles_up_to_index(Direction.RIGHT, v2v_response)
+                        left_lane_vehicles_index, left_lane_vehicles = \
+                            self.get_v2v_vehicles_up_to_index(Direction.LEFT, v2v_response)
 
                     if self.state == PlatoonState.STATE_REQUEST_RIGHT_VEHICLES_LANE_CHANGE or \
                             self.state == PlatoonState.STATE_REQUEST_LEFT_VEHICLES_LANE_CHANGE:
@@ -234,81 +394,121 @@ class Platoon():
 
                         if self.get_length() == index:
                             # clear to change lanes
-                            if self.step - self.last_state_change_step > 100:
+                            if self.step - self.last_state_change_step > self.STATE_CHANGE_DELAY:
                                 self.change_lane(direction)
                                 self.set_state(next_state)
+                            else:
+                                self.evaluate_at(self.last_state_change_step + self.STATE_CHANGE_DELAY + 1)
                         elif index >= self.M:
                             # clear to change lanes
-                            if self.step - self.last_state_change_step > 100:
+                            if self.step - self.last_state_change_step > self.STATE_CHANGE_DELAY:
                                 # front platoon after split meets M requirement, so split
                                 rear_platoon = self.split(index)
-                                platoon_manager.add_platoon(rear_platoon)
+                                self.context.platoon_manager.add_platoon(rear_platoon)
 
                                 self.change_lane(direction)
                                 self.set_state(next_state)
+                            else:
+                                self.evaluate_at(self.last_state_change_step + self.STATE_CHANGE_DELAY + 1)
                         elif vehicle_index >= self.M and len(vehicles) > 0:
                             # need to request more vehicles to change lanes
                             for vid in vehicles:
-                                v2v.request_lane_change_maneuver(self.vehicles[0], vid)
+                                self.context.v2v.request_lane_change_maneuver(self.vehicles[0], vid)
                             self.set_state(request_vehicle_move_state)
                         else:
                             self.set_state(PlatoonState.STATE_CRUISING)
                     elif self.state == PlatoonState.STATE_CRUISING:
-                        # if we can change lanes, just change lanes
-                        if self.get_length() == index_right:
-                            # clear to change lanes
-                            self.change_lane(Direction.RIGHT)
-                            self.set_state(PlatoonState.STATE_OVERTAKING_RIGHT)
-                        elif self.get_length() == index_left:
-                            # clear to change lanes
-                            self.change_lane(Direction.LEFT)
-                            self.set_state(PlatoonState.STATE_OVERTAKING_LEFT)
-                        # check if we can signal other cars to move
-                        elif left_lane_vehicles_index >= self.M and len(left_lane_vehicles) > 0:
-                            just_ids = list(t[0] for t in v2v_response)
-                            for vid in left_lane_vehicles:
-                                v2v.request_lane_change_maneuver(self.vehicles[0], vid)
-                            self.set_state(PlatoonState.STATE_REQUEST_LEFT_VEHICLES_LANE_CHANGE)
-                        elif right_lane_vehicles_index >= self.M and len(right_lane_vehicles) > 0:
-                            for vid in right_lane_vehicles:
-                                v2v.request_lane_change_maneuver(self.vehicles[0], vid)
-                            self.set_state(PlatoonState.STATE_REQUEST_RIGHT_VEHICLES_LANE_CHANGE)
-                        elif index_right >= self.M:
-                            # last resort / split
-                            rear_platoon = self.split(index_right)
-                            platoon_manager.add_platoon(rear_platoon)
-
-                            self.change_lane(Direction.RIGHT)
-                            self.set_state(PlatoonState.STATE_OVERTAKING_RIGHT)
-                        elif index_left >= self.M:
-                            # last resort / split
-                            rear_platoon = self.split(index_left)
-                            platoon_manager.add_platoon(rear_platoon)
-
-                            self.change_lane(Direction.LEFT)
-                            self.set_state(PlatoonState.STATE_OVERTAKING_LEFT)
+                        options = self.get_options(index_right, index_left, left_lane_vehicles_index,
+                                                   left_lane_vehicles, right_lane_vehicles_index, right_lane_vehicles)
+                        if self.context.lookahead is not None and len(options) > 1:
+                            option = self.context.lookahead.choose(self, options)
                         else:
-                            self.set_state(PlatoonState.STATE_CRUISING)
+                            option = options[0]
+                        self.apply_option(option)
 
         self.step += 1
 
+    def get_options(self, index_right, index_left, left_lane_vehicles_index, left_lane_vehicles,
+                    right_lane_vehicles_index, right_lane_vehicles):
+        """
+        Returns the manoeuvres a cruising platoon which is blocked by a slower vehicle can make, in the order of
+        preference. Each option is a tuple of (Manoeuvre, direction, argument), where the argument is the split index
+        or the vehicles to request a lane change from. Waiting is always the last option
+
+        :param index_right: the lane change split index to the right
+        :param index_left: the lane change split index to the left
+        :param left_lane_vehicles_index: the index up to which the vehicles in the left lane are v2v enabled
+        :param left_lane_vehicles: the v2v enabled vehicles in the left lane
+        :param right_lane_vehicles_index: the index up to which the vehicles in the right lane are v2v enabled
+        :param right_lane_vehicles: the v2v enabled vehicles in the right lane
+        """
+        options = list()
+        # if we can change lanes, just change lanes
+        if self.get_length() == index_right:
+            options.append((Manoeuvre.CHANGE_LANE, Direction.RIGHT, None))
+        if self.get_length() == index_left:
+            options.append((Manoeuvre.CHANGE_LANE, Direction.LEFT, None))
+        # check if we can signal other cars to move
+        if left_lane_vehicles_index >= self.M and len(left_lane_vehicles) > 0:
+            options.append((Manoeuvre.REQUEST_VEHICLES_LANE_CHANGE, Direction.LEFT, left_lane_vehicles))
+        if right_lane_vehicles_index >= self.M and len(right_lane_vehicles) > 0:
+            options.append((Manoeuvre.REQUEST_VEHICLES_LANE_CHANGE, Direction.RIGHT, right_lane_vehicles))
+        # last resort / split
+        if self.M <= index_right < self.get_length():
+            options.append((Manoeuvre.SPLIT, Direction.RIGHT, index_right))
+        if self.M <= index_left < self.get_length():
+            options.append((Manoeuvre.SPLIT, Direction.LEFT, index_left))
+        options.append((Manoeuvre.WAIT, None, None))
+        return options
+
+    def apply_option(self, option):
+        """
+        Make a manoeuvre returned by get_options()
+
+        :param option: the (Manoeuvre, direction, argument) tuple of the manoeuvre
+        """
+        manoeuvre, direction, argument = option
+        if manoeuvre == Manoeuvre.WAIT:
+            self.set_state(PlatoonState.STATE_CRUISING)
+            return
+
+        if direction == Direction.RIGHT:
+            overtaking_state = PlatoonState.STATE_OVERTAKING_RIGHT
+            request_state = PlatoonState.STATE_REQUEST_RIGHT_VEHICLES_LANE_CHANGE
+        else:
+            overtaking_state = PlatoonState.STATE_OVERTAKING_LEFT
+            request_state = PlatoonState.STATE_REQUEST_LEFT_VEHICLES_LANE_CHANGE
+
+        if manoeuvre == Manoeuvre.REQUEST_VEHICLES_LANE_CHANGE:
+            for vid in argument:
+                self.context.v2v.request_lane_change_maneuver(self.vehicles[0], vid)
+            self.set_state(request_state)
+            return
+
+        if manoeuvre == Manoeuvre.SPLIT:
+            rear_platoon = self.split(argument)
+            self.context.platoon_manager.add_platoon(rear_platoon)
+        self.change_lane(direction)
+        self.set_state(overtaking_state)
+
     def is_target_vehicle_gps_match(self, vid, v2v_response):
         """
         Check against the v2v response if the target vehicle id is within our v2v response - which means that
         the target vehicle is v2v enabled.
 
         :param vid: the target vehicle
-        :param v2v_response: the response package of v2v equipped vehicle's GPS data
+        :param v2v_response: the V2VSnapshot of v2v equipped vehicle's GPS data
         """
-        v_data = get_par(vid, cc.PAR_SPEED_AND_ACCELERATION)
-        (target_v, target_a, target_u, target_x, target_y, target_t, _, _, _) = cc.unpack(v_data)
-        for vehicle_data in v2v_response:
-            (vid2, v, a, u, x, y, t) = vehicle_data
-            if math.sqrt((target_x - x) ** 2 + (target_y - y) ** 2) <= 0.1:
-                print(vid + " = " + vid2)
-                return True
+        (target_v, target_a, target_u, target_x, target_y, target_t, _, _, _) = \
+            self.context.estimator.get_state(vid, self.connection)
+        vid2 = v2v_response.find(target_x, target_y, 0.1)
+        if vid2 is None:
+            return False
 
-        return False
+        event_log = self.context.event_log
+        if event_log.is_enabled(EventLog.DEBUG):
+            event_log.log(EventLog.DEBUG, "v2v_gps_match", vehicle=vid, match=vid2)
+        return True
 
     def are_target_vehicles_gps_match(self, vlist, v2v_response):
         """
@@ -328,9 +528,9 @@ class Platoon():
         """
         Returns a list of all vehicles in the left lane relative to this platoon's traveling lane
         """
-        edge_id = traci.vehicle.getRoadID(self.vehicles[0])
-        lane_index = traci.vehicle.getLaneIndex(self.vehicles[0])
-        lane_count = traci.edge.getLaneNumber(edge_id)
+        edge_id = self.neighbourhood.getRoadID(self.vehicles[0])
+        lane_index = self.neighbourhood.getLaneIndex(self.vehicles[0])
+        lane_count = self.connection.edge.getLaneNumber(edge_id)
 
         vehicles = set()
 
@@ -338,8 +538,8 @@ class Platoon():
             return vehicles
 
         for pvid in self.vehicles:
-            leaders = traci.vehicle.getLeftLeaders(pvid)
-            followers = traci.vehicle.getLeftFollowers(pvid)
+            leaders = self.neighbourhood.getLeftLeaders(pvid)
+            followers = self.neighbourhood.getLeftFollowers(pvid)
 
             for v in leaders:
                 vid, dist = v
@@ -355,8 +555,8 @@ class Platoon():
         """
         Returns a list of all vehicles in the left lane relative to this platoon's traveling lane
         """
-        edge_id = traci.vehicle.getRoadID(self.vehicles[0])
-        lane_index = traci.vehicle.getLaneIndex(self.vehicles[0])
+        edge_id = self.neighbourhood.getRoadID(self.vehicles[0])
+        lane_index = self.neighbourhood.getLaneIndex(self.vehicles[0])
 
         vehicles = set()
 
@@ -364,18 +564,18 @@ class Platoon():
             return vehicles
 
         for pvid in self.vehicles:
-            leaders = traci.vehicle.getRightLeaders(pvid)
-            followers = traci.vehicle.getRightFollowers(pvid)
+            leaders = self.neighbourhood.getRightLeaders(pvid)
+            followers = self.neighbourhood.getRightFollowers(pvid)
 
             for v in leaders:
                 vid, dist = v
-                leader_lane_index = traci.vehicle.getLaneIndex(vid)
+                leader_lane_index = self.neighbourhood.getLaneIndex(vid)
                 if leader_lane_index - lane_index == -1:
                     if dist <= self.vehicle_length:
                         vehicles.add(vid)
             for v in followers:
                 vid, dist = v
-                follower_lane_index = traci.vehicle.getLaneIndex(vid)
+                follower_lane_index = self.neighbourhood.getLaneIndex(vid)
                 if follower_lane_index - lane_index == -1:
                     if dist <= self.vehicle_length:
                         vehicles.add(vid)
@@ -388,9 +588,9 @@ class Platoon():
         :param vid: the traci vehicle id of the platoon member
         :param direction: the direction to change lanes in
         """
-        edge_id = traci.vehicle.getRoadID(vid)
-        lane_count = traci.edge.getLaneNumber(edge_id)
-        lane_index = traci.vehicle.getLaneIndex(vid)
+        edge_id = self.neighbourhood.getRoadID(vid)
+        lane_count = self.connection.edge.getLaneNumber(edge_id)
+        lane_index = self.neighbourhood.getLaneIndex(vid)
 
         if direction == Direction.LEFT and lane_index == lane_count - 1:
             return False
@@ -398,11 +598,11 @@ class Platoon():
             return False
 
         if direction == Direction.LEFT:
-            leaders = traci.vehicle.getLeftLeaders(vid)
-            followers = traci.vehicle.getLeftFollowers(vid)
+            leaders = self.neighbourhood.getLeftLeaders(vid)
+            followers = self.neighbourhood.getLeftFollowers(vid)
         if direction == Direction.RIGHT:
-            leaders = traci.vehicle.getRightLeaders(vid)
-            followers = traci.vehicle.getRightFollowers(vid)
+            leaders = self.neighbourhood.getRightLeaders(vid)
+            followers = self.neighbourhood.getRightFollowers(vid)
 
         for l in leaders:
             _, dist = l
@@ -418,7 +618,7 @@ class Platoon():
         """
         Returns the speed of the platoon leader
         """
-        return traci.vehicle.getSpeed(self.vehicles[0])
+        return self.connection.vehicle.getSpeed(self.vehicles[0])
 
     def get_total_length(self):
         """
@@ -432,22 +632,39 @@ class Platoon():
 
         :param direction: the direction in which to check diagonally for a vehicle
         """
-        edge_id = traci.vehicle.getRoadID(self.vehicles[0])
-        lane_count = traci.edge.getLaneNumber(edge_id)
-        lane_index = traci.vehicle.getLaneIndex(self.vehicles[0])
+        edge_id = self.neighbourhood.getRoadID(self.vehicles[0])
+        lane_count = self.connection.edge.getLaneNumber(edge_id)
+        lane_index = self.neighbourhood.getLaneIndex(self.vehicles[0])
 
         if direction == Direction.LEFT:
-            leaders = traci.vehicle.getLeftLeaders(self.vehicles[0])
+            leaders = self.neighbourhood.getLeftLeaders(self.vehicles[0])
         if direction == Direction.RIGHT:
-            leaders = traci.vehicle.getRightLeaders(self.vehicles[0])
+            leaders = self.neighbourhood.getRightLeaders(self.vehicles[0])
         for l in leaders:
             lid, dist = l
-            leader_lane_index = traci.vehicle.getLaneIndex(lid)
+            leader_lane_index = self.neighbourhood.getLaneIndex(lid)
             if leader_lane_index - lane_index == direction:
                 if dist <= self.min_gap + self.vehicle_length:
                     return True
         return False
 
+    def get_adjacent_lane_status(self, direction):
+        """
+        Returns LaneMonitor.FREE or LaneMonitor.BLOCKED if the aggregate data of the adjacent lane in the given
+        direction tells that it is free or blocked alongside the whole platoon, or None if each platoon member has to
+        be checked, which is always the case if the simulation does not monitor lanes
+
+        :param direction: the direction of the adjacent lane
+        """
+        if self.context.lane_monitor is None:
+            return None
+        if self.lane_status_step != self.step:
+            self.lane_status = dict()
+            self.lane_status_step = self.step
+        if direction not in self.lane_status:
+            self.lane_status[direction] = self.context.lane_monitor.get_status(self, direction)
+        return self.lane_status[direction]
+
     def get_v2v_vehicles_up_to_index(self, direction, v2v_response):
         """
         Returns the index within the platoon in which there are only v2v enabled vehicles in the given direction
@@ -458,9 +675,9 @@ class Platoon():
         :return: a tuple containing (1) the maximum index into the platoon for which there appear only v2v enabled
         vehicles in the given direction and (2) a list of traci vehicle ids for those adjacent v2v enabled vehicles
         """
-        edge_id = traci.vehicle.getRoadID(self.vehicles[0])
-        lane_count = traci.edge.getLaneNumber(edge_id)
-        lane_index = traci.vehicle.getLaneIndex(self.vehicles[0])
+        edge_id = self.neighbourhood.getRoadID(self.vehicles[0])
+        lane_count = self.connection.edge.getLaneNumber(edge_id)
+        lane_index = self.neighbourhood.getLaneIndex(self.vehicles[0])
 
         vehicles = set()
 
@@ -468,15 +685,18 @@ class Platoon():
             return 0, vehicles
         if direction == Direction.RIGHT and lane_index == 0:
             return 0, vehicles
+        if self.get_adjacent_lane_status(direction) == LaneMonitor.FREE:
+            # there are no vehicles alongside the platoon at all
+            return len(self.vehicles), vehicles
 
         for i, vid in enumerate(self.vehicles):
             vehicles_frame = set()
             if direction == Direction.LEFT:
-                leaders = traci.vehicle.getLeftLeaders(vid)
-                followers = traci.vehicle.getLeftFollowers(vid)
+                leaders = self.neighbourhood.getLeftLeaders(vid)
+                followers = self.neighbourhood.getLeftFollowers(vid)
             if direction == Direction.RIGHT:
-                leaders = traci.vehicle.getRightLeaders(vid)
-                followers = traci.vehicle.getRightFollowers(vid)
+                leaders = self.neighbourhood.getRightLeaders(vid)
+                followers = self.neighbourhood.getRightFollowers(vid)
 
             for v in leaders:
                 lid, dist = v
@@ -503,10 +723,16 @@ class Platoon():
         :return: the maximum index into the platoon for which there is space for a conditional split and lane change
         maneuver
         """
-        for i, vid in enumerate(self.vehicles):
-            if not self.could_lane_change(vid, direction):
-                return i
-        return len(self.vehicles)
+        with self.trace("Platoon.get_lane_change_split_index", direction=direction):
+            status = self.get_adjacent_lane_status(direction)
+            if status == LaneMonitor.FREE:
+                return len(self.vehicles)
+            if status == LaneMonitor.BLOCKED:
+                return 0
+            for i, vid in enumerate(self.vehicles):
+                if not self.could_lane_change(vid, direction):
+                    return i
+            return len(self.vehicles)
 
     def split(self, i):
         """
@@ -517,9 +743,15 @@ class Platoon():
         rear_vehicles = self.vehicles[i:]
         front_vehicles = self.vehicles[:i]
 
+        self.trace_instant("Platoon.split", index=i, rear_leader=rear_vehicles[0])
+        self.context.event_log.log(EventLog.INFO, "platoon_split", leader=self.vehicles[0], index=i,
+                                   rear_leader=rear_vehicles[0])
         self.vehicles = front_vehicles
+        self.metrics.splits += 1
+        if self.surroundings is not None:
+            self.surroundings.update()
 
-        return Platoon(speed=self.desired_speed, vehicles=rear_vehicles)
+        return Platoon(speed=self.desired_speed, vehicles=rear_vehicles, context=self.context)
 
     def build(self, n=6, pos=0, speed=SPEED, lane=DEFAULT_LANE):
         """
@@ -531,27 +763,50 @@ class Platoon():
         :param lane: the starting lane of the platoon
         """
         for i in range(n):
-            vid = vehicle_counter.get_next_platoon_vehicle_id()
+            vid = self.context.vehicle_counter.get_next_platoon_vehicle_id()
             self.vehicles.append(vid)
 
-            add_vehicle(vid, pos - i * (self.min_gap + self.vehicle_length), lane, speed, self.min_gap)
+            add_vehicle(vid, pos - i * (self.min_gap + self.vehicle_length), lane, speed, self.min_gap,
+                        connection=self.connection)
 
             if i == 0:
-                set_par(vid, cc.PAR_ACTIVE_CONTROLLER, cc.ACC)
-                set_par(vid, cc.PAR_CC_DESIRED_SPEED, speed)
+                set_par(vid, cc.PAR_ACTIVE_CONTROLLER, cc.ACC, self.connection)
+                set_par(vid, cc.PAR_CC_DESIRED_SPEED, speed, self.connection)
             else:
-                set_par(vid, cc.PAR_ACTIVE_CONTROLLER, cc.CACC)
-                set_par(vid, cc.PAR_CC_DESIRED_SPEED, speed)
+                set_par(vid, cc.PAR_ACTIVE_CONTROLLER, cc.CACC, self.connection)
+                set_par(vid, cc.PAR_CC_DESIRED_SPEED, speed, self.connection)
 
     def __init__(self, *args, **kwargs):
+        # the simulation this platoon drives in
+        self.context = kwargs.pop("context", default_context)
         self.leader = None
         self.vehicles = kwargs.get("vehicles", list())
         self.desired_speed = kwargs.get("speed", 0)
         self.state = PlatoonState.STATE_CRUISING
-        self.vehicle_length = traci.vehicletype.getLength('PlatoonCar')
-        self.min_gap = traci.vehicletype.getMinGap('PlatoonCar')
+        self.vehicle_length = self.connection.vehicletype.getLength('PlatoonCar')
+        self.min_gap = self.connection.vehicletype.getMinGap('PlatoonCar')
         self.last_state_change_step = 0
         self.step = 0
+        # the inputs of the last evaluation of the lane change decisions, see should_evaluate()
+        self.inputs = None
+        self.evaluation_step = -1
+        # the vehicles alongside the platoon at the step they were looked up, see get_inputs()
+        self.neighbours = None
+        self.neighbours_step = -1
+        self.next_evaluation_step = 0
+        # the radar distance to the vehicle ahead and how much it shrank during the last step, in meters
+        self.leader_distance = None
+        self.closing_speed = 0
+        # the speed of the platoon leader during the current step. fetched by communicate(), or by the
+        # PlatoonManager after the tick if communicate() had no follower to fetch it for
+        self.speed = None
+        self.communicated_step = -1
+        # the status of the adjacent lanes during the step they were looked up, see get_adjacent_lane_status()
+        self.lane_status = dict()
+        self.lane_status_step = -1
+        # the context subscription around the platoon leader, created on first use, see neighbourhood
+        self.surroundings = None
+        self.metrics = PlatoonMetrics()
 
         # this is not a split platoon. it is a new platoon from scratch
         if "vehicles" not in kwargs:
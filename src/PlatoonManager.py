@@ -18,7 +18,9 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with this program.  If not, see http://www.gnu.org/licenses/.
 #
-import traci
+from StreamingMetrics import PlatoonMetrics
+from TraceExporter import TraceExporter
+from utils import communicate
 
 
 class PlatoonManager:
@@ -33,12 +35,97 @@ class PlatoonManager:
         """
         self.platoons.append(platoon)
 
+    def remove_platoon(self, platoon):
+        """
+        Stop managing a platoon, e.g. because it was handed off to another simulation
+
+        :param platoon: the platoon to remove
+        """
+        self.platoons.remove(platoon)
+
+    def set_evaluation_budget(self, budget):
+        """
+        Limit the number of platoons which may evaluate their lane change decisions (split indices, V2V requests) in
+        a single simulation step. Platoons closest to running into the vehicle ahead of them are served first, the
+        remaining budget goes round-robin to the others. Platoons over budget postpone their evaluation to the next
+        step, their CACC is still updated every step
+
+        :param budget: the maximum number of evaluations per step, or None for no limit
+        """
+        self.evaluation_budget = budget
+
+    def acquire_evaluation(self, platoon):
+        """
+        Returns whether the given platoon may evaluate its lane change decisions in the current step, and takes the
+        evaluation from the budget of the step if it may
+
+        :param platoon: the platoon which wants to evaluate its decisions
+        """
+        if self.evaluations_left is None:
+            return True
+        if self.evaluations_left == 0:
+            platoon.metrics.deferred_evaluations += 1
+            return False
+        self.evaluations_left -= 1
+        return True
+
+    def get_tick_order(self):
+        """
+        Returns the platoons in the order in which they get to spend the evaluation budget of the step: platoons
+        which will reach the minimum gap to the vehicle ahead soonest first, then all others round-robin
+        """
+        urgent = list()
+        others = list()
+        for p in self.platoons:
+            urgency = p.get_urgency()
+            if urgency is None:
+                others.append(p)
+            else:
+                urgent.append((urgency, p))
+        urgent.sort(key=lambda item: item[0])
+
+        if len(others) > 0:
+            offset = self.round_robin_offset % len(others)
+            others = others[offset:] + others[:offset]
+        self.round_robin_offset += 1
+        return [p for _, p in urgent] + others
+
+    def communicate(self):
+        """
+        Update the CACC data of all platoons in one pass, reading the state of each vehicle only once
+        """
+        if len(self.platoons) == 0:
+            return
+        topology = dict()
+        for p in self.platoons:
+            topology.update(p.get_topology())
+
+        context = self.platoons[0].context
+        with context.trace("PlatoonManager.communicate", TraceExporter.CATEGORY_PLATOON):
+            data = communicate(topology, context.connection, context.estimator)
+        for p in self.platoons:
+            p.set_communicated(data)
+
     def tick(self):
         """
         Run a single step for all the platoons that the PlatoonManager is managing
         """
-        for p in self.platoons:
-            p.tick()
+        self.communicate()
+        if self.evaluation_budget is None or self.evaluation_budget >= len(self.platoons):
+            self.evaluations_left = None
+            platoons = self.platoons
+        else:
+            self.evaluations_left = self.evaluation_budget
+            platoons = self.get_tick_order()
+
+        for p in platoons:
+            with p.trace("Platoon.tick", TraceExporter.CATEGORY_PLATOON):
+                p.tick()
+
+            # the leader speed is usually known from communicate() already
+            if p.speed is None:
+                p.speed = p.get_speed()
+            p.metrics.tick(p.speed < p.desired_speed)
 
     def reset(self):
         """
@@ -48,6 +135,24 @@ class PlatoonManager:
 
     def __init__(self, *args, **kwargs):
         self.platoons = list()
+        # maximum number of decision evaluations per step, see set_evaluation_budget()
+        self.evaluation_budget = kwargs.get("evaluation_budget", None)
+        self.evaluations_left = None
+        self.round_robin_offset = 0
+
+    def get_metrics(self, step_length):
+        """
+        Returns the streaming metrics of every platoon and of the whole fleet of platoons managed by this
+        PlatoonManager
+
+        :param step_length: the length of a simulation step in seconds
+        """
+        fleet = PlatoonMetrics()
+        for p in self.platoons:
+            fleet.merge(p.metrics)
+        result = fleet.to_dict(step_length)
+        result["platoons"] = [p.metrics.to_dict(step_length) for p in self.platoons]
+        return result
 
     def get_last_platoon_vehicle_id(self):
         """
@@ -57,7 +162,8 @@ class PlatoonManager:
         last_vehicle = None
         for p in self.platoons:
             for vid in p.vehicles:
-                if last_vehicle is None or traci.vehicle.getDistance(vid) < traci.vehicle.getDistance(last_vehicle):
+                if last_vehicle is None or p.connection.vehicle.getDistance(vid) < \
+                        p.connection.vehicle.getDistance(last_vehicle):
                     last_vehicle = vid
         return last_vehicle
 
@@ -0,0 +1,34 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+from enum import Enum, auto
+
+
+class PlatoonState(Enum):
+    """
+    Class for Platoon state
+    """
+    STATE_CRUISING = auto()
+    STATE_OVERTAKING_RIGHT = auto()
+    STATE_OVERTAKING_LEFT = auto()
+    STATE_REQUEST_LEADER_LANE_CHANGE = auto()
+    STATE_REQUEST_LEFT_VEHICLES_LANE_CHANGE = auto()
+    STATE_REQUEST_RIGHT_VEHICLES_LANE_CHANGE = auto()
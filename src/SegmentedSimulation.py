@@ -0,0 +1,483 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+
+import multiprocessing
+import traceback
+
+import traci.constants as tc
+from traci.exceptions import TraCIException
+
+import ccparams as cc
+from Checkpoint import Checkpoint
+from Simulation import Simulation
+from SimulationContext import SimulationContext
+from StreamingMetrics import PlatoonMetrics
+from utils import add_vehicle, set_par
+
+# the edge which is split into segments. vehicles beyond it belong to the last segment
+SEGMENT_EDGE = "freeway"
+
+# variables of every vehicle a segment owns, delivered together with each simulation step
+SUBSCRIBED_VARIABLES = (tc.VAR_TYPE, tc.VAR_ROAD_ID, tc.VAR_LANE_INDEX, tc.VAR_LANEPOSITION, tc.VAR_SPEED)
+
+# kinds of hand-offs between segments
+VEHICLE = "vehicle"
+PLATOON = "platoon"
+
+
+def get_segment(road, position, segment_length, segments):
+    """
+    Returns the index of the segment a position belongs to
+
+    :param road: the edge id of the position
+    :param position: the lane position
+    :param segment_length: the length of a segment in meters
+    :param segments: the number of segments
+    """
+    if road != SEGMENT_EDGE:
+        return segments - 1
+    return min(max(int(position // segment_length), 0), segments - 1)
+
+
+def get_halo_segments(index, position, segment_length, segments, halo):
+    """
+    Returns the neighbours of a segment whose halo contains the given position of the segment edge, i.e. the
+    segments which mirror a vehicle at that position
+
+    :param index: the index of the segment the position belongs to
+    :param position: the lane position on the segment edge
+    :param segment_length: the length of a segment in meters
+    :param segments: the number of segments
+    :param halo: how far beyond its bounds a segment mirrors the vehicles of its neighbours, in meters
+    """
+    neighbours = list()
+    if index > 0 and position < index * segment_length + halo:
+        neighbours.append(index - 1)
+    if index < segments - 1 and position >= (index + 1) * segment_length - halo:
+        neighbours.append(index + 1)
+    return neighbours
+
+
+class SegmentError(Exception):
+    """
+    An error raised in the worker process of a segment, carrying its formatted traceback
+    """
+
+
+class Segment:
+    """
+    One stretch of the segment edge, simulated by a Simulation of its own. The segment owns the platoons whose leader
+    and the vehicles which are within its bounds, and mirrors the vehicles its neighbours own within the halo around
+    its bounds as ghosts, which are moved to the positions reported by their owner every step so that the vehicles
+    near the bounds see them. Ghosts are not V2V enabled for the vehicles of the segment
+    """
+
+    def __init__(self, simulation, index, segments, segment_length, halo):
+        """
+        :param simulation: the Simulation of this segment
+        :param index: the index of this segment
+        :param segments: the number of segments
+        :param segment_length: the length of a segment in meters
+        :param halo: how far beyond its bounds the segment mirrors the vehicles of its neighbours, in meters
+        """
+        self.simulation = simulation
+        self.index = index
+        self.segments = segments
+        self.segment_length = segment_length
+        self.halo = halo
+        # the vehicles this segment simulates, and those whose subscription is not in place yet
+        self.owned = set()
+        self.pending = set()
+        # the mirrored vehicles, pointing to the last step they were reported at
+        self.ghosts = dict()
+
+    @property
+    def connection(self):
+        return self.simulation.connection
+
+    def own(self, vid):
+        """
+        Take a vehicle over, subscribing to its position
+
+        :param vid: the traci vehicle id
+        """
+        self.owned.add(vid)
+        try:
+            self.connection.vehicle.subscribe(vid, SUBSCRIBED_VARIABLES)
+            self.pending.discard(vid)
+        except TraCIException:
+            # the vehicle has not been inserted yet, so try again the next step
+            self.pending.add(vid)
+
+    def release(self, vid):
+        """
+        Hand a vehicle off to another segment, keeping it as a ghost
+
+        :param vid: the traci vehicle id
+        """
+        self.owned.discard(vid)
+        if vid in self.pending:
+            self.pending.discard(vid)
+        else:
+            self.connection.vehicle.unsubscribe(vid)
+        self.ghosts[vid] = self.simulation.step
+
+    def add_platoon(self, counter, arguments):
+        """
+        Add a platoon to this segment, see Simulation.add_platoon
+
+        :param counter: the next number of the vehicle counter shared by all segments
+        :param arguments: the keyword arguments of Simulation.add_platoon
+        :return: the next number of the vehicle counter
+        """
+        self.simulation.context.vehicle_counter.i = counter
+        platoon = self.simulation.add_platoon(**arguments)
+        for vid in platoon.vehicles:
+            self.own(vid)
+        return self.simulation.context.vehicle_counter.i
+
+    def add_vehicle(self, counter, arguments):
+        """
+        Add a vehicle to this segment, see Simulation.add_vehicle
+
+        :param counter: the next number of the vehicle counter shared by all segments
+        :param arguments: the keyword arguments of Simulation.add_vehicle
+        :return: the next number of the vehicle counter
+        """
+        self.simulation.context.vehicle_counter.i = counter
+        self.own(self.simulation.add_vehicle(**arguments))
+        return self.simulation.context.vehicle_counter.i
+
+    def take_over(self, state, cacc_spacing, speed, controller):
+        """
+        Take over a vehicle handed off by another segment, turning its ghost into a controlled vehicle
+
+        :param state: the (vid, type, road, lane, position, speed) of the vehicle
+        :param cacc_spacing: the spacing of the CACC
+        :param speed: the desired speed of the cruise control
+        :param controller: the active controller
+        """
+        vid, type_id, road, lane, position, current_speed = state
+        connection = self.connection
+        if self.ghosts.pop(vid, None) is None:
+            add_vehicle(vid, position, lane, current_speed, cacc_spacing, type_id=type_id, connection=connection)
+        else:
+            try:
+                connection.vehicle.moveTo(vid, "%s_%d" % (road, lane), position)
+                # give the speed back to the car following model
+                connection.vehicle.setSpeed(vid, -1)
+            except TraCIException:
+                # the ghost has not been inserted yet, it is where it was added
+                pass
+        Checkpoint.restore_controller(connection, vid, cacc_spacing, speed, controller, lane=lane)
+        self.own(vid)
+
+    def arrive(self, arrivals):
+        """
+        Take over the platoons and vehicles handed off to this segment
+
+        :param arrivals: a list of (kind, states, data, metrics) tuples, see depart()
+        """
+        context = self.simulation.context
+        for kind, states, data, metrics in arrivals:
+            if kind == VEHICLE:
+                vehicle = Checkpoint.restore_vehicle(context, data)
+                context.vehicle_manager.add_vehicle(vehicle)
+                self.take_over(states[0], vehicle.min_gap, vehicle.desired_speed, cc.ACC)
+            else:
+                platoon = Checkpoint.restore_platoon(context, data)
+                platoon.metrics = metrics
+                context.platoon_manager.add_platoon(platoon)
+                for state in states:
+                    self.take_over(state, platoon.min_gap, platoon.desired_speed,
+                                   platoon.get_active_controller(state[0]))
+
+    def mirror(self, states):
+        """
+        Move the ghosts to the positions their owners reported, adding new and removing stale ones
+
+        :param states: the (vid, type, road, lane, position, speed) of the vehicles to mirror
+        """
+        connection = self.connection
+        step = self.simulation.step
+        for vid, type_id, road, lane, position, speed in states:
+            if vid in self.owned:
+                continue
+            if vid not in self.ghosts:
+                add_vehicle(vid, position, lane, speed, connection.vehicletype.getMinGap(type_id), type_id=type_id,
+                            color=(128, 128, 128, 255), connection=connection)
+                # the ghost only follows the speed it is given
+                set_par(vid, cc.PAR_ACTIVE_CONTROLLER, cc.DRIVER, connection)
+            else:
+                try:
+                    connection.vehicle.moveTo(vid, "%s_%d" % (road, lane), position)
+                    connection.vehicle.setSpeed(vid, speed)
+                except TraCIException:
+                    # the ghost has not been inserted yet
+                    pass
+            self.ghosts[vid] = step
+
+        # a ghost which was handed off the step before is not reported by its new owner yet
+        for vid in [vid for vid, seen in self.ghosts.items() if step - seen > 1]:
+            del self.ghosts[vid]
+            try:
+                connection.vehicle.remove(vid)
+            except TraCIException:
+                # the vehicle left the network
+                pass
+
+    def depart(self):
+        """
+        Hand off the platoons and vehicles which left this segment, and report the vehicles within the halo of the
+        neighbouring segments
+
+        :return: a tuple of the hand-offs and the states to mirror, each a dictionary pointing the index of a
+        segment to a list. a hand-off is a (kind, states, data, metrics) tuple, a state a (vid, type, road, lane,
+        position, speed) tuple
+        """
+        connection = self.connection
+        context = self.simulation.context
+        for vid in list(self.pending):
+            self.own(vid)
+        results = connection.vehicle.getAllSubscriptionResults()
+        states = dict()
+        for vid in self.owned:
+            values = results.get(vid)
+            if values:
+                states[vid] = (vid, values[tc.VAR_TYPE], values[tc.VAR_ROAD_ID], values[tc.VAR_LANE_INDEX],
+                               values[tc.VAR_LANEPOSITION], values[tc.VAR_SPEED])
+
+        departures = dict()
+        for platoon in list(context.platoon_manager.platoons):
+            if any(vid not in states for vid in platoon.vehicles):
+                continue
+            _, _, road, _, position, _ = states[platoon.vehicles[0]]
+            target = get_segment(road, position, self.segment_length, self.segments)
+            if target != self.index:
+                context.platoon_manager.remove_platoon(platoon)
+                if platoon.surroundings is not None:
+                    platoon.surroundings.unsubscribe()
+                departures.setdefault(target, []).append(
+                    (PLATOON, [states.pop(vid) for vid in platoon.vehicles], platoon.to_dict(), platoon.metrics))
+                for vid in platoon.vehicles:
+                    self.release(vid)
+        for vid in list(context.vehicle_manager.vehicles):
+            if vid not in states:
+                continue
+            _, _, road, _, position, _ = states[vid]
+            target = get_segment(road, position, self.segment_length, self.segments)
+            if target != self.index:
+                vehicle = context.vehicle_manager.remove_vehicle(vid)
+                departures.setdefault(target, []).append((VEHICLE, [states.pop(vid)], vehicle.to_dict(), None))
+                self.release(vid)
+
+        mirrored = dict()
+        for state in states.values():
+            if state[2] == SEGMENT_EDGE:
+                for target in get_halo_segments(self.index, state[4], self.segment_length, self.segments,
+                                                self.halo):
+                    mirrored.setdefault(target, []).append(state)
+        return departures, mirrored
+
+    def step(self, arrivals, states):
+        """
+        Simulate the next step of this segment
+
+        :param arrivals: the hand-offs to this segment, see depart()
+        :param states: the states of the vehicles to mirror, see mirror()
+        :return: the hand-offs and states to mirror of this segment, see depart()
+        """
+        self.arrive(arrivals)
+        self.mirror(states)
+        self.simulation.simulate_step()
+        return self.depart()
+
+    def close(self):
+        """
+        Close the simulation of this segment
+
+        :return: a tuple of the simulation time in seconds and the PlatoonMetrics of the platoons of this segment
+        """
+        time = self.connection.simulation.getTime()
+        metrics = [p.metrics for p in self.simulation.context.platoon_manager.platoons]
+        self.simulation.context.close()
+        return time, metrics
+
+
+def serve_segment(pipe, index, segments, segment_length, halo, config_file, gui):
+    """
+    Runs a Segment in a worker process, calling the methods the SegmentedSimulation sends over the pipe
+
+    :param pipe: the worker end of the pipe to the SegmentedSimulation
+    :param index: the index of the segment
+    :param segments: the number of segments
+    :param segment_length: the length of a segment in meters
+    :param halo: how far beyond its bounds the segment mirrors the vehicles of its neighbours, in meters
+    :param config_file: the sumo configuration file
+    :param gui: whether to start sumo-gui or the command line sumo
+    """
+    try:
+        simulation = Simulation(context=SimulationContext(label=f"segment.{index}"), gui=gui, config_file=config_file)
+        segment = Segment(simulation, index, segments, segment_length, halo)
+        pipe.send(simulation.connection.simulation.getDeltaT())
+        while True:
+            method, arguments = pipe.recv()
+            pipe.send(getattr(segment, method)(*arguments))
+            if method == "close":
+                break
+    except Exception:
+        pipe.send(SegmentError(traceback.format_exc()))
+    finally:
+        pipe.close()
+
+
+class SegmentedSimulation:
+    """
+    Splits the segment edge into consecutive segments of equal length, each simulated by its own SUMO instance in a
+    worker process, so that long corridors run in parallel. All segments run the same configuration and advance in
+    lock-step. Platoons, with their state and metrics, and vehicles are handed off to the next segment when their
+    leader or they themselves cross a bound; vehicles within the halo of a bound are mirrored into the neighbouring
+    segment so that the decisions near the bound see them. The halo has to be longer than a platoon plus the radar
+    distance for the handed off platoon members to be mirrored already
+    """
+    DEFAULT_HALO = 300
+
+    def __init__(self, segments, segment_length, run_time_seconds=None, config_file="cfg/map.sumocfg",
+                 halo=DEFAULT_HALO, gui=False):
+        """
+        :param segments: the number of segments
+        :param segment_length: the length of a segment in meters
+        :param run_time_seconds: the time length of the simulation in seconds
+        :param config_file: the sumo configuration file
+        :param halo: how far beyond its bounds a segment mirrors the vehicles of its neighbours, in meters
+        :param gui: whether to start sumo-gui or the command line sumo
+        """
+        self.segments = segments
+        self.segment_length = segment_length
+        self.run_time_seconds = run_time_seconds
+        # the vehicle counter shared by the segments, so that vehicle ids are unique across them
+        self.counter = 0
+        self.step = 0
+        self.pipes = list()
+        self.workers = list()
+        for index in range(segments):
+            pipe, worker_pipe = multiprocessing.Pipe()
+            worker = multiprocessing.Process(target=serve_segment, args=(worker_pipe, index, segments, segment_length,
+                                                                         halo, config_file, gui), daemon=True)
+            worker.start()
+            self.pipes.append(pipe)
+            self.workers.append(worker)
+        self.step_length = [self.receive(index) for index in range(segments)][0]
+
+    def receive(self, index):
+        """
+        Returns the next answer of the worker of a segment
+
+        :param index: the index of the segment
+        :raises SegmentError: if the worker failed
+        """
+        result = self.pipes[index].recv()
+        if isinstance(result, SegmentError):
+            raise result
+        return result
+
+    def call(self, index, method, *arguments):
+        """
+        Call a method of a Segment in its worker and return the result
+
+        :param index: the index of the segment
+        :param method: the name of the method
+        :param arguments: the arguments of the method
+        """
+        self.pipes[index].send((method, arguments))
+        return self.receive(index)
+
+    def set_simulation_time_length(self, length):
+        """
+        Set the amount of time the simulation should run for
+
+        :param length: the time length in seconds
+        """
+        self.run_time_seconds = length
+
+    def add_platoon(self, **arguments):
+        """
+        Add a platoon to the segment of its start position, see Simulation.add_platoon
+
+        :param arguments: the keyword arguments of Simulation.add_platoon
+        """
+        index = get_segment(SEGMENT_EDGE, arguments.get("platoon_start_position", 50), self.segment_length,
+                            self.segments)
+        self.counter = self.call(index, "add_platoon", self.counter, arguments)
+
+    def add_vehicle(self, **arguments):
+        """
+        Add a vehicle to the segment of its start position, see Simulation.add_vehicle
+
+        :param arguments: the keyword arguments of Simulation.add_vehicle
+        """
+        index = get_segment(SEGMENT_EDGE, arguments.get("vehicle_start_position", 0), self.segment_length,
+                            self.segments)
+        self.counter = self.call(index, "add_vehicle", self.counter, arguments)
+
+    def run(self):
+        """
+        Run all segments in lock-step until the time length is reached
+
+        :return: a tuple of the total simulation time in seconds and the streaming metrics of all platoons, like
+        Simulation.run
+        :raises ValueError: if no time length was set
+        """
+        if self.run_time_seconds is None:
+            raise ValueError("the time length of a segmented simulation has to be set, see set_simulation_time_length")
+        arrivals = [list() for _ in range(self.segments)]
+        mirrored = [list() for _ in range(self.segments)]
+        max_step = self.run_time_seconds / self.step_length
+        while self.step <= max_step:
+            # let all segments simulate the step at the same time before collecting what they hand over
+            for index, pipe in enumerate(self.pipes):
+                pipe.send(("step", (arrivals[index], mirrored[index])))
+            arrivals = [list() for _ in range(self.segments)]
+            mirrored = [list() for _ in range(self.segments)]
+            for index in range(self.segments):
+                departures, states = self.receive(index)
+                for target, items in departures.items():
+                    arrivals[target].extend(items)
+                for target, items in states.items():
+                    mirrored[target].extend(items)
+            self.step += 1
+
+        # platoons which are being handed off are still on their way
+        fleet = PlatoonMetrics()
+        platoons = [metrics for _, _, _, metrics in (item for items in arrivals for item in items) if metrics]
+        total_simulation_time = 0
+        for index in range(self.segments):
+            time, metrics = self.call(index, "close")
+            total_simulation_time = max(total_simulation_time, time)
+            platoons.extend(metrics)
+        for worker in self.workers:
+            worker.join()
+        for metrics in platoons:
+            fleet.merge(metrics)
+        result = fleet.to_dict(self.step_length)
+        result["platoons"] = [metrics.to_dict(self.step_length) for metrics in platoons]
+        return total_simulation_time, result
@@ -19,17 +19,29 @@
 # along with this program.  If not, see http://www.gnu.org/licenses/.
 #
 
+import os
 import random
 import time
-
-import traci
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter_ns
 
 import ccparams as cc
+import SumoOutput
+from Checkpoint import Checkpoint
+from EventLog import EventLog
+from Instrumentation import Instrumentation, InstrumentedConnection
+from LaneMonitor import LaneMonitor
+from Lookahead import Horizon, Lookahead
 from Platoon import Platoon
-from PlatoonManager import platoon_manager
-from Vehicle import vehicle_counter, Vehicle
-from VehicleManager import vehicle_manager
-from utils import add_vehicle, set_par, start_sumo, running, running_distance
+from SimulationContext import SimulationContext, default_context
+from StateEstimator import StateEstimator
+from Surroundings import Surroundings
+from TerminationCondition import AnyCondition, DistanceLimit, TimeLimit
+from TraceExporter import TraceExporter
+from Treadmill import Treadmill
+from TrajectoryRecorder import TrajectoryRecorder
+from Vehicle import Vehicle
+from utils import add_vehicle, set_par
 
 
 class Simulation:
@@ -37,15 +49,55 @@ class Simulation:
     Simulation class for encapsulating a simulation and making it configurable
     """
 
-    def __init__(self, run_time_seconds=None, platoon_run_distance=None):
+    def __init__(self, run_time_seconds=None, platoon_run_distance=None, context=default_context, gui=True,
+                 config_file="cfg/map.sumocfg", outputs=(), output_directory="output", replay=None):
+        """
+        :param run_time_seconds: the time length of the simulation in seconds
+        :param platoon_run_distance: the distance the platoons travel until the simulation ends, in meters
+        :param context: the SimulationContext to run in
+        :param gui: whether to start sumo-gui or the command line sumo
+        :param config_file: the sumo configuration file
+        :param outputs: the SUMO outputs to write while the simulation runs, e.g. (SumoOutput.FCD,
+        SumoOutput.TRIP_INFO), see load_output()
+        :param output_directory: the directory the outputs are written to
+        :param replay: the path of a recording to serve the traci calls from instead of starting SUMO, see
+        record_traci()
+        """
         self.platoon_run_distance = platoon_run_distance
         self.run_time_seconds = run_time_seconds
-
+        self.context = context
+        self.termination_conditions = list()
+        # simulation time in seconds -> directory of the checkpoints to save during the run
+        self.checkpoints = dict()
+        self.recorder = None
+        self.instrumentation = None
+        self.instrumentation_path = None
+        self.lookahead_path = None
+        self.config_file = config_file
+        self.gui = gui
+        self.outputs = tuple(outputs)
+        self.output_directory = output_directory
+        # the length of a step in seconds, known once the simulation runs
+        self.step_length = None
+
+        # the next step to simulate, which is not 0 after a checkpoint was loaded
         self.step = 0
 
         # used to randomly color the vehicles
         random.seed(1)
-        start_sumo("cfg/map.sumocfg", False)
+        if replay is not None:
+            self.context.replay(replay)
+        elif self.outputs:
+            self.context.start(config_file, gui, options=SumoOutput.get_arguments(output_directory, self.outputs))
+        else:
+            self.context.start(config_file, gui)
+
+    @property
+    def connection(self):
+        """
+        The traci connection to the SUMO instance of this simulation
+        """
+        return self.context.connection
 
     def set_simulation_time_length(self, length):
         """
@@ -55,6 +107,15 @@ class Simulation:
         """
         self.run_time_seconds = length
 
+    def set_evaluation_budget(self, budget):
+        """
+        Set the maximum number of platoons which may evaluate their lane change decisions in a single step, see
+        PlatoonManager.set_evaluation_budget()
+
+        :param budget: the maximum number of evaluations per step, or None for no limit
+        """
+        self.context.platoon_manager.set_evaluation_budget(budget)
+
     def set_simulation_platoon_run_distance(self, distance):
         """
         Set the distance the platoon should travel at which point the simulation will end
@@ -63,13 +124,207 @@ class Simulation:
         """
         self.platoon_run_distance = distance
 
+    def save_checkpoint(self, directory):
+        """
+        Save the simulation at its current step to a directory, see Checkpoint
+
+        :param directory: the directory of the checkpoint
+        """
+        Checkpoint(directory).save(self)
+
+    def save_checkpoint_at(self, seconds, directory):
+        """
+        Save the simulation to a directory once the run reaches the given simulation time, e.g. at the end of a
+        warm-up, see Checkpoint
+
+        :param seconds: the simulation time in seconds
+        :param directory: the directory of the checkpoint
+        """
+        self.checkpoints[seconds] = directory
+
+    def load_checkpoint(self, directory):
+        """
+        Continue the simulation from a checkpoint instead of from the start. Call this before adding platoons or
+        vehicles; the ones added afterwards join the restored ones. The time length of the simulation still counts
+        from the start of the original simulation
+
+        :param directory: the directory of the checkpoint
+        """
+        Checkpoint(directory).load(self)
+
+    def enable_lookahead(self, horizon=Lookahead.DEFAULT_HORIZON, apply=False, max_workers=None, path=None):
+        """
+        Whenever a blocked platoon has several manoeuvres to choose from, simulate each of them ahead in worker
+        processes and report which one makes the best progress, see Lookahead
+
+        :param horizon: the time to simulate each option for in seconds
+        :param apply: whether to apply the best option instead of the one with the highest priority
+        :param max_workers: the maximum number of worker processes, each running a SUMO instance
+        :param path: if given, the reported decisions are written to this JSON file at the end of the run
+        :return: the Lookahead of this simulation
+        """
+        self.context.lookahead = Lookahead(self, simulate_option, horizon=horizon, apply=apply,
+                                           max_workers=max_workers)
+        self.lookahead_path = path
+        return self.context.lookahead
+
+    def add_termination_condition(self, condition):
+        """
+        End the simulation as soon as the given condition is met, in addition to the time length and platoon run
+        distance
+
+        :param condition: a TerminationCondition
+        """
+        self.termination_conditions.append(condition)
+
+    def get_termination_condition(self):
+        """
+        Returns the condition which ends the run, combining the time length, the platoon run distance and the added
+        termination conditions
+        """
+        conditions = list(self.termination_conditions)
+        if self.run_time_seconds is not None:
+            conditions.append(TimeLimit(self.run_time_seconds))
+        if self.platoon_run_distance is not None:
+            conditions.append(DistanceLimit(self.platoon_run_distance))
+        return AnyCondition(*conditions)
+
+    def record_trajectories(self, directory, selection=TrajectoryRecorder.SELECT_PLATOON, every=1,
+                            chunk_size=TrajectoryRecorder.DEFAULT_CHUNK_SIZE):
+        """
+        Record the trajectories of the vehicles in this simulation to the given directory while it runs
+
+        :param directory: the directory to write the recorded chunks to
+        :param selection: which vehicles to record, TrajectoryRecorder.SELECT_ALL or TrajectoryRecorder.SELECT_PLATOON
+        :param every: record only every k-th simulation step
+        :param chunk_size: the number of rows kept in memory before they are written to disk
+        :return: the TrajectoryRecorder, which can be used to track additional vehicles
+        """
+        self.recorder = TrajectoryRecorder(self.context, directory, selection=selection, every=every,
+                                           chunk_size=chunk_size)
+        return self.recorder
+
+    def instrument(self, path=None):
+        """
+        Count the traci calls by command and call site and time each phase of the simulation steps. Without calling
+        this, the simulation runs without any instrumentation overhead
+
+        :param path: if given, the collected data is written to this JSON file at the end of the run
+        :return: the Instrumentation collecting the data
+        """
+        self.instrumentation = Instrumentation()
+        self.instrumentation_path = path
+        self.context.connection = InstrumentedConnection(self.context.connection, self.instrumentation)
+        return self.instrumentation
+
+    def record_traci(self, path):
+        """
+        Record every traci call and its result to a compact binary file, so that the simulation can be replayed without
+        SUMO by a Simulation created with replay=path. Call this before adding platoons and vehicles. A replay raises a
+        ReplayDivergence as soon as it issues another call than the recorded one
+
+        :param path: the path of the recording
+        """
+        self.context.record(path)
+
+    def trace(self, path, every=1, buffer_size=TraceExporter.DEFAULT_BUFFER_SIZE):
+        """
+        Write a trace of the simulation steps, platoon ticks, decision phases and state transitions which can be
+        opened in Perfetto
+
+        :param path: the path of the trace file
+        :param every: trace only every k-th simulation step
+        :param buffer_size: the number of events kept in memory before they are written to the trace file
+        :return: the TraceExporter writing the trace
+        """
+        self.context.tracer = TraceExporter(path, every=every, buffer_size=buffer_size)
+        return self.context.tracer
+
+    def log_events(self, path, level=EventLog.INFO):
+        """
+        Write the events of this simulation (state changes, V2V requests, splits, lane changes) to a JSON lines file
+
+        :param path: the path of the file
+        :param level: the minimum level of the events to write, EventLog.DEBUG includes every V2V GPS match
+        :return: the EventLog of this simulation
+        """
+        self.context.event_log.open(path, level)
+        return self.context.event_log
+
+    def estimate_vehicle_states(self, threshold=StateEstimator.DEFAULT_THRESHOLD,
+                                max_acceleration_change=StateEstimator.DEFAULT_MAX_ACCELERATION_CHANGE):
+        """
+        Predict the state of background vehicles by dead reckoning instead of reading it from SUMO every step, see
+        StateEstimator
+
+        :param threshold: the maximum error of a predicted position in meters before the state is read again
+        :param max_acceleration_change: the largest change of acceleration between two reads in m/s^2
+        :return: the StateEstimator of this simulation
+        """
+        self.context.estimator.enable(self.connection.simulation.getDeltaT(), threshold, max_acceleration_change)
+        return self.context.estimator
+
+    def subscribe_platoon_surroundings(self, radar_distance=Surroundings.DEFAULT_RADAR_DISTANCE):
+        """
+        Let every platoon hold a context subscription around its leader, and answer its radar and neighbour queries
+        from it instead of querying SUMO for each of them, see Surroundings
+
+        :param radar_distance: how far ahead of the platoon leaders vehicles are seen, in meters
+        """
+        self.context.radar_distance = radar_distance
+
+    def monitor_lanes(self, blocked_occupancy=None):
+        """
+        Subscribe to the vehicle count and occupancy of the lanes next to the platoons, so that a platoon skips
+        checking each of its members for neighbours when the adjacent lane is empty or crowded, see LaneMonitor
+
+        :param blocked_occupancy: the fraction of the length of a lane covered by vehicles from which it is taken as
+        blocked. None to check the platoon members whenever the lane is not empty, which keeps the decisions exact
+        :return: the LaneMonitor of this simulation
+        """
+        self.context.lane_monitor = LaneMonitor(self.context, blocked_occupancy=blocked_occupancy)
+        return self.context.lane_monitor
+
+    def enable_treadmill(self, distance_behind=Treadmill.DEFAULT_DISTANCE_BEHIND,
+                         distance_ahead=Treadmill.DEFAULT_DISTANCE_AHEAD, spread=Treadmill.DEFAULT_SPREAD,
+                         speed_range=Treadmill.DEFAULT_SPEED_RANGE, interval=Treadmill.DEFAULT_INTERVAL):
+        """
+        Recycle the vehicles which fell behind the platoons to ahead of them, and move the platoons back along the
+        edge before they reach its end, so that the platoons drive endlessly and meet an endless stream of traffic
+        with a constant number of vehicles, see Treadmill
+
+        :param distance_behind: how far behind the last platoon member a vehicle is recycled, in meters
+        :param distance_ahead: how far ahead of the foremost platoon leader recycled vehicles are placed, in meters
+        :param spread: the length of the stretch beyond distance_ahead recycled vehicles are spread over, in meters
+        :param speed_range: the (lowest, highest) desired speed of recycled vehicles, in meters/second
+        :param interval: the number of simulation steps between two checks for vehicles to recycle
+        :return: the Treadmill of this simulation
+        """
+        self.context.treadmill = Treadmill(self.context, distance_behind=distance_behind,
+                                           distance_ahead=distance_ahead, spread=spread, speed_range=speed_range,
+                                           interval=interval)
+        return self.context.treadmill
+
+    def load_output(self, output):
+        """
+        Load an output SUMO wrote during the run into NumPy arrays, see SumoOutput.load. The output is complete once
+        the run ended and SUMO closed it
+
+        :param output: the name of the output, e.g. SumoOutput.FCD
+        :return: the OutputTable of the output
+        """
+        if output not in self.outputs:
+            raise ValueError("the simulation does not write the %s output" % output)
+        _, file_name, _, _ = SumoOutput.OUTPUTS[output]
+        return SumoOutput.load(os.path.join(self.output_directory, file_name), output)
+
     def track_vehicle(self, vid):
         """
         Track the given vehicle in the Sumo GUI
 
         :param vid: the target vehicle's traci vehicle id
         """
-        traci.gui.trackVehicle("View #0", vid)
+        self.connection.gui.trackVehicle("View #0", vid)
 
     def set_zoom(self, zoom=20000):
         """
@@ -77,7 +332,7 @@ class Simulation:
 
         :param zoom: the zoom value to set
         """
-        traci.gui.setZoom("View #0", zoom)
+        self.connection.gui.setZoom("View #0", zoom)
 
     def add_platoon(self, platoon_length=6, platoon_start_position=50, platoon_start_lane=Platoon.DEFAULT_LANE,
                     platoon_desired_speed=Platoon.SPEED):
@@ -90,8 +345,8 @@ class Simulation:
         :param platoon_desired_speed: the desired speed of the platoon
         """
         platoon = Platoon(n=platoon_length, pos=platoon_start_position, lane=platoon_start_lane,
-                          speed=platoon_desired_speed)
-        platoon_manager.add_platoon(platoon)
+                          speed=platoon_desired_speed, context=self.context)
+        self.context.platoon_manager.add_platoon(platoon)
 
         return platoon
 
@@ -106,9 +361,9 @@ class Simulation:
         :param v2v: whether the vehicle is equipped with V2V
         :param commands: a dictionary of commands to execute during the simulation
         """
-        vid = vehicle_counter.get_next_vehicle_id()
+        vid = self.context.vehicle_counter.get_next_vehicle_id()
 
-        min_gap = traci.vehicletype.getMinGap('V2V_Car')
+        min_gap = self.connection.vehicletype.getMinGap('V2V_Car')
 
         if v2v:
             color = (255, 0, 0)
@@ -116,34 +371,145 @@ class Simulation:
             color = (0, 0, 255)
 
         add_vehicle(vid, vehicle_start_position, vehicle_start_lane, vehicle_start_speed, min_gap, type_id='V2V_Car',
-                    color=color)
+                    color=color, connection=self.connection)
 
-        set_par(vid, cc.PAR_ACTIVE_CONTROLLER, cc.ACC)
-        set_par(vid, cc.PAR_CACC_SPACING, min_gap)
+        set_par(vid, cc.PAR_ACTIVE_CONTROLLER, cc.ACC, self.connection)
+        set_par(vid, cc.PAR_CACC_SPACING, min_gap, self.connection)
 
-        vehicle_manager.add_vehicle(Vehicle(vid, commands=commands, v2v=v2v))
+        self.context.vehicle_manager.add_vehicle(Vehicle(vid, commands=commands, v2v=v2v, context=self.context,
+                                                         desired_speed=vehicle_start_speed))
 
         return vid
 
-    def run(self):
+    def simulate_step(self):
         """
-        The main execution loop for the simulation
+        Simulate the next step: advance SUMO by one step, then tick the platoons and vehicles
         """
-        self.step = 0
-
-        last_platoon_vehicle = platoon_manager.get_last_platoon_vehicle_id()
-        total_simulation_time = 0
+        context = self.context
+        instrumentation = self.instrumentation
+        tracer = context.tracer
+        trace = context.trace
+        context.event_log.step = self.step
+        context.estimator.step = self.step
+        if tracer is not None:
+            tracer.set_step(self.step)
+        if instrumentation is not None:
+            start = perf_counter_ns()
+
+        with trace("simulationStep"):
+            context.connection.simulationStep()
+        if instrumentation is not None:
+            simulated = perf_counter_ns()
+
+        context.platoon_manager.tick()
+        if instrumentation is not None:
+            platoons_ticked = perf_counter_ns()
+
+        with trace("VehicleManager.tick"):
+            context.vehicle_manager.tick(self.step)
+        if context.treadmill is not None:
+            with trace("Treadmill.tick"):
+                context.treadmill.tick(self.step)
+        if instrumentation is not None:
+            instrumentation.add_step(start, simulated, platoons_ticked, perf_counter_ns())
+
+        if self.recorder is not None:
+            self.recorder.record(self.step)
+
+        self.step += 1
 
-        while running(self.step, self.run_time_seconds) and running_distance(last_platoon_vehicle,
-                                                                             self.platoon_run_distance):
-            traci.simulationStep()
+    def run(self):
+        """
+        The main execution loop for the simulation
 
-            platoon_manager.tick()
-            vehicle_manager.tick(self.step)
+        :return: a tuple of the total simulation time in seconds and the streaming metrics of the platoons, see
+        PlatoonManager.get_metrics
+        """
+        connection = self.connection
+        platoon_manager = self.context.platoon_manager
+        recorder = self.recorder
+        instrumentation = self.instrumentation
+        tracer = self.context.tracer
+        event_log = self.context.event_log
+
+        step_length = connection.simulation.getDeltaT()
+        self.step_length = step_length
+        termination_condition = self.get_termination_condition()
+        termination_condition.start(self, step_length)
+        checkpoints = {round(seconds / step_length): directory for seconds, directory in self.checkpoints.items()}
+
+        while not termination_condition.is_met(self):
+            if self.step in checkpoints:
+                self.save_checkpoint(checkpoints[self.step])
+            self.simulate_step()
+
+        total_simulation_time = connection.simulation.getTime() if self.step > 0 else 0
+        metrics = platoon_manager.get_metrics(step_length)
+        if recorder is not None:
+            recorder.close(step_length)
+        if instrumentation is not None and self.instrumentation_path is not None:
+            instrumentation.dump(self.instrumentation_path)
+        if tracer is not None:
+            tracer.close()
+            self.context.tracer = None
+        event_log.close()
+        lookahead = self.context.lookahead
+        if lookahead is not None:
+            if self.lookahead_path is not None:
+                lookahead.dump(self.lookahead_path)
+            lookahead.close()
+            self.context.lookahead = None
+        self.context.close()
+        if self.gui:
+            # give sumo-gui time to close its window
+            time.sleep(5)
+        return total_simulation_time, metrics
+
+
+def simulate_option(config_file, checkpoint_directory, leader, option, horizon):
+    """
+    Simulate one manoeuvre option of a platoon from a checkpoint in a SUMO instance of its own, see Lookahead
+
+    :param config_file: the sumo configuration file of the simulation
+    :param checkpoint_directory: the checkpoint taken when the platoon decided
+    :param leader: the traci vehicle id of the leader of the platoon
+    :param option: the option to make, see Platoon.get_options
+    :param horizon: the time to simulate in seconds
+    :return: the mean distance driven by the vehicles of the platoon at the end of the horizon
+    """
+    simulation = Simulation(context=SimulationContext(label=f"lookahead.{os.getpid()}"), gui=False,
+                            config_file=config_file)
+    simulation.load_checkpoint(checkpoint_directory)
+    context = simulation.context
+    platoon = next(p for p in context.platoon_manager.platoons if p.vehicles[0] == leader)
+    vehicles = list(platoon.vehicles)
+
+    # finish the step of the decision with the option
+    platoon.apply_option(option)
+    platoon.step += 1
+    context.vehicle_manager.tick(simulation.step)
+    simulation.step += 1
+
+    horizon = Horizon(horizon, vehicles)
+    simulation.add_termination_condition(horizon)
+    simulation.run()
+    return horizon.progress
+
+
+def run_simulations(scenarios, max_workers=None, gui=False):
+    """
+    Run several independent simulations concurrently, each one in its own SUMO instance. Most of the time of a step
+    is spent waiting on the traci socket, so threads are enough to keep several SUMO instances busy.
 
-            self.step += 1
-            total_simulation_time = traci.simulation.getTime()
+    :param scenarios: a list of functions, each receiving a freshly started Simulation to add platoons and vehicles to
+    :param max_workers: the maximum number of simulations running at the same time
+    :param gui: whether to start sumo-gui or the command line sumo
+    :return: the result of Simulation.run for each scenario, in the order of the given scenarios
+    """
+    def run_scenario(index, scenario):
+        simulation = Simulation(context=SimulationContext(label=f"simulation.{index}"), gui=gui)
+        scenario(simulation)
+        return simulation.run()
 
-        traci.close()
-        time.sleep(5)
-        return total_simulation_time
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(run_scenario, range(len(scenarios)), scenarios))
@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+import threading
+
+import traci
+from traci.exceptions import TraCIException
+
+from EventLog import EventLog, event_log
+from PlatoonManager import PlatoonManager, platoon_manager
+from StateEstimator import StateEstimator, state_estimator
+from TraceExporter import NULL_SPAN, TraceExporter
+from TraciRecording import RecordingConnection, ReplayConnection, TraciRecording
+from V2V import V2V, v2v
+from VehicleCounter import VehicleCounter, vehicle_counter
+from VehicleManager import VehicleManager, vehicle_manager
+from utils import DEFAULT_LABEL, start_sumo
+
+# traci.start looks for a free port and registers the connection in a global table, which is not thread-safe
+_start_lock = threading.Lock()
+
+
+class SimulationContext:
+    """
+    Class which owns everything a single simulation needs: its managers, vehicle counter, V2V bus and the label of
+    the traci connection to its SUMO instance. Several contexts with different labels can drive several SUMO
+    instances from the same process.
+    """
+
+    def __init__(self, label=DEFAULT_LABEL, **kwargs):
+        self.label = label
+        self.estimator = kwargs.get("estimator", StateEstimator())
+        self.platoon_manager = kwargs.get("platoon_manager", PlatoonManager())
+        self.vehicle_manager = kwargs.get("vehicle_manager", VehicleManager(estimator=self.estimator))
+        self.vehicle_counter = kwargs.get("vehicle_counter", VehicleCounter())
+        self.event_log = kwargs.get("event_log", EventLog())
+        self.v2v = kwargs.get("v2v", V2V(vehicle_manager=self.vehicle_manager, event_log=self.event_log))
+        # the traci module forwards to whichever connection is current until this context is started
+        self.connection = traci
+        # the TraceExporter of this simulation, if it is traced
+        self.tracer = None
+        # the Lookahead which simulates the options of platoon manoeuvres ahead, if enabled
+        self.lookahead = None
+        # the radar distance of the context subscriptions around platoon leaders, if platoons subscribe to their
+        # surroundings instead of querying each neighbour
+        self.radar_distance = None
+        # the LaneMonitor which tells platoons whether adjacent lanes are free or blocked, if enabled
+        self.lane_monitor = None
+        # the Treadmill which recycles vehicles left behind by the platoons to ahead of them, if enabled
+        self.treadmill = None
+        # the TraciRecording the traci calls are recorded to or replayed from, if any
+        self.recording = None
+
+    def start(self, config_file, gui=True, options=()):
+        """
+        Start the SUMO instance of this context and connect to it
+
+        :param config_file: the sumo configuration file
+        :param gui: whether to start sumo-gui or the command line sumo
+        :param options: additional sumo command line options
+        """
+        with _start_lock:
+            start_sumo(config_file, False, label=self.label, gui=gui, options=options)
+        self.connection = traci.getConnection(self.label)
+
+    def record(self, path):
+        """
+        Record every traci call of this context and its result, so that the simulation can be replayed without SUMO
+
+        :param path: the path of the recording
+        """
+        self.recording = TraciRecording(path)
+        self.connection = RecordingConnection(self.connection, self.recording)
+
+    def replay(self, path):
+        """
+        Serve the traci calls of this context from a recording instead of a SUMO instance
+
+        :param path: the path of the recording
+        """
+        self.recording = TraciRecording(path, replay=True)
+        self.connection = ReplayConnection(self.recording)
+
+    def close(self):
+        """
+        Close the connection to the SUMO instance of this context, and its recording
+
+        :raises ReplayDivergence: if a replay did not issue all recorded calls
+        """
+        recording = self.recording
+        if recording is None or not recording.replay:
+            if self.label == DEFAULT_LABEL:
+                traci.close()
+            else:
+                # traci only forgets the current connection when closing it, so make this one current for the time
+                # being and switch back to the one which was current before
+                with _start_lock:
+                    current = traci.getLabel()
+                    traci.switch(self.label)
+                    traci.close()
+                    if current != self.label:
+                        try:
+                            traci.switch(current)
+                        except TraCIException:
+                            # no connection was current before
+                            pass
+        self.connection = traci
+        if recording is not None:
+            self.recording = None
+            recording.close()
+
+    def trace(self, name, category=TraceExporter.CATEGORY_STEP, track=TraceExporter.SIMULATION_TRACK, **args):
+        """
+        Returns a context manager which traces the time spent inside of it, if this simulation is traced
+
+        :param name: the name of the span
+        :param category: the category of the span
+        :param track: the track to show the span on
+        :param args: additional values to show with the span
+        """
+        if self.tracer is None:
+            return NULL_SPAN
+        return self.tracer.span(name, category, track, **args)
+
+    def trace_instant(self, name, category, track=TraceExporter.SIMULATION_TRACK, **args):
+        """
+        Trace an event without duration, if this simulation is traced
+
+        :param name: the name of the event
+        :param category: the category of the event
+        :param track: the track to show the event on
+        :param args: additional values to show with the event
+        """
+        if self.tracer is not None:
+            self.tracer.instant(name, category, track, **args)
+
+    def reset(self):
+        """
+        Clear the platoons, vehicles, vehicle ids, logged events, state estimates and monitored lanes of this context
+        """
+        self.platoon_manager.reset()
+        self.vehicle_manager.reset()
+        self.vehicle_counter.reset()
+        self.event_log.reset()
+        self.estimator.reset()
+        if self.lane_monitor is not None:
+            self.lane_monitor.reset()
+
+
+default_context = SimulationContext(platoon_manager=platoon_manager, vehicle_manager=vehicle_manager,
+                                    vehicle_counter=vehicle_counter, event_log=event_log, v2v=v2v,
+                                    estimator=state_estimator)
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+import math
+
+import ccparams as cc
+from VehicleCounter import VehicleCounter
+from utils import get_par
+
+
+class StateEstimator:
+    """
+    Class which estimates the PAR_SPEED_AND_ACCELERATION state of background vehicles by constant-acceleration dead
+    reckoning from the last state read from SUMO, so that they do not have to be read every step. A vehicle is read
+    again once the error bound of its prediction exceeds the threshold, or when an event such as a lane change
+    invalidates the prediction. Platoon vehicles are always read, since their CACC depends on exact data.
+    """
+    # maximum error of a predicted position in meters
+    DEFAULT_THRESHOLD = 0.1
+    # largest difference between the last read and the actual acceleration which the error bound accounts for, in
+    # m/s^2. the accel and decel of the V2V_Car type
+    DEFAULT_MAX_ACCELERATION_CHANGE = 2.9 + 7.5
+
+    def __init__(self):
+        # None while estimation is disabled and every state is read
+        self.threshold = None
+        self.max_acceleration_change = self.DEFAULT_MAX_ACCELERATION_CHANGE
+        self.step_length = None
+        # number of steps for which a prediction stays within the threshold
+        self.horizon = 0
+        # vid -> (step, state, heading x, heading y) of the last state read
+        self.samples = dict()
+        # the simulation step which states are estimated for
+        self.step = 0
+        self.reads = 0
+        self.estimates = 0
+
+    def enable(self, step_length, threshold=DEFAULT_THRESHOLD, max_acceleration_change=DEFAULT_MAX_ACCELERATION_CHANGE):
+        """
+        Start estimating the state of background vehicles
+
+        :param step_length: the length of a simulation step in seconds
+        :param threshold: the maximum error of a predicted position in meters
+        :param max_acceleration_change: the largest change of acceleration between two reads in m/s^2
+        """
+        self.threshold = threshold
+        self.max_acceleration_change = max_acceleration_change
+        self.step_length = step_length
+        self.horizon = int(math.sqrt(2 * threshold / max_acceleration_change) / step_length)
+
+    def invalidate(self, vid):
+        """
+        Drop the prediction of a vehicle, e.g. because it changes lanes, so that its state is read the next time
+
+        :param vid: the traci vehicle id
+        """
+        self.samples.pop(vid, None)
+
+    def get_state(self, vid, connection):
+        """
+        Returns the unpacked PAR_SPEED_AND_ACCELERATION of a vehicle, i.e. (v, a, u, x, y, t, ...), either read from
+        SUMO or predicted
+
+        :param vid: the traci vehicle id
+        :param connection: the traci connection to read from
+        """
+        if self.threshold is None or vid.startswith(VehicleCounter.ID_PRE_PLATOON):
+            return cc.unpack(get_par(vid, cc.PAR_SPEED_AND_ACCELERATION, connection))
+
+        sample = self.samples.get(vid)
+        if sample is not None:
+            step, state, heading_x, heading_y = sample
+            if step == self.step:
+                return state
+            if heading_x is not None and self.step - step <= self.horizon:
+                self.estimates += 1
+                return self.predict(state, heading_x, heading_y, (self.step - step) * self.step_length)
+
+        state = cc.unpack(get_par(vid, cc.PAR_SPEED_AND_ACCELERATION, connection))
+        self.reads += 1
+        heading_x = heading_y = None
+        if sample is not None:
+            # the direction of travel since the previous read
+            dx = state[3] - sample[1][3]
+            dy = state[4] - sample[1][4]
+            distance = math.sqrt(dx ** 2 + dy ** 2)
+            if distance > 0:
+                heading_x = dx / distance
+                heading_y = dy / distance
+        self.samples[vid] = (self.step, state, heading_x, heading_y)
+        return state
+
+    @staticmethod
+    def predict(state, heading_x, heading_y, dt):
+        """
+        Returns the state of a vehicle dt seconds after the given state, assuming constant acceleration along the
+        given heading. A decelerating vehicle stops rather than reversing
+
+        :param state: the unpacked PAR_SPEED_AND_ACCELERATION
+        :param heading_x: x component of the unit vector of the direction of travel
+        :param heading_y: y component of the unit vector of the direction of travel
+        :param dt: the time to predict ahead in seconds
+        """
+        (v, a, u, x, y, t, *rest) = state
+        if a < 0 and v + a * dt < 0:
+            # the vehicle comes to a stop during dt
+            dt_stop = -v / a
+            distance = v * dt_stop + 0.5 * a * dt_stop ** 2
+            speed = 0.0
+        else:
+            distance = v * dt + 0.5 * a * dt ** 2
+            speed = v + a * dt
+        return [speed, a, u, x + heading_x * distance, y + heading_y * distance, t + dt] + rest
+
+    def reset(self):
+        """
+        Forget all predictions
+        """
+        self.samples = dict()
+        self.step = 0
+        self.reads = 0
+        self.estimates = 0
+
+
+state_estimator = StateEstimator()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+import math
+
+
+class RunningStatistics:
+    """
+    Class which keeps count, mean, variance, minimum and maximum of a stream of values in constant memory using
+    Welford's algorithm
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        """
+        Add a value to the statistics
+
+        :param value: the value to add
+        """
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        """
+        Add all values of other statistics to these statistics
+
+        :param other: the RunningStatistics to merge
+        """
+        if other.count == 0:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def get_variance(self):
+        """
+        Returns the population variance of the values added so far
+        """
+        if self.count == 0:
+            return 0.0
+        return self.m2 / self.count
+
+    def to_dict(self):
+        """
+        Returns the statistics as a dictionary
+        """
+        if self.count == 0:
+            return {"count": 0}
+        return {"count": self.count, "mean": self.mean, "std": math.sqrt(self.get_variance()),
+                "min": self.min, "max": self.max}
+
+
+class PlatoonMetrics:
+    """
+    Class which summarizes the overtaking behaviour of a platoon while the simulation runs, in constant memory
+    regardless of the length of the run
+    """
+
+    def __init__(self):
+        # gaps between consecutive platoon members, in meters
+        self.gap = RunningStatistics()
+        self.steps = 0
+        self.steps_below_desired_speed = 0
+        # (previous state name, next state name) -> count. bounded by the square of the number of PlatoonStates
+        self.state_transitions = dict()
+        self.lane_changes = 0
+        self.splits = 0
+        # steps at which a decision evaluation was postponed because the evaluation budget of the step was used up
+        self.deferred_evaluations = 0
+
+    def tick(self, below_desired_speed):
+        """
+        Account for one simulation step
+
+        :param below_desired_speed: whether the platoon drove slower than its desired speed during the step
+        """
+        self.steps += 1
+        if below_desired_speed:
+            self.steps_below_desired_speed += 1
+
+    def add_state_transition(self, previous_state, next_state):
+        """
+        Count a change of the PlatoonState
+
+        :param previous_state: the state before the change
+        :param next_state: the state after the change
+        """
+        key = (previous_state.name, next_state.name)
+        self.state_transitions[key] = self.state_transitions.get(key, 0) + 1
+
+    def merge(self, other):
+        """
+        Add the metrics of another platoon to these metrics
+
+        :param other: the PlatoonMetrics to merge
+        """
+        self.gap.merge(other.gap)
+        self.steps += other.steps
+        self.steps_below_desired_speed += other.steps_below_desired_speed
+        for key, count in other.state_transitions.items():
+            self.state_transitions[key] = self.state_transitions.get(key, 0) + count
+        self.lane_changes += other.lane_changes
+        self.splits += other.splits
+        self.deferred_evaluations += other.deferred_evaluations
+
+    def to_dict(self, step_length):
+        """
+        Returns the metrics as a dictionary
+
+        :param step_length: the length of a simulation step in seconds
+        """
+        return {
+            "gap": self.gap.to_dict(),
+            "time": self.steps * step_length,
+            "time_below_desired_speed": self.steps_below_desired_speed * step_length,
+            "state_transitions": {f"{previous} -> {following}": count
+                                  for (previous, following), count in self.state_transitions.items()},
+            "lane_changes": self.lane_changes,
+            "splits": self.splits,
+            "deferred_evaluations": self.deferred_evaluations,
+        }
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+
+import os
+import xml.etree.ElementTree as ElementTree
+from array import array
+
+import numpy as np
+
+# kinds of attribute values: numbers are stored as float64, text as int32 codes into the names of the column
+NUMBER = "number"
+TEXT = "text"
+
+# the outputs SUMO can write natively, by name: the sumo option, the file name, the element holding one record and
+# the attributes loaded from it. "time" of FCD records is taken from the enclosing timestep element
+FCD = "fcd"
+LANE_CHANGE = "lanechange"
+TRIP_INFO = "tripinfo"
+OUTPUTS = {
+    FCD: ("--fcd-output", "fcd.xml", "vehicle",
+          {"time": NUMBER, "id": TEXT, "x": NUMBER, "y": NUMBER, "speed": NUMBER, "pos": NUMBER, "lane": TEXT}),
+    LANE_CHANGE: ("--lanechange-output", "lanechange.xml", "change",
+                  {"time": NUMBER, "id": TEXT, "from": TEXT, "to": TEXT, "dir": NUMBER, "speed": NUMBER,
+                   "pos": NUMBER, "reason": TEXT}),
+    TRIP_INFO: ("--tripinfo-output", "tripinfo.xml", "tripinfo",
+                {"id": TEXT, "depart": NUMBER, "arrival": NUMBER, "duration": NUMBER, "routeLength": NUMBER,
+                 "waitingTime": NUMBER, "timeLoss": NUMBER}),
+}
+
+
+def get_arguments(directory, outputs):
+    """
+    Returns the sumo command line arguments which write the given outputs to a directory
+
+    :param directory: the directory of the output files, created if it does not exist
+    :param outputs: the names of the outputs, e.g. (FCD, TRIP_INFO)
+    """
+    os.makedirs(directory, exist_ok=True)
+    arguments = list()
+    for output in outputs:
+        option, file_name, _, _ = OUTPUTS[output]
+        arguments.extend((option, os.path.join(directory, file_name)))
+    return arguments
+
+
+class OutputTable:
+    """
+    The records of a SUMO output as one NumPy array per attribute. Text attributes, like vehicle and lane ids, are
+    stored as integer codes into the names of their column
+    """
+
+    def __init__(self, columns, names):
+        """
+        :param columns: attribute -> the array of its values
+        :param names: text attribute -> the list of its distinct values, indexed by code
+        """
+        self.columns = columns
+        self.names = names
+
+    def __getitem__(self, column):
+        return self.columns[column]
+
+    def __len__(self):
+        return len(next(iter(self.columns.values()), ()))
+
+    def decode(self, column):
+        """
+        Returns the values of a text column as strings
+
+        :param column: the name of the text attribute
+        """
+        return np.array(self.names[column], dtype=object)[self.columns[column]]
+
+    def get_code(self, column, name):
+        """
+        Returns the code of a value of a text column, or -1 if it does not occur
+
+        :param column: the name of the text attribute
+        :param name: the value, e.g. a vehicle id
+        """
+        try:
+            return self.names[column].index(name)
+        except ValueError:
+            return -1
+
+
+def load(path, output):
+    """
+    Loads a SUMO output file into an OutputTable. The file is parsed as a stream and every element is dropped once
+    its values are stored, so memory only grows with the compact columns and not with the XML tree
+
+    :param path: the path of the output file
+    :param output: the name of the output, e.g. FCD
+    """
+    _, _, tag, attributes = OUTPUTS[output]
+    values = {name: array('d') if kind == NUMBER else array('i') for name, kind in attributes.items()}
+    codes = {name: dict() for name, kind in attributes.items() if kind == TEXT}
+    numbers = [name for name, kind in attributes.items() if kind == NUMBER]
+    texts = list(codes)
+
+    root = None
+    time = float("nan")
+    for event, element in ElementTree.iterparse(path, events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = element
+            elif element.tag == "timestep":
+                time = float(element.get("time"))
+            continue
+        if element.tag == tag:
+            get = element.get
+            for name in numbers:
+                value = get(name)
+                if value is None and name == "time":
+                    values[name].append(time)
+                else:
+                    values[name].append(float("nan") if value is None else float(value))
+            for name in texts:
+                value = get(name, "")
+                code = codes[name].get(value)
+                if code is None:
+                    code = codes[name][value] = len(codes[name])
+                values[name].append(code)
+            element.clear()
+        if element.tag in (tag, "timestep"):
+            # the parsed elements are still children of the root, so drop them from it as well
+            root.clear()
+
+    columns = {name: np.frombuffer(column, dtype=np.float64 if name in numbers else np.int32)
+               for name, column in values.items()}
+    names = {name: list(code) for name, code in codes.items()}
+    return OutputTable(columns, names)
@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+
+import traci.constants as tc
+from traci.exceptions import TraCIException
+
+# variables of every vehicle around a platoon leader, delivered together with each simulation step
+SUBSCRIBED_VARIABLES = (tc.VAR_ROAD_ID, tc.VAR_LANE_INDEX, tc.VAR_LANEPOSITION, tc.VAR_LENGTH, tc.VAR_MINGAP)
+
+
+class Surroundings:
+    """
+    Answers the radar and neighbour queries of a platoon from a SUMO context subscription around its leader, so that
+    only the vehicles near a platoon are transferred each step instead of being queried one by one. It offers the
+    vehicle domain methods the decision logic of the Platoon uses, with the same results for every vehicle within
+    the range. Vehicles outside of it are not seen, which the decision logic does not need, and queries which cannot
+    be answered from the subscription, like those for vehicles on different edges, are passed on to traci
+    """
+    DEFAULT_RADAR_DISTANCE = 160
+
+    def __init__(self, platoon, radar_distance=DEFAULT_RADAR_DISTANCE):
+        """
+        :param platoon: the Platoon whose surroundings are subscribed to
+        :param radar_distance: how far ahead of the platoon leader vehicles are seen, in meters
+        """
+        self.platoon = platoon
+        self.radar_distance = radar_distance
+        # the vehicle and the range of the current subscription
+        self.leader = None
+        self.range = None
+        # the vehicles around the platoon at the step they were collected, pointing to their SUBSCRIBED_VARIABLES
+        self.vehicles = dict()
+        self.step = None
+
+    @property
+    def connection(self):
+        return self.platoon.connection
+
+    def get_range(self):
+        """
+        Returns the range of the subscription which covers the whole platoon, the radar distance ahead of it and the
+        neighbours of its last vehicle
+        """
+        return self.platoon.get_total_length() + self.radar_distance
+
+    def update(self):
+        """
+        Subscribe around the current platoon leader, or move the subscription after the platoon leader or the length
+        of the platoon changed
+        """
+        leader = self.platoon.vehicles[0]
+        radius = self.get_range()
+        if leader == self.leader and radius == self.range:
+            return
+        self.unsubscribe()
+        try:
+            self.connection.vehicle.subscribeContext(leader, tc.CMD_GET_VEHICLE_VARIABLE, radius, SUBSCRIBED_VARIABLES)
+        except TraCIException:
+            # the leader has not been inserted yet, so try again the next step
+            return
+        self.leader = leader
+        self.range = radius
+        self.step = None
+
+    def unsubscribe(self):
+        """
+        Cancel the current subscription, if any
+        """
+        if self.leader is None:
+            return
+        try:
+            self.connection.vehicle.unsubscribeContext(self.leader, tc.CMD_GET_VEHICLE_VARIABLE, self.range)
+        except TraCIException:
+            # the vehicle left the simulation, which ended its subscriptions
+            pass
+        self.leader = None
+        self.range = None
+        self.step = None
+
+    def get_vehicles(self):
+        """
+        Returns the vehicles around the platoon leader during the current step, pointing to their subscribed
+        variables, or an empty dictionary if there is no subscription
+        """
+        if self.leader is None:
+            return dict()
+        if self.step != self.platoon.step:
+            self.vehicles = dict(self.connection.vehicle.getContextSubscriptionResults(self.leader) or {})
+            if self.leader not in self.vehicles:
+                # depending on the SUMO version the results do not include the vehicle subscribed around
+                self.vehicles[self.leader] = {
+                    tc.VAR_ROAD_ID: self.connection.vehicle.getRoadID(self.leader),
+                    tc.VAR_LANE_INDEX: self.connection.vehicle.getLaneIndex(self.leader),
+                    tc.VAR_LANEPOSITION: self.connection.vehicle.getLanePosition(self.leader),
+                    tc.VAR_LENGTH: self.platoon.vehicle_length,
+                    tc.VAR_MINGAP: self.platoon.min_gap,
+                }
+            self.step = self.platoon.step
+        return self.vehicles
+
+    def find(self, vid, offset, ahead):
+        """
+        Returns the nearest vehicle ahead of or behind the given one in the lane at the given offset from its lane,
+        as a (vid, gap) tuple where the gap excludes the minimum gap of the follower like traci does. Returns None if
+        there is no such vehicle within the range, and False if the query cannot be answered from the subscription
+
+        :param vid: the traci vehicle id
+        :param offset: the lane offset, 0 for the own lane, 1 for the left and -1 for the right lane
+        :param ahead: whether to find the vehicle ahead, i.e. the leader, or the follower
+        """
+        vehicles = self.get_vehicles()
+        ego = vehicles.get(vid)
+        if ego is None:
+            return False
+        lane = ego[tc.VAR_LANE_INDEX] + offset
+        position = ego[tc.VAR_LANEPOSITION]
+        nearest = None
+        for other, values in vehicles.items():
+            if other == vid or values[tc.VAR_LANE_INDEX] != lane:
+                continue
+            if values[tc.VAR_ROAD_ID] != ego[tc.VAR_ROAD_ID]:
+                # lane positions on different edges cannot be compared
+                return False
+            other_position = values[tc.VAR_LANEPOSITION]
+            # in the own lane a leader is strictly ahead, in the adjacent lanes it may drive alongside
+            if ahead and (other_position > position or offset != 0 and other_position == position):
+                gap = other_position - values[tc.VAR_LENGTH] - position - ego[tc.VAR_MINGAP]
+            elif not ahead and other_position < position:
+                gap = position - ego[tc.VAR_LENGTH] - other_position - values[tc.VAR_MINGAP]
+            else:
+                continue
+            if nearest is None or gap < nearest[1]:
+                nearest = (other, gap)
+        return nearest
+
+    def find_neighbour(self, vid, offset, ahead, query):
+        nearest = self.find(vid, offset, ahead)
+        if nearest is False:
+            return getattr(self.connection.vehicle, query)(vid)
+        return () if nearest is None else (nearest,)
+
+    def getLeader(self, vid, dist=100.0):
+        nearest = self.find(vid, 0, True)
+        if nearest is False:
+            return self.connection.vehicle.getLeader(vid, dist)
+        return nearest
+
+    def getLeftLeaders(self, vid):
+        return self.find_neighbour(vid, 1, True, "getLeftLeaders")
+
+    def getLeftFollowers(self, vid):
+        return self.find_neighbour(vid, 1, False, "getLeftFollowers")
+
+    def getRightLeaders(self, vid):
+        return self.find_neighbour(vid, -1, True, "getRightLeaders")
+
+    def getRightFollowers(self, vid):
+        return self.find_neighbour(vid, -1, False, "getRightFollowers")
+
+    def getLaneIndex(self, vid):
+        values = self.get_vehicles().get(vid)
+        if values is None:
+            return self.connection.vehicle.getLaneIndex(vid)
+        return values[tc.VAR_LANE_INDEX]
+
+    def getRoadID(self, vid):
+        values = self.get_vehicles().get(vid)
+        if values is None:
+            return self.connection.vehicle.getRoadID(vid)
+        return values[tc.VAR_ROAD_ID]
+
+    def getLanePosition(self, vid):
+        values = self.get_vehicles().get(vid)
+        if values is None:
+            return self.connection.vehicle.getLanePosition(vid)
+        return values[tc.VAR_LANEPOSITION]
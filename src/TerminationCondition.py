@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+from PlatoonState import PlatoonState
+
+
+class TerminationCondition:
+    """
+    Base class for a condition which ends Simulation.run once it is met. Conditions are evaluated before every step
+    from data which the simulation has at hand anyway, and can be combined with | (any of) and & (all of)
+    """
+
+    def start(self, simulation, step_length):
+        """
+        Prepare the condition for a new run
+
+        :param simulation: the Simulation which is about to run
+        :param step_length: the length of a simulation step in seconds
+        """
+        self.step_length = step_length
+
+    def is_met(self, simulation):
+        """
+        Returns whether the simulation should end before its next step
+
+        :param simulation: the running Simulation
+        """
+        raise NotImplementedError
+
+    def __or__(self, other):
+        return AnyCondition(self, other)
+
+    def __and__(self, other):
+        return AllCondition(self, other)
+
+
+class AnyCondition(TerminationCondition):
+    """
+    Condition which is met as soon as any of its conditions is met
+    """
+
+    def __init__(self, *conditions):
+        self.conditions = conditions
+
+    def start(self, simulation, step_length):
+        for condition in self.conditions:
+            condition.start(simulation, step_length)
+
+    def is_met(self, simulation):
+        # every condition is evaluated, so that conditions which count steps see every step
+        return sum(condition.is_met(simulation) for condition in self.conditions) > 0
+
+
+class AllCondition(AnyCondition):
+    """
+    Condition which is met when all of its conditions are met at the same step
+    """
+
+    def is_met(self, simulation):
+        return sum(condition.is_met(simulation) for condition in self.conditions) == len(self.conditions)
+
+
+class TimeLimit(TerminationCondition):
+    """
+    Condition which is met once the simulation ran for the given time
+    """
+
+    def __init__(self, seconds):
+        """
+        :param seconds: the simulated time in seconds
+        """
+        self.seconds = seconds
+
+    def start(self, simulation, step_length):
+        self.max_step = self.seconds / step_length
+
+    def is_met(self, simulation):
+        return simulation.step > self.max_step
+
+
+class DistanceLimit(TerminationCondition):
+    """
+    Condition which is met once every platoon vehicle drove the given distance, i.e. the rearmost one of all
+    platoons including those created by splits. Between two reads of the driven distances, no read happens before
+    the distance could have been covered at the maximum speed of a platoon vehicle
+    """
+
+    def __init__(self, distance, vehicle_type="PlatoonCar"):
+        """
+        :param distance: the distance in meters
+        :param vehicle_type: the vehicle type of the platoon vehicles
+        """
+        self.distance = distance
+        self.vehicle_type = vehicle_type
+
+    def start(self, simulation, step_length):
+        self.step_length = step_length
+        self.max_speed = simulation.connection.vehicletype.getMaxSpeed(self.vehicle_type)
+        self.next_read_step = 0
+
+    def is_met(self, simulation):
+        if simulation.step < self.next_read_step:
+            return False
+        platoons = simulation.context.platoon_manager.platoons
+        if len(platoons) == 0:
+            return False
+        # the last vehicle of each platoon is the one which drove the least distance
+        driven = min(simulation.connection.vehicle.getDistance(p.vehicles[-1]) for p in platoons)
+        if driven >= self.distance:
+            return True
+        self.next_read_step = simulation.step + max(1, int((self.distance - driven) /
+                                                           (self.max_speed * self.step_length)))
+        return False
+
+
+class HeldCondition(TerminationCondition):
+    """
+    Base class for a condition which is met once a property of the platoons held for the given time without
+    interruption
+    """
+
+    def __init__(self, seconds):
+        """
+        :param seconds: the time in seconds the property has to hold
+        """
+        self.seconds = seconds
+
+    def start(self, simulation, step_length):
+        self.steps = self.seconds / step_length
+        self.held_steps = 0
+
+    def holds(self, simulation):
+        """
+        Returns whether the property holds at the current step
+
+        :param simulation: the running Simulation
+        """
+        raise NotImplementedError
+
+    def is_met(self, simulation):
+        if self.holds(simulation):
+            self.held_steps += 1
+        else:
+            self.held_steps = 0
+        return self.held_steps > self.steps
+
+
+class PlatoonsCruising(HeldCondition):
+    """
+    Condition which is met once all platoons cruised at their desired speed for the given time
+    """
+
+    def __init__(self, seconds, tolerance=0.5):
+        """
+        :param seconds: the time in seconds the platoons have to cruise
+        :param tolerance: how much slower than the desired speed a platoon may be, in m/s
+        """
+        super().__init__(seconds)
+        self.tolerance = tolerance
+
+    def holds(self, simulation):
+        platoons = simulation.context.platoon_manager.platoons
+        if len(platoons) == 0:
+            return False
+        for p in platoons:
+            if p.state != PlatoonState.STATE_CRUISING or p.speed is None or \
+                    p.speed < p.desired_speed - self.tolerance:
+                return False
+        return True
+
+
+class NoStateChange(HeldCondition):
+    """
+    Condition which is met once no platoon changed its state or split for the given time
+    """
+
+    def start(self, simulation, step_length):
+        super().start(simulation, step_length)
+        self.states = None
+
+    def holds(self, simulation):
+        states = tuple(p.state for p in simulation.context.platoon_manager.platoons)
+        unchanged = states == self.states
+        self.states = states
+        return unchanged
+
+
+class LaneChangesMade(TerminationCondition):
+    """
+    Condition which is met once the platoons made the given number of lane changes in total, e.g. to only let
+    PlatoonsCruising end the simulation after an overtaking manoeuvre
+    """
+
+    def __init__(self, count=1):
+        """
+        :param count: the number of lane changes
+        """
+        self.count = count
+
+    def is_met(self, simulation):
+        platoons = simulation.context.platoon_manager.platoons
+        return sum(p.metrics.lane_changes for p in platoons) >= self.count
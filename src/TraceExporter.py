@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+import json
+import os
+from contextlib import nullcontext
+from time import perf_counter_ns
+
+# returned instead of a span while tracing is disabled or the current step is not sampled
+NULL_SPAN = nullcontext()
+
+
+class Span:
+    """
+    Context manager which adds a complete event covering the time spent inside of it to a TraceExporter
+    """
+    __slots__ = ("exporter", "name", "category", "track", "args", "start")
+
+    def __init__(self, exporter, name, category, track, args):
+        self.exporter = exporter
+        self.name = name
+        self.category = category
+        self.track = track
+        self.args = args
+        self.start = 0
+
+    def __enter__(self):
+        self.start = perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.exporter.add_event("X", self.name, self.category, self.track, self.start, perf_counter_ns(), self.args)
+        return False
+
+
+class TraceExporter:
+    """
+    Class which writes a trace in the Chrome trace event format, which can be opened in Perfetto or chrome://tracing.
+    Events are kept in a bounded buffer which is appended to the trace file whenever it is full, and only every k-th
+    simulation step is traced.
+    """
+    SIMULATION_TRACK = "simulation"
+
+    CATEGORY_STEP = "step"
+    CATEGORY_PLATOON = "platoon"
+    CATEGORY_DECISION = "decision"
+
+    DEFAULT_BUFFER_SIZE = 10000
+
+    def __init__(self, path, every=1, buffer_size=DEFAULT_BUFFER_SIZE):
+        """
+        :param path: the path of the trace file
+        :param every: trace only every k-th simulation step
+        :param buffer_size: the number of events kept in memory before they are written to the trace file
+        """
+        self.path = path
+        self.every = every
+        self.buffer_size = buffer_size
+        self.buffer = list()
+        # track name -> thread id of the track in the trace
+        self.tracks = dict()
+        self.sampled = True
+        self.step = 0
+        self.pid = os.getpid()
+        self.origin = perf_counter_ns()
+
+        self.file = open(path, "w")
+        self.file.write("[\n")
+        self.separator = ""
+
+    def set_step(self, step):
+        """
+        Start tracing a new simulation step
+
+        :param step: the current simulation step
+        """
+        self.step = step
+        self.sampled = step % self.every == 0
+
+    def get_track(self, name):
+        """
+        Returns the thread id which the events of the given track are written to, naming the track on first use
+
+        :param name: the name of the track, e.g. the platoon
+        """
+        tid = self.tracks.get(name)
+        if tid is None:
+            tid = len(self.tracks)
+            self.tracks[name] = tid
+            self.buffer.append({"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid, "args": {"name": name}})
+        return tid
+
+    def span(self, name, category, track=SIMULATION_TRACK, **args):
+        """
+        Returns a context manager which traces the time spent inside of it
+
+        :param name: the name of the span
+        :param category: the category of the span
+        :param track: the track to show the span on
+        :param args: additional values to show with the span
+        """
+        if not self.sampled:
+            return NULL_SPAN
+        return Span(self, name, category, track, args)
+
+    def instant(self, name, category, track=SIMULATION_TRACK, **args):
+        """
+        Trace an event which has no duration, e.g. a state transition. These events are rare, so they are traced
+        in every step, sampled or not
+
+        :param name: the name of the event
+        :param category: the category of the event
+        :param track: the track to show the event on
+        :param args: additional values to show with the event
+        """
+        now = perf_counter_ns()
+        self.add_event("i", name, category, track, now, now, args)
+
+    def add_event(self, phase, name, category, track, start, end, args):
+        """
+        Add an event to the buffer, writing the buffer to the trace file when it is full
+
+        :param phase: the trace event phase, "X" for complete events and "i" for instant events
+        :param start: the perf_counter_ns() value when the event started
+        :param end: the perf_counter_ns() value when the event ended
+        """
+        event = {"name": name, "cat": category, "ph": phase, "pid": self.pid, "tid": self.get_track(track),
+                 "ts": (start - self.origin) / 1000}
+        if phase == "X":
+            event["dur"] = (end - start) / 1000
+        else:
+            event["s"] = "t"
+        args["step"] = self.step
+        event["args"] = args
+        self.buffer.append(event)
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Append the buffered events to the trace file
+        """
+        for event in self.buffer:
+            self.file.write(self.separator)
+            self.file.write(json.dumps(event))
+            self.separator = ",\n"
+        self.buffer.clear()
+
+    def close(self):
+        """
+        Write the remaining events and complete the trace file
+        """
+        self.flush()
+        self.file.write("\n]\n")
+        self.file.close()
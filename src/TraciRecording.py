@@ -0,0 +1,279 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+
+import gzip
+import marshal
+import pickle
+import struct
+
+from traci.domain import DOMAINS, Domain
+from traci.exceptions import TraCIException
+
+# the names of the traci domains (vehicle, edge, ...), which are proxied rather than called
+DOMAIN_NAMES = {domain._name for domain in DOMAINS}
+
+
+class ReplayDivergence(Exception):
+    """
+    Raised when a replayed simulation issues other traci calls than the recorded one
+    """
+
+
+class TraciRecording:
+    """
+    A compact binary log of the traci calls of a simulation and their results, written while recording and read back
+    while replaying. The log is a gzip stream of length prefixed records, marshalled or, for results marshal cannot
+    encode, pickled. A call record is a (command code, arguments, keyword arguments, error, result) tuple, where the
+    error is the message of a TraCIException raised by the call or None. The first call of each command is preceded
+    by a (command,) record which assigns it the next code
+    """
+    MAGIC = b"TRACI-RECORDING-1\n"
+
+    MARSHAL = 0
+    PICKLE = 1
+    HEADER = struct.Struct("<BI")
+
+    def __init__(self, path, replay=False):
+        """
+        :param path: the path of the recording
+        :param replay: whether to read the recording back rather than write a new one
+        """
+        self.path = path
+        self.replay = replay
+        self.file = gzip.open(path, "rb" if replay else "wb")
+        # command -> code while recording, code -> command while replaying
+        self.codes = dict() if not replay else list()
+        self.calls = 0
+        # the number of simulation steps recorded or replayed so far, to tell where a replay diverged
+        self.steps = 0
+        if replay:
+            if self.file.read(len(self.MAGIC)) != self.MAGIC:
+                raise ValueError(f"{path} is not a traci recording")
+        else:
+            self.file.write(self.MAGIC)
+
+    def write_record(self, record):
+        """
+        Append a record to the recording
+
+        :param record: a tuple of values marshal or pickle can encode
+        """
+        try:
+            kind, data = self.MARSHAL, marshal.dumps(record)
+        except ValueError:
+            kind, data = self.PICKLE, pickle.dumps(record, pickle.HIGHEST_PROTOCOL)
+        self.file.write(self.HEADER.pack(kind, len(data)))
+        self.file.write(data)
+
+    def read_record(self):
+        """
+        Returns the next record of the recording, or None at its end
+        """
+        header = self.file.read(self.HEADER.size)
+        if not header:
+            return None
+        kind, size = self.HEADER.unpack(header)
+        data = self.file.read(size)
+        return marshal.loads(data) if kind == self.MARSHAL else pickle.loads(data)
+
+    def record(self, command, args, kwargs, error, result):
+        """
+        Record a traci call
+
+        :param command: the name of the command, e.g. vehicle.getParameter
+        :param args: the positional arguments of the call
+        :param kwargs: the keyword arguments of the call
+        :param error: the message of the TraCIException raised by the call, or None
+        :param result: the result of the call
+        """
+        code = self.codes.get(command)
+        if code is None:
+            code = self.codes[command] = len(self.codes)
+            self.write_record((command,))
+        self.write_record((code, args, kwargs or None, error, result))
+        self.calls += 1
+        if command == "simulationStep":
+            self.steps += 1
+
+    def replay_call(self, command, args, kwargs):
+        """
+        Returns the recorded result of a traci call, raising the TraCIException it raised
+
+        :param command: the name of the command, e.g. vehicle.getParameter
+        :param args: the positional arguments of the call
+        :param kwargs: the keyword arguments of the call
+        :raises ReplayDivergence: if the call is not the next recorded one
+        """
+        record = self.read_record()
+        while record is not None and len(record) == 1:
+            self.codes.append(record[0])
+            record = self.read_record()
+        if record is None:
+            raise ReplayDivergence(f"call {self.calls} in step {self.steps}: {format_call(command, args, kwargs)} "
+                                   f"was issued after the end of the recording")
+        code, recorded_args, recorded_kwargs, error, result = record
+        recorded = self.codes[code]
+        if recorded != command or recorded_args != args or (recorded_kwargs or {}) != kwargs:
+            raise ReplayDivergence(f"call {self.calls} in step {self.steps}: expected "
+                                   f"{format_call(recorded, recorded_args, recorded_kwargs or {})}, got "
+                                   f"{format_call(command, args, kwargs)}")
+        self.calls += 1
+        if command == "simulationStep":
+            self.steps += 1
+        if error is not None:
+            raise TraCIException(error)
+        return result
+
+    def close(self):
+        """
+        Close the recording
+
+        :raises ReplayDivergence: if a replay did not issue all recorded calls
+        """
+        if self.file is None:
+            return
+        remaining = 0
+        if self.replay:
+            while True:
+                record = self.read_record()
+                if record is None:
+                    break
+                remaining += len(record) > 1
+        self.file.close()
+        self.file = None
+        if remaining:
+            raise ReplayDivergence(f"the replay ended after {self.calls} calls in step {self.steps}, {remaining} "
+                                   f"recorded calls were not issued")
+
+
+def format_call(command, args, kwargs):
+    """
+    Returns a traci call as it would be written in Python
+    """
+    arguments = [repr(arg) for arg in args] + [f"{key}={value!r}" for key, value in kwargs.items()]
+    return f"{command}({', '.join(arguments)})"
+
+
+def record_function(function, command, recording):
+    """
+    Returns a wrapper of the given traci function which records every call and its result
+    """
+    def call(*args, **kwargs):
+        try:
+            result = function(*args, **kwargs)
+        except TraCIException as e:
+            recording.record(command, args, kwargs, str(e), None)
+            raise
+        recording.record(command, args, kwargs, None, result)
+        return result
+    return call
+
+
+def replay_function(command, recording):
+    """
+    Returns a stand-in for a traci function which serves the recorded results
+    """
+    def call(*args, **kwargs):
+        return recording.replay_call(command, args, kwargs)
+    return call
+
+
+class RecordingDomain:
+    """
+    Proxy of a traci domain (vehicle, edge, ...) which records every call to a TraciRecording
+    """
+
+    def __init__(self, domain, name, recording):
+        self._domain = domain
+        self._name = name
+        self._recording = recording
+
+    def __getattr__(self, name):
+        attribute = getattr(self._domain, name)
+        if not callable(attribute):
+            return attribute
+        call = record_function(attribute, f"{self._name}.{name}", self._recording)
+        # cache the wrapper, so that __getattr__ is only hit on the first call of each function
+        setattr(self, name, call)
+        return call
+
+
+class RecordingConnection:
+    """
+    Proxy of a traci connection which records every call and its result to a TraciRecording
+    """
+
+    def __init__(self, connection, recording):
+        self._connection = connection
+        self._recording = recording
+
+    def __getattr__(self, name):
+        attribute = getattr(self._connection, name)
+        if name == "close":
+            # closing is up to the SimulationContext, which does not close a replayed connection
+            return attribute
+        if isinstance(attribute, Domain) or name in DOMAIN_NAMES:
+            wrapped = RecordingDomain(attribute, name, self._recording)
+        elif callable(attribute):
+            wrapped = record_function(attribute, name, self._recording)
+        else:
+            return attribute
+        setattr(self, name, wrapped)
+        return wrapped
+
+
+class ReplayDomain:
+    """
+    Stand-in for a traci domain (vehicle, edge, ...) which serves the results recorded in a TraciRecording
+    """
+
+    def __init__(self, name, recording):
+        self._name = name
+        self._recording = recording
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        call = replay_function(f"{self._name}.{name}", self._recording)
+        setattr(self, name, call)
+        return call
+
+
+class ReplayConnection:
+    """
+    Stand-in for a traci connection which serves the results recorded in a TraciRecording without SUMO, in the order
+    they were recorded, and raises a ReplayDivergence as soon as the simulation issues another call than the recorded
+    one
+    """
+
+    def __init__(self, recording):
+        self._recording = recording
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        if name in DOMAIN_NAMES:
+            wrapped = ReplayDomain(name, self._recording)
+        else:
+            wrapped = replay_function(name, self._recording)
+        setattr(self, name, wrapped)
+        return wrapped
@@ -0,0 +1,285 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+import argparse
+import json
+import os
+
+import matplotlib.pyplot as plt
+import numpy as np
+
+from TrajectoryRecorder import METADATA_FILE
+
+# number of bins a series is reduced to before plotting, roughly the horizontal resolution of a figure
+DEFAULT_PLOT_BINS = 2000
+
+
+def decimate_min_max(x, y, bins=DEFAULT_PLOT_BINS):
+    """
+    Reduces a series to the minimum and maximum of each of (bins) equally sized bins, in their original order, so that
+    the plotted envelope of the series stays the same. The last bin also holds the remainder of the division
+
+    :param x: the x values of the series
+    :param y: the y values of the series
+    :param bins: the number of bins
+    :return: the decimated x and y values
+    """
+    n = len(y)
+    if n <= 2 * bins:
+        return x, y
+    size = n // bins
+    m = size * bins
+    binned = y[:m].reshape(bins, size)
+    start = np.arange(bins) * size
+    lo = binned.argmin(axis=1) + start
+    hi = binned.argmax(axis=1) + start
+    if m < n:
+        last = start[-1]
+        lo[-1] = y[last:].argmin() + last
+        hi[-1] = y[last:].argmax() + last
+    index = np.empty(2 * bins + 1, dtype=np.intp)
+    index[0:-1:2] = np.minimum(lo, hi)
+    index[1:-1:2] = np.maximum(lo, hi)
+    index[-1] = n - 1
+    return x[index], y[index]
+
+
+class TrajectoryAnalyzer:
+    """
+    Class which computes overtaking metrics and plots from the chunks written by a TrajectoryRecorder without
+    re-simulating the run
+    """
+
+    def __init__(self, directory):
+        """
+        :param directory: the directory the TrajectoryRecorder wrote to
+        """
+        self.directory = directory
+        with open(os.path.join(directory, METADATA_FILE)) as f:
+            self.metadata = json.load(f)
+        self.chunks = [np.load(os.path.join(directory, chunk), mmap_mode='r') for chunk in self.metadata["chunks"]]
+        self.vehicles = self.metadata["vehicles"]
+        self.states = {value: name for name, value in self.metadata["states"].items()}
+        # the time between two recorded samples
+        self.sample_time = self.metadata["step_length"] * self.metadata["every"]
+        self._order = None
+
+    def column(self, name):
+        """
+        Returns a recorded column of all chunks. Only this column is read from the memory-mapped chunks
+
+        :param name: the name of the column, see TrajectoryRecorder.RECORD_DTYPE
+        """
+        if len(self.chunks) == 0:
+            return np.empty(0)
+        return np.concatenate([chunk[name] for chunk in self.chunks])
+
+    def get_time(self):
+        """
+        Returns the simulation time of each row in seconds
+        """
+        return self.column('step') * self.metadata["step_length"]
+
+    def get_route_position(self):
+        """
+        Returns the position of each row along the route. The odometer of every vehicle is shifted by its lane position
+        at its first sample, so that positions of different vehicles can be compared
+        """
+        vehicle = self.column('vehicle')
+        distance = self.column('distance')
+        lane_position = self.column('lane_position')
+        # rows are in step order, so the first occurrence of a vehicle is its first sample
+        codes, first = np.unique(vehicle, return_index=True)
+        offset = np.zeros(len(self.vehicles))
+        offset[codes] = lane_position[first] - distance[first]
+        return distance + offset[vehicle]
+
+    def get_vehicle_order(self):
+        """
+        Returns the row indices grouped by vehicle and the number of rows of each vehicle, keeping the step order
+        within each vehicle
+        """
+        if self._order is None:
+            vehicle = self.column('vehicle')
+            order = np.argsort(vehicle, kind='stable')
+            counts = np.bincount(vehicle, minlength=len(self.vehicles))
+            self._order = order, counts
+        return self._order
+
+    def split_by_vehicle(self, values):
+        """
+        Splits a column into one array per vehicle
+
+        :param values: the column values of all rows
+        :return: a dictionary from the traci vehicle id to the values of that vehicle
+        """
+        order, counts = self.get_vehicle_order()
+        parts = np.split(values[order], np.cumsum(counts)[:-1])
+        return {vid: part for vid, part in zip(self.vehicles, parts) if len(part) > 0}
+
+    def get_time_in_states(self):
+        """
+        Returns the time in seconds each platoon spent in each PlatoonState
+
+        :return: a dictionary from the platoon index to a dictionary from the PlatoonState name to the time in seconds
+        """
+        platoon = self.column('platoon')
+        members = platoon >= 0
+        step = self.column('step')[members]
+        state = self.column('state')[members]
+        platoon = platoon[members]
+        # every member carries the state of its platoon, so count each (step, platoon) once
+        _, first = np.unique(np.stack([step, platoon]), axis=1, return_index=True)
+        keys, counts = np.unique(np.stack([platoon[first], state[first]]), axis=1, return_counts=True)
+        result = dict()
+        for (p, s), count in zip(keys.T, counts):
+            result.setdefault(int(p), dict())[self.states[int(s)]] = count * self.sample_time
+        return result
+
+    def get_split_count(self):
+        """
+        Returns the number of splits, i.e. the number of platoons which first appeared after the first recorded step
+        """
+        platoon = self.column('platoon')
+        members = platoon >= 0
+        if not np.any(members):
+            return 0
+        step = self.column('step')[members]
+        codes, first = np.unique(platoon[members], return_index=True)
+        return int(np.count_nonzero(step[first] > step[0]))
+
+    def get_gaps(self):
+        """
+        Returns the bumper to bumper gap of every platoon member to the platoon member in front of it
+
+        :return: a tuple of the row indices of the following vehicles and their gaps in meters
+        """
+        platoon = self.column('platoon')
+        members = np.flatnonzero(platoon >= 0)
+        step = self.column('step')[members]
+        position = self.get_route_position()[members]
+        lengths = np.array([length or 0 for length in self.metadata["vehicle_lengths"]])
+        rear = position - lengths[self.column('vehicle')[members]]
+        platoon = platoon[members]
+        # sort by step, platoon and descending position, so that the vehicle in front precedes its follower
+        order = np.lexsort((-position, platoon, step))
+        same_platoon = (step[order][1:] == step[order][:-1]) & (platoon[order][1:] == platoon[order][:-1])
+        gaps = rear[order][:-1] - position[order][1:]
+        return members[order][1:][same_platoon], gaps[same_platoon]
+
+    def get_gap_statistics(self):
+        """
+        Returns statistics of the gaps between consecutive platoon members
+
+        :return: a dictionary with the count, mean, standard deviation, minimum and maximum gap in meters
+        """
+        _, gaps = self.get_gaps()
+        if len(gaps) == 0:
+            return {"count": 0}
+        return {"count": int(len(gaps)), "mean": float(gaps.mean()), "std": float(gaps.std()),
+                "min": float(gaps.min()), "max": float(gaps.max())}
+
+    def get_time_lost(self):
+        """
+        Returns the time each platoon member lost against driving at the desired speed of its platoon
+
+        :return: a dictionary from the traci vehicle id to the time lost in seconds
+        """
+        platoon = self.column('platoon')
+        members = platoon >= 0
+        desired_speed = np.array(self.metadata["desired_speeds"], dtype=float)[platoon[members]]
+        speed = self.column('speed')[members]
+        lost = np.clip(1 - speed / desired_speed, 0, None) * self.sample_time
+        vehicle = self.column('vehicle')[members]
+        totals = np.bincount(vehicle, weights=lost, minlength=len(self.vehicles))
+        return {self.vehicles[code]: float(totals[code]) for code in np.unique(vehicle)}
+
+    def get_metrics(self):
+        """
+        Returns all overtaking metrics of the recorded run
+        """
+        return {
+            "time_in_states": self.get_time_in_states(),
+            "splits": self.get_split_count(),
+            "gaps": self.get_gap_statistics(),
+            "time_lost": self.get_time_lost(),
+        }
+
+    def plot_series(self, ax, values, bins=DEFAULT_PLOT_BINS, vehicles=None):
+        """
+        Plot one decimated line per vehicle of the given column against the simulation time
+
+        :param ax: the matplotlib axes to plot into
+        :param values: the column values of all rows
+        :param bins: the number of bins each line is decimated to
+        :param vehicles: the traci vehicle ids to plot, all vehicles if None
+        """
+        times = self.split_by_vehicle(self.get_time())
+        for vid, series in self.split_by_vehicle(values).items():
+            if vehicles is not None and vid not in vehicles:
+                continue
+            t, y = decimate_min_max(times[vid], series, bins)
+            ax.plot(t, y, linewidth=0.8, label=vid)
+
+    def plot_space_time(self, ax=None, bins=DEFAULT_PLOT_BINS, vehicles=None):
+        """
+        Plot the position along the route of each vehicle against the simulation time
+
+        :return: the matplotlib axes
+        """
+        if ax is None:
+            _, ax = plt.subplots()
+        self.plot_series(ax, self.get_route_position(), bins, vehicles)
+        ax.set_xlabel("time [s]")
+        ax.set_ylabel("position [m]")
+        return ax
+
+    def plot_speed(self, ax=None, bins=DEFAULT_PLOT_BINS, vehicles=None):
+        """
+        Plot the speed of each vehicle against the simulation time
+
+        :return: the matplotlib axes
+        """
+        if ax is None:
+            _, ax = plt.subplots()
+        self.plot_series(ax, self.column('speed'), bins, vehicles)
+        ax.set_xlabel("time [s]")
+        ax.set_ylabel("speed [m/s]")
+        return ax
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print the overtaking metrics and plot a recorded run")
+    parser.add_argument("directory", help="the directory written by the TrajectoryRecorder")
+    parser.add_argument("--bins", type=int, default=DEFAULT_PLOT_BINS, help="the number of bins per plotted line")
+    parser.add_argument("--output", help="save the plots to this file instead of showing them")
+    arguments = parser.parse_args()
+
+    analyzer = TrajectoryAnalyzer(arguments.directory)
+    print(json.dumps(analyzer.get_metrics(), indent=2))
+
+    _, (space_time_ax, speed_ax) = plt.subplots(2, 1, sharex=True)
+    analyzer.plot_space_time(space_time_ax, arguments.bins)
+    analyzer.plot_speed(speed_ax, arguments.bins)
+    if arguments.output is None:
+        plt.show()
+    else:
+        plt.savefig(arguments.output)
@@ -0,0 +1,266 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+from TrajectoryAnalyzer import TrajectoryAnalyzer
+from TrajectoryRecorder import TrajectoryRecorder
+
+# files written next to the recorded trajectories of a run, see prepare_run()
+EVENTS_FILE = "events.jsonl"
+RUN_FILE = "run.json"
+
+# the events whose order and timing are compared, each per platoon leader
+COMPARED_EVENTS = ("platoon_state_change", "platoon_split")
+# the fields of the compared events which have to be equal, besides the step
+COMPARED_FIELDS = {"platoon_state_change": ("previous", "next"), "platoon_split": ("index", "rear_leader")}
+
+
+def load_events(directory):
+    """
+    Returns the compared events of a recorded run
+
+    :param directory: the directory of the run
+    :return: a dictionary from (event, leader) to the list of (step, fields) of the events, in logged order
+    """
+    events = dict()
+    with open(os.path.join(directory, EVENTS_FILE)) as f:
+        for line in f:
+            record = json.loads(line)
+            event = record["event"]
+            if event in COMPARED_EVENTS:
+                fields = tuple(record[name] for name in COMPARED_FIELDS[event])
+                events.setdefault((event, record["leader"]), []).append((record["step"], fields))
+    return events
+
+
+class TrajectoryComparison:
+    """
+    Compares two recorded runs of the same scenario, typically a baseline configuration and a candidate with an
+    optimized execution mode enabled: the trajectory of every vehicle, the PlatoonState changes and splits of every
+    platoon, and the simulation time of the runs. Differences beyond the tolerances are reported as divergences, the
+    earliest one first
+    """
+    DEFAULT_POSITION_TOLERANCE = 0.01
+    DEFAULT_SPEED_TOLERANCE = 0.01
+    DEFAULT_STEP_TOLERANCE = 0
+    DEFAULT_TIME_TOLERANCE = 0
+
+    def __init__(self, baseline, candidate, position_tolerance=DEFAULT_POSITION_TOLERANCE,
+                 speed_tolerance=DEFAULT_SPEED_TOLERANCE, step_tolerance=DEFAULT_STEP_TOLERANCE,
+                 time_tolerance=DEFAULT_TIME_TOLERANCE):
+        """
+        :param baseline: the directory of the baseline run, see prepare_run()
+        :param candidate: the directory of the candidate run
+        :param position_tolerance: the largest accepted difference of the position of a vehicle along the route, in
+        meters
+        :param speed_tolerance: the largest accepted difference of the speed of a vehicle, in meters/second
+        :param step_tolerance: the largest accepted difference of the step of a state change or split
+        :param time_tolerance: the largest accepted difference of the simulation time of the runs, in seconds
+        """
+        self.baseline = baseline
+        self.candidate = candidate
+        self.position_tolerance = position_tolerance
+        self.speed_tolerance = speed_tolerance
+        self.step_tolerance = step_tolerance
+        self.time_tolerance = time_tolerance
+
+    @staticmethod
+    def divergence(kind, step, subject, baseline, candidate):
+        """
+        Returns a divergence as a dictionary
+
+        :param kind: what diverged, e.g. speed or platoon_split
+        :param step: the first step the runs diverge at, None if not tied to a step
+        :param subject: the vehicle or platoon leader which diverged, None for the whole run
+        :param baseline: the value of the baseline run
+        :param candidate: the value of the candidate run
+        """
+        return {"kind": kind, "step": step, "subject": subject, "baseline": baseline, "candidate": candidate}
+
+    def compare_trajectories(self):
+        """
+        Returns the first divergence of the samples, position, speed and lane of every recorded vehicle
+        """
+        runs = list()
+        for directory in (self.baseline, self.candidate):
+            analyzer = TrajectoryAnalyzer(directory)
+            runs.append({name: analyzer.split_by_vehicle(values) for name, values in
+                         (("step", analyzer.column('step')), ("position", analyzer.get_route_position()),
+                          ("speed", analyzer.column('speed')), ("lane", analyzer.column('lane')))})
+        baseline, candidate = runs
+
+        divergences = list()
+        for vid in sorted(set(baseline["step"]) | set(candidate["step"])):
+            if vid not in baseline["step"] or vid not in candidate["step"]:
+                recorded = baseline if vid in baseline["step"] else candidate
+                divergences.append(self.divergence("vehicle", int(recorded["step"][vid][0]), vid,
+                                                   vid in baseline["step"], vid in candidate["step"]))
+                continue
+            steps, baseline_index, candidate_index = np.intersect1d(baseline["step"][vid], candidate["step"][vid],
+                                                                    assume_unique=True, return_indices=True)
+            missing = np.setxor1d(baseline["step"][vid], candidate["step"][vid], assume_unique=True)
+            if len(missing):
+                divergences.append(self.divergence("samples", int(missing[0]), vid,
+                                                   bool(np.isin(missing[0], baseline["step"][vid])),
+                                                   bool(np.isin(missing[0], candidate["step"][vid]))))
+            for name, tolerance in (("position", self.position_tolerance), ("speed", self.speed_tolerance),
+                                    ("lane", 0)):
+                b = baseline[name][vid][baseline_index]
+                c = candidate[name][vid][candidate_index]
+                exceeded = np.flatnonzero(np.abs(b.astype(float) - c) > tolerance)
+                if len(exceeded):
+                    i = exceeded[0]
+                    divergences.append(self.divergence(name, int(steps[i]), vid, b[i].item(), c[i].item()))
+        return divergences
+
+    def compare_events(self):
+        """
+        Returns the first divergence of the PlatoonState changes and splits of every platoon leader
+        """
+        baseline = load_events(self.baseline)
+        candidate = load_events(self.candidate)
+        divergences = list()
+        for event, leader in sorted(set(baseline) | set(candidate)):
+            b = baseline.get((event, leader), [])
+            c = candidate.get((event, leader), [])
+            for i in range(max(len(b), len(c))):
+                if i >= len(b) or i >= len(c):
+                    step, _ = (b if i < len(b) else c)[i]
+                    divergences.append(self.divergence(event, step, leader, b[i] if i < len(b) else None,
+                                                       c[i] if i < len(c) else None))
+                    break
+                (b_step, b_fields), (c_step, c_fields) = b[i], c[i]
+                if b_fields != c_fields or abs(b_step - c_step) > self.step_tolerance:
+                    divergences.append(self.divergence(event, min(b_step, c_step), leader, b[i], c[i]))
+                    break
+        return divergences
+
+    def compare_run_time(self):
+        """
+        Returns the divergence of the simulation time of the runs, if any
+        """
+        times = list()
+        for directory in (self.baseline, self.candidate):
+            with open(os.path.join(directory, RUN_FILE)) as f:
+                times.append(json.load(f)["time"])
+        if abs(times[0] - times[1]) > self.time_tolerance:
+            return [self.divergence("time", None, None, times[0], times[1])]
+        return []
+
+    def compare(self):
+        """
+        Compare the runs
+
+        :return: a dictionary telling whether the runs are equivalent, the first divergence and the first divergence
+        of every vehicle, platoon and quantity, ordered by step
+        """
+        divergences = self.compare_trajectories() + self.compare_events() + self.compare_run_time()
+        divergences.sort(key=lambda d: float("inf") if d["step"] is None else d["step"])
+        return {"equivalent": not divergences, "first": divergences[0] if divergences else None,
+                "divergences": divergences}
+
+
+def prepare_run(simulation, directory, configure=None, scenario=None):
+    """
+    Prepare a simulation for a comparison: apply a configuration, record the trajectories of all vehicles and the
+    events to the given directory, and add the vehicles of the scenario. Write the result of Simulation.run to the
+    directory with save_run() after running it
+
+    :param simulation: the Simulation to prepare
+    :param directory: the directory to record to
+    :param configure: a function receiving the Simulation to enable execution modes on, e.g.
+    lambda simulation: simulation.subscribe_platoon_surroundings()
+    :param scenario: a function receiving the Simulation to add platoons and vehicles to and set the time length
+    """
+    if configure is not None:
+        configure(simulation)
+    simulation.record_trajectories(directory, selection=TrajectoryRecorder.SELECT_ALL)
+    simulation.log_events(os.path.join(directory, EVENTS_FILE))
+    if scenario is not None:
+        scenario(simulation)
+
+
+def save_run(directory, result):
+    """
+    Write the result of Simulation.run to the directory of a run
+
+    :param directory: the directory of the run
+    :param result: the tuple of the total simulation time and the metrics returned by Simulation.run
+    """
+    time, metrics = result
+    with open(os.path.join(directory, RUN_FILE), "w") as f:
+        json.dump({"time": time, "metrics": metrics}, f, indent=2)
+
+
+def compare_configurations(scenario, baseline, candidate, directory, gui=False, **tolerances):
+    """
+    Run a scenario under a baseline and a candidate configuration at the same time, each in its own SUMO instance,
+    and compare the runs
+
+    :param scenario: a function receiving a Simulation to add platoons and vehicles to and set the time length
+    :param baseline: a function receiving the Simulation of the baseline run to configure, or None
+    :param candidate: a function receiving the Simulation of the candidate run to configure
+    :param directory: the directory the runs are recorded to, in its baseline and candidate subdirectories
+    :param gui: whether to start sumo-gui or the command line sumo
+    :param tolerances: the tolerances of the TrajectoryComparison
+    :return: the result of TrajectoryComparison.compare
+    """
+    # imported here, as the simulation modules are not needed to compare recorded runs
+    from Simulation import run_simulations
+
+    directories = [os.path.join(directory, "baseline"), os.path.join(directory, "candidate")]
+
+    def configuration(run_directory, configure):
+        return lambda simulation: prepare_run(simulation, run_directory, configure, scenario)
+
+    results = run_simulations([configuration(directories[0], baseline), configuration(directories[1], candidate)],
+                              gui=gui)
+    for run_directory, result in zip(directories, results):
+        save_run(run_directory, result)
+    return TrajectoryComparison(*directories, **tolerances).compare()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare two recorded runs of the same scenario")
+    parser.add_argument("baseline", help="the directory of the baseline run")
+    parser.add_argument("candidate", help="the directory of the candidate run")
+    parser.add_argument("--position", type=float, default=TrajectoryComparison.DEFAULT_POSITION_TOLERANCE,
+                        help="the position tolerance in meters")
+    parser.add_argument("--speed", type=float, default=TrajectoryComparison.DEFAULT_SPEED_TOLERANCE,
+                        help="the speed tolerance in meters/second")
+    parser.add_argument("--steps", type=int, default=TrajectoryComparison.DEFAULT_STEP_TOLERANCE,
+                        help="the tolerance of the steps of state changes and splits")
+    parser.add_argument("--time", type=float, default=TrajectoryComparison.DEFAULT_TIME_TOLERANCE,
+                        help="the simulation time tolerance in seconds")
+    arguments = parser.parse_args()
+
+    report = TrajectoryComparison(arguments.baseline, arguments.candidate, position_tolerance=arguments.position,
+                                  speed_tolerance=arguments.speed, step_tolerance=arguments.steps,
+                                  time_tolerance=arguments.time).compare()
+    print(json.dumps(report, indent=2))
+    sys.exit(0 if report["equivalent"] else 1)
@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+import json
+import os
+
+import numpy as np
+import traci.constants as tc
+from traci.exceptions import TraCIException
+
+import ccparams as cc
+from PlatoonState import PlatoonState
+
+# one row per recorded vehicle and step. chunks are saved as plain .npy files so that they can be memory-mapped
+RECORD_DTYPE = np.dtype([
+    ('step', np.int32),
+    ('vehicle', np.int32),
+    ('platoon', np.int16),
+    ('lane', np.int8),
+    ('controller', np.int8),
+    ('state', np.int8),
+    ('speed', np.float32),
+    ('acceleration', np.float32),
+    ('lane_position', np.float64),
+    ('distance', np.float64),
+    ('x', np.float64),
+    ('y', np.float64),
+])
+
+# variables subscribed for every recorded vehicle, delivered together with each simulation step
+SUBSCRIBED_VARIABLES = (tc.VAR_SPEED, tc.VAR_ACCELERATION, tc.VAR_LANE_INDEX, tc.VAR_LANEPOSITION, tc.VAR_DISTANCE,
+                        tc.VAR_POSITION)
+
+METADATA_FILE = "trajectory.json"
+
+
+class TrajectoryRecorder:
+    """
+    Records per-step trajectories of platoon members and tracked vehicles into a preallocated buffer which is flushed
+    to disk in fixed-size chunks, so memory use does not grow with the length of the run
+    """
+    # record platoon members, all vehicles added through the Simulation and tracked vehicles
+    SELECT_ALL = "all"
+    # record platoon members and tracked vehicles only
+    SELECT_PLATOON = "platoon"
+
+    DEFAULT_CHUNK_SIZE = 65536
+
+    def __init__(self, context, directory, selection=SELECT_PLATOON, every=1, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        :param context: the SimulationContext of the simulation to record
+        :param directory: the directory the chunks and the metadata are written to
+        :param selection: which vehicles to record, SELECT_ALL or SELECT_PLATOON
+        :param every: record only every k-th simulation step
+        :param chunk_size: the number of rows kept in memory before they are written to disk
+        """
+        self.context = context
+        self.directory = directory
+        self.selection = selection
+        self.every = every
+        self.chunk_size = chunk_size
+
+        self.buffer = np.zeros(chunk_size, dtype=RECORD_DTYPE)
+        # field views, so that a sample is written column by column without building a row tuple
+        self.columns = {name: self.buffer[name] for name in RECORD_DTYPE.names}
+        self.index = 0
+        self.chunks = list()
+
+        self.tracked = list()
+        self.vehicle_codes = dict()
+        self.vehicle_lengths = dict()
+        self.subscribed = set()
+
+        os.makedirs(directory, exist_ok=True)
+
+    def track(self, vid):
+        """
+        Record the given vehicle regardless of the selection. A vehicle is recorded from the step after it was first
+        selected on, once its subscription is in place
+
+        :param vid: the traci vehicle id of the vehicle to record
+        """
+        self.tracked.append(vid)
+
+    def get_vehicle_code(self, vid):
+        """
+        Returns the integer which identifies the given vehicle in the recorded chunks
+
+        :param vid: the traci vehicle id
+        """
+        code = self.vehicle_codes.get(vid)
+        if code is None:
+            code = len(self.vehicle_codes)
+            self.vehicle_codes[vid] = code
+        return code
+
+    def subscribe(self, vid):
+        """
+        Subscribe to the recorded variables of the given vehicle, so that they arrive with every simulation step
+        instead of being polled
+
+        :param vid: the traci vehicle id
+        """
+        try:
+            self.context.connection.vehicle.subscribe(vid, SUBSCRIBED_VARIABLES)
+        except TraCIException:
+            # the vehicle has not been inserted yet, try again the next time it is recorded
+            return
+        self.subscribed.add(vid)
+        self.get_vehicle_code(vid)
+        self.vehicle_lengths[vid] = self.context.connection.vehicle.getLength(vid)
+
+    def record(self, step):
+        """
+        Record the current state of all selected vehicles
+
+        :param step: the current simulation step
+        """
+        if step % self.every != 0:
+            return
+
+        vehicle = self.context.connection.vehicle
+        recorded = set()
+        for platoon_index, p in enumerate(self.context.platoon_manager.platoons):
+            state = p.state.value
+            for vid in p.vehicles:
+                self.record_vehicle(vehicle, step, vid, platoon_index, p.get_active_controller(vid), state)
+                recorded.add(vid)
+        vehicles = self.context.vehicle_manager.vehicles
+        record_all = self.selection == self.SELECT_ALL
+        if record_all:
+            for vid in vehicles:
+                self.record_vehicle(vehicle, step, vid, -1, cc.ACC, 0)
+        for vid in self.tracked:
+            if vid not in recorded and not (record_all and vid in vehicles):
+                self.record_vehicle(vehicle, step, vid, -1, cc.ACC, 0)
+
+    def record_vehicle(self, vehicle, step, vid, platoon_index, controller, state):
+        """
+        Write one row for the given vehicle into the buffer, flushing the buffer when it is full
+
+        :param vehicle: the vehicle domain of the traci connection
+        :param step: the current simulation step
+        :param vid: the traci vehicle id
+        :param platoon_index: the index of the vehicle's platoon in the PlatoonManager, -1 if not a platoon member
+        :param controller: the active controller of the vehicle
+        :param state: the PlatoonState value of the vehicle's platoon, 0 if not a platoon member
+        """
+        if vid not in self.subscribed:
+            # the data of a newly selected vehicle arrives with the next simulation step
+            self.subscribe(vid)
+            return
+        values = vehicle.getSubscriptionResults(vid)
+        if not values:
+            # the vehicle has left the simulation
+            return
+
+        i = self.index
+        columns = self.columns
+        columns['step'][i] = step
+        columns['vehicle'][i] = self.vehicle_codes[vid]
+        columns['platoon'][i] = platoon_index
+        columns['lane'][i] = values[tc.VAR_LANE_INDEX]
+        columns['controller'][i] = controller
+        columns['state'][i] = state
+        columns['speed'][i] = values[tc.VAR_SPEED]
+        columns['acceleration'][i] = values[tc.VAR_ACCELERATION]
+        columns['lane_position'][i] = values[tc.VAR_LANEPOSITION]
+        columns['distance'][i] = values[tc.VAR_DISTANCE]
+        columns['x'][i], columns['y'][i] = values[tc.VAR_POSITION]
+
+        self.index = i + 1
+        if self.index == self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the buffered rows to a new chunk file and start over at the beginning of the buffer
+        """
+        if self.index == 0:
+            return
+        name = f"chunk_{len(self.chunks):05d}.npy"
+        np.save(os.path.join(self.directory, name), self.buffer[:self.index])
+        self.chunks.append(name)
+        self.index = 0
+
+    def close(self, step_length=None):
+        """
+        Flush the remaining rows and write the metadata needed to interpret the chunks
+
+        :param step_length: the length of a simulation step in seconds
+        """
+        self.flush()
+        vehicles = sorted(self.vehicle_codes, key=self.vehicle_codes.get)
+        metadata = {
+            "step_length": step_length,
+            "every": self.every,
+            "selection": self.selection,
+            "chunks": self.chunks,
+            "vehicles": vehicles,
+            "vehicle_lengths": [self.vehicle_lengths.get(vid) for vid in vehicles],
+            "desired_speeds": [p.desired_speed for p in self.context.platoon_manager.platoons],
+            "states": {state.name: state.value for state in PlatoonState},
+            "controllers": {"DRIVER": cc.DRIVER, "ACC": cc.ACC, "CACC": cc.CACC, "FAKED_CACC": cc.FAKED_CACC,
+                            "PLOEG": cc.PLOEG, "CONSENSUS": cc.CONSENSUS},
+        }
+        with open(os.path.join(self.directory, METADATA_FILE), "w") as f:
+            json.dump(metadata, f, indent=2)
@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+
+import random
+
+import ccparams as cc
+from EventLog import EventLog
+from utils import set_par
+
+
+class Treadmill:
+    """
+    Keeps the platoons and the traffic around them going for endless runs: background vehicles which fell behind the
+    last platoon member, or drove on beyond the stretch ahead of the platoons, are moved onto that stretch, onto a
+    random lane and with a fresh desired speed, reusing their vehicle ids and Vehicle objects. The platoons meet an
+    endless stream of traffic while the number of vehicles stays the same. Before the foremost platoon leader runs
+    out of room ahead, the platoons and the vehicles around them are all moved back along the edge by the same
+    offset, keeping their lanes, gaps and speeds, so that the platoons never reach the end of the edge
+    """
+    # how far behind the last platoon member a vehicle is recycled, in meters
+    DEFAULT_DISTANCE_BEHIND = 200
+    # how far ahead of the foremost platoon leader recycled vehicles are placed, in meters
+    DEFAULT_DISTANCE_AHEAD = 300
+    # the length of the stretch beyond DEFAULT_DISTANCE_AHEAD recycled vehicles are spread over, in meters
+    DEFAULT_SPREAD = 300
+    # the desired speeds of recycled vehicles are drawn uniformly from this range, in meters/second
+    DEFAULT_SPEED_RANGE = (25, 45)
+    # the number of simulation steps between two checks for vehicles to recycle
+    DEFAULT_INTERVAL = 50
+
+    # the distance a recycled vehicle keeps to the vehicles on its new lane, in meters
+    CLEARANCE = 30
+    # the number of random places tried for a recycled vehicle before it waits for the next check
+    ATTEMPTS = 5
+
+    def __init__(self, context, distance_behind=DEFAULT_DISTANCE_BEHIND, distance_ahead=DEFAULT_DISTANCE_AHEAD,
+                 spread=DEFAULT_SPREAD, speed_range=DEFAULT_SPEED_RANGE, interval=DEFAULT_INTERVAL):
+        """
+        :param context: the SimulationContext of the simulation whose vehicles are recycled
+        :param distance_behind: how far behind the last platoon member a vehicle is recycled, in meters
+        :param distance_ahead: how far ahead of the foremost platoon leader recycled vehicles are placed, in meters
+        :param spread: the length of the stretch beyond distance_ahead recycled vehicles are spread over, in meters
+        :param speed_range: the (lowest, highest) desired speed of recycled vehicles, in meters/second
+        :param interval: the number of simulation steps between two checks for vehicles to recycle
+        """
+        self.context = context
+        self.distance_behind = distance_behind
+        self.distance_ahead = distance_ahead
+        self.spread = spread
+        self.speed_range = speed_range
+        self.interval = interval
+        # edge id -> (length, number of lanes)
+        self.edges = dict()
+        self.recycled = 0
+        # vehicles to recycle which found no free place ahead, or the edge is too short to wrap the platoons
+        self.postponed = 0
+        # the number of times the platoons were moved back along the edge
+        self.wraps = 0
+
+    def get_edge(self, edge_id):
+        """
+        Returns the (length, number of lanes) of an edge
+
+        :param edge_id: the traci edge id
+        """
+        if edge_id not in self.edges:
+            connection = self.context.connection
+            self.edges[edge_id] = (connection.lane.getLength(f"{edge_id}_0"), connection.edge.getLaneNumber(edge_id))
+        return self.edges[edge_id]
+
+    def tick(self, step):
+        """
+        Recycle the vehicles which fell behind the platoons or drove too far ahead of them, and move the platoons
+        back along the edge when they run out of room ahead, every interval steps
+
+        :param step: the current simulation step
+        """
+        platoons = self.context.platoon_manager.platoons
+        if step % self.interval or not platoons:
+            return
+        vehicle = self.context.connection.vehicle
+        road = vehicle.getRoadID(platoons[0].vehicles[0])
+        front = None
+        rear = None
+        # lane index -> positions of the vehicles on the lane
+        occupied = dict()
+        for platoon in platoons:
+            for vid in (platoon.vehicles[0], platoon.vehicles[-1]):
+                if vehicle.getRoadID(vid) != road:
+                    continue
+                position = vehicle.getLanePosition(vid)
+                occupied.setdefault(vehicle.getLaneIndex(vid), []).append(position)
+                front = position if front is None else max(front, position)
+                rear = position if rear is None else min(rear, position)
+
+        # the vehicles out of reach of the platoons, behind or ahead of them
+        recycled = list()
+        # vid -> (lane index, position) of the background vehicles around the platoons
+        around = dict()
+        for vid in self.context.vehicle_manager.vehicles:
+            if vehicle.getRoadID(vid) != road:
+                continue
+            position = vehicle.getLanePosition(vid)
+            if position < rear - self.distance_behind or position > front + self.distance_ahead + self.spread:
+                recycled.append(vid)
+            else:
+                lane = vehicle.getLaneIndex(vid)
+                around[vid] = (lane, position)
+                occupied.setdefault(lane, []).append(position)
+
+        length, lanes = self.get_edge(road)
+        if front + self.distance_ahead + self.spread > length:
+            # the rearmost platoon member ends up where vehicles behind it are recycled
+            offset = rear - self.distance_behind
+            if front - offset + self.distance_ahead + self.spread > length:
+                self.postponed += len(recycled)
+                return
+            self.wrap(road, offset, platoons, around)
+            front -= offset
+            occupied = {lane: [position - offset for position in positions] for lane, positions in occupied.items()}
+        for vid in recycled:
+            self.recycle(vid, road, lanes, front, occupied)
+
+    def wrap(self, road, offset, platoons, around):
+        """
+        Move the platoons and the background vehicles around them back along the edge by the same offset. Lanes, gaps
+        and speeds are kept, and so is the distance the vehicles drove
+
+        :param road: the edge id of the platoons
+        :param offset: the distance to move the vehicles back by, in meters
+        :param platoons: the platoons
+        :param around: the (lane index, position) of each background vehicle to move along with the platoons
+        """
+        context = self.context
+        vehicle = context.connection.vehicle
+        moved = dict(around)
+        for platoon in platoons:
+            for vid in platoon.vehicles:
+                if vehicle.getRoadID(vid) == road:
+                    moved[vid] = (vehicle.getLaneIndex(vid), vehicle.getLanePosition(vid))
+        for vid, (lane, position) in moved.items():
+            vehicle.moveTo(vid, f"{road}_{lane}", position - offset)
+            context.estimator.invalidate(vid)
+        self.wraps += 1
+        context.event_log.log(EventLog.INFO, "treadmill_wrap", offset=offset, vehicles=len(moved))
+
+    def recycle(self, vid, road, lanes, front, occupied):
+        """
+        Move a vehicle to a random free place ahead of the platoons, with a fresh desired speed
+
+        :param vid: the traci vehicle id
+        :param road: the edge id of the platoons
+        :param lanes: the number of lanes of the edge
+        :param front: the position of the foremost platoon leader
+        :param occupied: the positions of the vehicles on each lane, which the recycled vehicle is added to
+        """
+        context = self.context
+        for _ in range(self.ATTEMPTS):
+            lane = random.randrange(lanes)
+            position = front + self.distance_ahead + random.uniform(0, self.spread)
+            if all(abs(position - other) >= self.CLEARANCE for other in occupied.get(lane, ())):
+                break
+        else:
+            self.postponed += 1
+            return
+
+        speed = random.uniform(*self.speed_range)
+        connection = context.connection
+        connection.vehicle.moveTo(vid, f"{road}_{lane}", position)
+        connection.vehicle.setPreviousSpeed(vid, speed)
+        connection.vehicle.changeLane(vid, lane, 1000000.0)
+        set_par(vid, cc.PAR_CC_DESIRED_SPEED, speed, connection)
+        context.vehicle_manager.get_vehicle(vid).desired_speed = speed
+        context.estimator.invalidate(vid)
+        occupied.setdefault(lane, []).append(position)
+        self.recycled += 1
+        if context.event_log.is_enabled(EventLog.DEBUG):
+            context.event_log.log(EventLog.DEBUG, "vehicle_recycled", vehicle=vid, lane=lane, position=position,
+                                  speed=speed)
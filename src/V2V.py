@@ -21,9 +21,8 @@
 
 from enum import auto
 
-import ccparams as cc
+from EventLog import EventLog, event_log
 from VehicleManager import vehicle_manager
-from utils import get_par
 
 
 class V2V:
@@ -32,7 +31,9 @@ class V2V:
     """
 
     def __init__(self, *args, **kwargs):
-        pass
+        # the vehicles which can be reached over this V2V bus
+        self.vehicle_manager = kwargs.get("vehicle_manager", vehicle_manager)
+        self.event_log = kwargs.get("event_log", event_log)
 
     V2V_LANE_CHANGE_MANEUVER_REQUEST = auto()
 
@@ -40,15 +41,10 @@ class V2V:
         """
         Simulates a V2V message broadcast sent to all vehicles requesting for GPS information
 
-        :return: a list of vehicular information, including coordinates, speed, and acceleration
+        :return: a V2VSnapshot of vehicular information, including coordinates, speed, and acceleration, shared by
+        all requests of the current simulation step
         """
-        response = list()
-        for vid, vehicle in vehicle_manager.vehicles.items():
-            if vehicle.v2v:
-                vehicle_data = get_par(vid, cc.PAR_SPEED_AND_ACCELERATION)
-                (v, a, u, x, y, t, _, _, _) = cc.unpack(vehicle_data)
-                response.append((vid, v, a, u, x, y, t))
-        return response
+        return self.vehicle_manager.v2v_request_coordinates()
 
     def request_lane_change_maneuver(self, sender_id, recipient_id):
         """
@@ -57,7 +53,8 @@ class V2V:
         :param sender_id: the originator of the request
         :param recipient_id: the target recipient of the request
         """
-        recipient = vehicle_manager.get_vehicle(recipient_id)
+        self.event_log.log(EventLog.INFO, "v2v_lane_change_request", sender=sender_id, recipient=recipient_id)
+        recipient = self.vehicle_manager.get_vehicle(recipient_id)
         recipient.receive_v2v_request(sender_id, self.V2V_LANE_CHANGE_MANEUVER_REQUEST)
 
 
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+import numpy
+
+
+class V2VSnapshot:
+    """
+    Immutable answer to a V2V coordinate request, holding the GPS data of all V2V enabled vehicles at one simulation
+    step as one array per field. Iterating over it yields (vid, v, a, u, x, y, t) tuples like the list returned by
+    earlier versions of VehicleManager.v2v_request_coordinates
+    """
+    __slots__ = ("ids", "v", "a", "u", "x", "y", "t")
+
+    FIELDS = ("v", "a", "u", "x", "y", "t")
+
+    def __init__(self, ids, rows):
+        """
+        :param ids: the traci vehicle ids of the V2V enabled vehicles
+        :param rows: a (v, a, u, x, y, t) tuple for every vehicle id
+        """
+        object.__setattr__(self, "ids", tuple(ids))
+        columns = numpy.array(rows, dtype=float).reshape(len(self.ids), len(self.FIELDS)).T
+        for name, column in zip(self.FIELDS, columns):
+            column = numpy.ascontiguousarray(column)
+            column.flags.writeable = False
+            object.__setattr__(self, name, column)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("V2VSnapshot is immutable")
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        return zip(self.ids, *(getattr(self, name).tolist() for name in self.FIELDS))
+
+    def find(self, x, y, radius):
+        """
+        Returns the id of the first vehicle whose GPS position is within the given radius of a position, or None
+
+        :param x: the x coordinate of the position
+        :param y: the y coordinate of the position
+        :param radius: the maximum distance in meters
+        """
+        matches = numpy.flatnonzero(numpy.sqrt((x - self.x) ** 2 + (y - self.y) ** 2) <= radius)
+        if len(matches) == 0:
+            return None
+        return self.ids[matches[0]]
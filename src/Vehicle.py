@@ -19,12 +19,11 @@
 # along with this program.  If not, see http://www.gnu.org/licenses/.
 #
 
-from enum import auto
-
-import traci
-
 from Direction import Direction
-from V2V import v2v
+from EventLog import EventLog
+from SimulationContext import default_context
+from VehicleCommand import VehicleCommand
+from VehicleCounter import VehicleCounter, vehicle_counter
 from utils import change_lane
 
 
@@ -49,21 +48,37 @@ class Vehicle:
     DEFAULT_SLOW_SPEED = 30
     DEFAULT_SLOW_LANE = 0
 
-    CMD_CHANGE_LANE_LEFT = auto()
-    CMD_CHANGE_LANE_RIGHT = auto()
+    CMD_CHANGE_LANE_LEFT = VehicleCommand.CHANGE_LANE_LEFT
+    CMD_CHANGE_LANE_RIGHT = VehicleCommand.CHANGE_LANE_RIGHT
 
-    def __init__(self, vid, commands=dict(), v2v=False):
+    def __init__(self, vid, commands=dict(), v2v=False, context=default_context, desired_speed=None):
         self.vid = vid
         self.commands = commands
         self.v2v = v2v
-        self.vehicle_length = traci.vehicletype.getLength('V2V_Car')
-        self.min_gap = traci.vehicletype.getMinGap('V2V_Car')
+        self.context = context
+        self.desired_speed = desired_speed
+        self.vehicle_length = self.connection.vehicletype.getLength('V2V_Car')
+        self.min_gap = self.connection.vehicletype.getMinGap('V2V_Car')
+
+    @property
+    def connection(self):
+        """
+        The traci connection of the simulation this vehicle drives in
+        """
+        return self.context.connection
+
+    def to_dict(self):
+        """
+        Returns the state of this vehicle which is not kept by SUMO, as a dictionary
+        """
+        return {"vid": self.vid, "commands": {str(step): command.name for step, command in self.commands.items()},
+                "v2v": self.v2v, "desired_speed": self.desired_speed}
 
     def get_lane(self):
         """
         Get the current traveling lane of this vehicle
         """
-        return traci.vehicle.getLaneIndex(self.vid)
+        return self.connection.vehicle.getLaneIndex(self.vid)
 
     def change_lane(self, direction):
         """
@@ -74,7 +89,10 @@ class Vehicle:
         lane = self.get_lane()
         destination_lane = lane + direction
 
-        change_lane(self.vid, destination_lane)
+        change_lane(self.vid, destination_lane, self.connection)
+        # the prediction of the position does not know about the lane change
+        self.context.estimator.invalidate(self.vid)
+        self.context.event_log.log(EventLog.INFO, "vehicle_lane_change", vehicle=self.vid, lane=destination_lane)
 
     def tick(self, step):
         """
@@ -95,9 +113,10 @@ class Vehicle:
 
         :param direction: the direction to check for lane change availability
         """
-        edge_id = traci.vehicle.getRoadID(self.vid)
-        lane_count = traci.edge.getLaneNumber(edge_id)
-        lane_index = traci.vehicle.getLaneIndex(self.vid)
+        connection = self.connection
+        edge_id = connection.vehicle.getRoadID(self.vid)
+        lane_count = connection.edge.getLaneNumber(edge_id)
+        lane_index = connection.vehicle.getLaneIndex(self.vid)
 
         if direction == Direction.LEFT and lane_index == lane_count - 1:
             return False
@@ -105,11 +124,11 @@ class Vehicle:
             return False
 
         if direction == Direction.LEFT:
-            leaders = traci.vehicle.getLeftLeaders(self.vid)
-            followers = traci.vehicle.getLeftFollowers(self.vid)
+            leaders = connection.vehicle.getLeftLeaders(self.vid)
+            followers = connection.vehicle.getLeftFollowers(self.vid)
         if direction == Direction.RIGHT:
-            leaders = traci.vehicle.getRightLeaders(self.vid)
-            followers = traci.vehicle.getRightFollowers(self.vid)
+            leaders = connection.vehicle.getRightLeaders(self.vid)
+            followers = connection.vehicle.getRightFollowers(self.vid)
 
         for l in leaders:
             _, dist = l
@@ -128,45 +147,8 @@ class Vehicle:
         :param sender_id: the origin of the V2V message
         :param request_type: the type of the V2V message
         """
-        if request_type == v2v.V2V_LANE_CHANGE_MANEUVER_REQUEST:
+        if request_type == self.context.v2v.V2V_LANE_CHANGE_MANEUVER_REQUEST:
             if self.could_lane_change(Direction.LEFT):
                 self.change_lane(Direction.LEFT)
             elif self.could_lane_change(Direction.RIGHT):
                 self.change_lane(Direction.RIGHT)
-
-
-class VehicleCounter:
-    """
-    A class which provides a unique name creation system for traci vehicles
-    """
-    i = 0
-    ID_PRE = 'v.'
-    ID_PRE_PLATOON = 'platoon.'
-
-    def __init__(self):
-        i = 0
-
-    def get_next_vehicle_id(self):
-        """
-        Generate the next unique id for a vehicle
-        """
-        vid = f"{self.ID_PRE}{self.i}"
-        self.i += 1
-        return vid
-
-    def get_next_platoon_vehicle_id(self):
-        """
-        Generate the next unique id for a platoon vehicle
-        """
-        vid = f"{self.ID_PRE_PLATOON}{self.i}"
-        self.i += 1
-        return vid
-
-    def reset(self):
-        """
-        Reset the vehicle counter
-        """
-        self.i = 0
-
-
-vehicle_counter = VehicleCounter()
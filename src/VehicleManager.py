@@ -18,8 +18,8 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with this program.  If not, see http://www.gnu.org/licenses/.
 #
-import ccparams as cc
-from utils import get_par
+from StateEstimator import state_estimator
+from V2VSnapshot import V2VSnapshot
 
 
 class VehicleManager:
@@ -33,6 +33,17 @@ class VehicleManager:
         :param vehicle: the vehicle to be managed
         """
         self.vehicles[vehicle.vid] = vehicle
+        self.v2v_snapshot = None
+
+    def remove_vehicle(self, vid):
+        """
+        Stop managing a vehicle, e.g. because it was handed off to another simulation
+
+        :param vid: the traci vehicle id of the vehicle to remove
+        :return: the removed vehicle
+        """
+        self.v2v_snapshot = None
+        return self.vehicles.pop(vid)
 
     def get_vehicle(self, vid):
         """
@@ -50,30 +61,42 @@ class VehicleManager:
         """
         for v in self.vehicles.values():
             v.tick(step)
+        # the vehicles move with the next simulation step
+        self.v2v_snapshot = None
 
     def reset(self):
         """
         Clear the current list of vehicles managed by the VehicleManager
         """
         self.vehicles = dict()
+        self.v2v_snapshot = None
 
     def __init__(self, *args, **kwargs):
         self.vehicles = dict()
+        # where the state of the vehicles is read from, see StateEstimator
+        self.estimator = kwargs.get("estimator", state_estimator)
+        # the answer to V2V coordinate requests during the current step, built on the first request
+        self.v2v_snapshot = None
 
     def v2v_request_coordinates(self):
         """
-        This functions simulates a V2V request for GPS-coordinates being received and responds with a list of
-        all vehicle's GPS data if the vehicle has V2V communication enabled.
+        This functions simulates a V2V request for GPS-coordinates being received and responds with the GPS data of
+        all vehicles which have V2V communication enabled. The data is read once per simulation step and the same
+        snapshot is shared by all requests during that step.
 
-        :return: a list of tuples - each tuple contains vehicular data such as speed, acceleration, and coordinates
+        :return: a V2VSnapshot - iterating over it yields tuples of vehicular data such as speed, acceleration, and
+        coordinates
         """
-        v2v_response = list()
-        for vid, vehicle in self.vehicles.items():
-            if vehicle.v2v:
-                vehicle_data = get_par(vid, cc.PAR_SPEED_AND_ACCELERATION)
-                (v, a, u, x, y, t, _, _, _) = cc.unpack(vehicle_data)
-                v2v_response.append((vid, v, a, u, x, y, t))
-        return v2v_response
+        if self.v2v_snapshot is None:
+            ids = list()
+            rows = list()
+            for vid, vehicle in self.vehicles.items():
+                if vehicle.v2v:
+                    (v, a, u, x, y, t, _, _, _) = self.estimator.get_state(vid, vehicle.connection)
+                    ids.append(vid)
+                    rows.append((v, a, u, x, y, t))
+            self.v2v_snapshot = V2VSnapshot(ids, rows)
+        return self.v2v_snapshot
 
 
 vehicle_manager = VehicleManager()
@@ -20,6 +20,8 @@ import os
 import random
 import sys
 
+import numpy
+
 import ccparams as cc
 
 if 'SUMO_HOME' in os.environ:
@@ -31,44 +33,52 @@ else:
 import sumolib
 import traci
 
+from CommandPipeline import CommandPipeline
+
 # constants for lane change mode
 DEFAULT_LC = 0b1001010101
 DEFAULT_NOTRACI_LC = 0b1010101010
 FIX_LC = 0b0000000000
 
+# label of the traci connection used when a single simulation runs in the process
+DEFAULT_LABEL = "default"
+
 
-def set_par(vid, par, value):
+def set_par(vid, par, value, connection=traci):
     """
     Shorthand for the setParameter method
     :param vid: vehicle id
     :param par: parameter name
     :param value: numeric or string value for the parameter
+    :param connection: the traci connection to use, defaults to the current one
     """
-    traci.vehicle.setParameter(vid, "carFollowModel.%s" % par, str(value))
+    connection.vehicle.setParameter(vid, "carFollowModel.%s" % par, str(value))
 
 
-def get_par(vid, par):
+def get_par(vid, par, connection=traci):
     """
     Shorthand for the getParameter method
     :param vid: vehicle id
     :param par: parameter name
-    :return: the parameter value
+    :param connection: the traci connection to use, defaults to the current one
+    :return: the parameter value, or a PipelinedReply resolving to it if the connection is a CommandPipeline
     """
-    return traci.vehicle.getParameter(vid, "carFollowModel.%s" % par)
+    return connection.vehicle.getParameter(vid, "carFollowModel.%s" % par)
 
 
-def change_lane(vid, lane):
+def change_lane(vid, lane, connection=traci):
     """
     Let a vehicle change lane without respecting any safety distance
     :param vid: vehicle id
     :param lane: lane index
+    :param connection: the traci connection to use, defaults to the current one
     """
-    traci.vehicle.setLaneChangeMode(vid, FIX_LC)
-    traci.vehicle.changeLane(vid, lane, 1000000.0)
+    connection.vehicle.setLaneChangeMode(vid, FIX_LC)
+    connection.vehicle.changeLane(vid, lane, 1000000.0)
 
 
 def add_vehicle(vid, position, lane, speed, cacc_spacing, real_engine=False, type_id='PlatoonCar',
-                car_follow_model='CC', color=None):
+                car_follow_model='CC', color=None, connection=traci):
     """
     Adds a vehicle to the simulation
     :param vid: vehicle id to be set
@@ -78,99 +88,149 @@ def add_vehicle(vid, position, lane, speed, cacc_spacing, real_engine=False, typ
     :param cacc_spacing: spacing to be set for the CACC
     :param real_engine: use the realistic engine model or the first order lag
     model
+    :param connection: the traci connection to use, defaults to the current one
     """
-    traci.vehicle.add(vehID=vid, routeID='freeway', departPos=str(position), departSpeed=str(speed),
-                      departLane=str(lane), typeID=type_id)
-    traci.vehicle.setLaneChangeMode(vid, FIX_LC)
-    traci.vehicle.changeLane(vid, lane, 1000000.0)
+    connection.vehicle.add(vehID=vid, routeID='freeway', departPos=str(position), departSpeed=str(speed),
+                           departLane=str(lane), typeID=type_id)
+    connection.vehicle.setLaneChangeMode(vid, FIX_LC)
+    connection.vehicle.changeLane(vid, lane, 1000000.0)
 
     if car_follow_model == 'CC':
-        set_par(vid, cc.CC_PAR_CACC_C1, 0.5)
-        set_par(vid, cc.CC_PAR_CACC_XI, 2)
-        set_par(vid, cc.CC_PAR_CACC_OMEGA_N, 1)
-        set_par(vid, cc.PAR_CACC_SPACING, cacc_spacing)
-        set_par(vid, cc.PAR_CC_DESIRED_SPEED, speed)
+        set_cc_parameters(vid, cacc_spacing, speed, connection)
     if real_engine:
         set_par(vid, cc.CC_PAR_VEHICLE_ENGINE_MODEL,
-                cc.CC_ENGINE_MODEL_REALISTIC)
-        set_par(vid, cc.CC_PAR_VEHICLES_FILE, "vehicles.xml")
-        set_par(vid, cc.CC_PAR_VEHICLE_MODEL, "alfa-147")
+                cc.CC_ENGINE_MODEL_REALISTIC, connection=connection)
+        set_par(vid, cc.CC_PAR_VEHICLES_FILE, "vehicles.xml", connection=connection)
+        set_par(vid, cc.CC_PAR_VEHICLE_MODEL, "alfa-147", connection=connection)
 
     if color is None:
         color = (random.uniform(0, 255),
                  random.uniform(0, 255),
                  random.uniform(0, 255), 255)
 
-    traci.vehicle.setColor(vid, color)
+    connection.vehicle.setColor(vid, color)
+
+
+def set_cc_parameters(vid, cacc_spacing, speed, connection=traci):
+    """
+    Sets the parameters of the CC car following model of a vehicle
+    :param vid: vehicle id
+    :param cacc_spacing: spacing to be set for the CACC
+    :param speed: desired speed of the cruise control
+    :param connection: the traci connection to use, defaults to the current one
+    """
+    set_par(vid, cc.CC_PAR_CACC_C1, 0.5, connection=connection)
+    set_par(vid, cc.CC_PAR_CACC_XI, 2, connection=connection)
+    set_par(vid, cc.CC_PAR_CACC_OMEGA_N, 1, connection=connection)
+    set_par(vid, cc.PAR_CACC_SPACING, cacc_spacing, connection=connection)
+    set_par(vid, cc.PAR_CC_DESIRED_SPEED, speed, connection=connection)
 
 
-def get_distance(v1, v2):
+def get_distance(v1, v2, connection=traci):
     """
     Returns the distance between two vehicles, removing the length
     :param v1: id of first vehicle
     :param v2: id of the second vehicle
+    :param connection: the traci connection to use, defaults to the current one
     :return: distance between v1 and v2
     """
-    v_data = get_par(v1, cc.PAR_SPEED_AND_ACCELERATION)
+    v_data = get_par(v1, cc.PAR_SPEED_AND_ACCELERATION, connection)
     (v, a, u, x1, y1, t, _, _, _) = cc.unpack(v_data)
-    v_data = get_par(v2, cc.PAR_SPEED_AND_ACCELERATION)
+    v_data = get_par(v2, cc.PAR_SPEED_AND_ACCELERATION, connection)
     (v, a, u, x2, y2, t, _, _, _) = cc.unpack(v_data)
     return math.sqrt((x1 - x2) ** 2 + (y1 - y2) ** 2) - 4
 
 
-def communicate(topology):
+def communicate(topology, connection=traci, estimator=None):
     """
     Performs data transfer between vehicles, i.e., fetching data from
     leading and front vehicles to feed the CACC algorithm
     :param topology: a dictionary pointing each vehicle id to its front
     vehicle and platoon leader. each entry of the dictionary is a dictionary
     which includes the keys "leader" and "front"
+    :param connection: the traci connection to use, defaults to the current one
+    :param estimator: the StateEstimator to get vehicle states from, if None
+    they are read from sumo
+    :return: a dictionary pointing each vehicle id of the topology to a tuple
+    of the speed of its platoon leader and the GPS distance to its front vehicle
     """
+    if len(topology) == 0:
+        return dict()
+
+    # read the state of every vehicle involved exactly once, all reads sent to sumo in one message
+    pipeline = CommandPipeline(connection)
+    index = dict()
+    states = list()
     for vid, links in topology.items():
-        # get data about platoon leader
-        leader_data = get_par(links["leader"], cc.PAR_SPEED_AND_ACCELERATION)
-        (l_v, l_a, l_u, l_x, l_y, l_t, _, _, _) = cc.unpack(leader_data)
-        leader_data = cc.pack(l_v, l_u, l_x, l_y, l_t)
-        # get data about front vehicle
-        front_data = get_par(links["front"], cc.PAR_SPEED_AND_ACCELERATION)
-        (f_v, f_a, f_u, f_x, f_y, f_t, _, _, _) = cc.unpack(front_data)
-        front_data = cc.pack(f_v, f_u, f_x, f_y, f_t)
-        # pass leader and front vehicle data to CACC
-        set_par(vid, cc.PAR_LEADER_SPEED_AND_ACCELERATION, leader_data)
-        set_par(vid, cc.PAR_PRECEDING_SPEED_AND_ACCELERATION, front_data)
-        # compute GPS distance and pass it to the fake CACC
-        f_d = get_distance(vid, links["front"])
-        set_par(vid, cc.PAR_LEADER_FAKE_DATA, cc.pack(l_v, l_u))
-        set_par(vid, cc.PAR_FRONT_FAKE_DATA, cc.pack(f_v, f_u, f_d))
-
-
-def start_sumo(config_file, already_running):
+        for v in (vid, links["leader"], links["front"]):
+            if v not in index:
+                index[v] = len(states)
+                if estimator is None:
+                    states.append(get_par(v, cc.PAR_SPEED_AND_ACCELERATION, pipeline))
+                else:
+                    states.append(estimator.get_state(v, connection))
+    if estimator is None:
+        states = [cc.unpack(reply.result()) for reply in states]
+
+    # compute all GPS distances at once
+    positions = numpy.array([(state[3], state[4]) for state in states], dtype=float)
+    own = positions[[index[vid] for vid in topology]]
+    front = positions[[index[links["front"]] for links in topology.values()]]
+    distances = (numpy.sqrt((own[:, 0] - front[:, 0]) ** 2 + (own[:, 1] - front[:, 1]) ** 2) - 4).tolist()
+
+    # the data sent about a vehicle is the same for every vehicle it is sent to. all writes go in one message
+    packed = dict()
+    result = dict()
+    with pipeline:
+        for (vid, links), f_d in zip(topology.items(), distances):
+            (l_v, l_a, l_u, l_x, l_y, l_t, _, _, _) = states[index[links["leader"]]]
+            (f_v, f_a, f_u, f_x, f_y, f_t, _, _, _) = states[index[links["front"]]]
+            if links["leader"] not in packed:
+                packed[links["leader"]] = cc.pack(l_v, l_u, l_x, l_y, l_t)
+            if links["front"] not in packed:
+                packed[links["front"]] = cc.pack(f_v, f_u, f_x, f_y, f_t)
+            # pass leader and front vehicle data to CACC
+            set_par(vid, cc.PAR_LEADER_SPEED_AND_ACCELERATION, packed[links["leader"]], pipeline)
+            set_par(vid, cc.PAR_PRECEDING_SPEED_AND_ACCELERATION, packed[links["front"]], pipeline)
+            # pass GPS distance to the fake CACC
+            set_par(vid, cc.PAR_LEADER_FAKE_DATA, cc.pack(l_v, l_u), pipeline)
+            set_par(vid, cc.PAR_FRONT_FAKE_DATA, cc.pack(f_v, f_u, f_d), pipeline)
+            result[vid] = (l_v, f_d)
+    return result
+
+
+def start_sumo(config_file, already_running, label=DEFAULT_LABEL, gui=True, options=()):
     """
     Starts or restarts sumo with the given configuration file
     :param config_file: sumo configuration file
     :param already_running: if set to true then the command simply reloads
     the given config file, otherwise sumo is started from scratch
+    :param label: the label under which traci stores the connection. only the
+    default label becomes the current connection of the traci module
+    :param gui: whether to start sumo-gui or the command line sumo
+    :param options: additional sumo command line options, e.g. to write outputs
     """
     arguments = ["-c"]
-    sumo_cmd = [sumolib.checkBinary('sumo-gui')]
+    sumo_cmd = [sumolib.checkBinary('sumo-gui' if gui else 'sumo')]
     # Print SUMO version
     os.system(sumolib.checkBinary('sumo'))
     arguments.append(config_file)
+    arguments.extend(options)
     if already_running:
-        traci.load(arguments)
+        traci.getConnection(label).load(arguments)
     else:
         sumo_cmd.extend(arguments)
-        traci.start(sumo_cmd, numRetries=10)
+        traci.start(sumo_cmd, numRetries=10, label=label, doSwitch=label == DEFAULT_LABEL)
 
 
-def running(step, seconds):
+def running(step, seconds, connection=traci):
     if seconds is None:
         return True
-    max_step = seconds / traci.simulation.getDeltaT()
+    max_step = seconds / connection.simulation.getDeltaT()
     return step <= max_step
 
 
-def running_distance(vid, distance):
+def running_distance(vid, distance, connection=traci):
     if distance is None:
         return True
-    return traci.vehicle.getDistance(vid) < distance
+    return connection.vehicle.getDistance(vid) < distance
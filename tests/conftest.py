@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+
+import pytest
+
+from SimulationContext import SimulationContext
+from Vehicle import Vehicle
+from .fake_sumo import FakeSumo, install
+
+
+@pytest.fixture
+def sumo():
+    """
+    A FakeSumo with a freeway of five lanes
+    """
+    return FakeSumo()
+
+
+@pytest.fixture
+def context(sumo):
+    """
+    A SimulationContext of its own, connected to the sumo fixture
+    """
+    context = SimulationContext(label="test")
+    context.connection = sumo
+    return context
+
+
+@pytest.fixture
+def add_vehicle(context):
+    """
+    Returns a function which puts a background vehicle on the fake freeway and hands it to the VehicleManager of the
+    context fixture, returning its vehicle id
+    """
+    def add(lane, position, speed=0.0, commands=None, v2v=False):
+        vid = context.vehicle_counter.get_next_vehicle_id()
+        context.connection.place(vid, lane, position, speed, type_id="V2V_Car")
+        context.vehicle_manager.add_vehicle(Vehicle(vid, commands=commands or dict(), v2v=v2v, context=context,
+                                                    desired_speed=speed))
+        return vid
+    return add
+
+
+@pytest.fixture
+def fake_sumo(monkeypatch):
+    """
+    Make every SimulationContext started during the test drive a FakeSumo instead of a SUMO instance
+    """
+    install(monkeypatch)
@@ -0,0 +1,455 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+
+import copy
+import functools
+from collections import Counter
+
+import traci.constants as tc
+from traci.exceptions import TraCIException
+
+import ccparams as cc
+
+
+def counted(method):
+    """
+    Decorator which counts the calls of a traci method of a fake domain by "domain.method"
+    """
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self.sumo.calls["%s.%s" % (self.NAME, name)] += 1
+        return method(self, *args, **kwargs)
+    return wrapper
+
+
+class FakeCar:
+    """
+    The state SUMO keeps of one vehicle on the fake freeway
+    """
+    def __init__(self, road, lane, position, speed, type_id, length, min_gap):
+        self.road = road
+        self.lane = lane
+        self.position = position
+        self.speed = speed
+        self.desired_speed = speed
+        self.acceleration = 0.0
+        self.distance = 0.0
+        self.target_lane = None
+        self.fixed_speed = False
+        self.type_id = type_id
+        self.length = length
+        self.min_gap = min_gap
+        self.parameters = dict()
+
+
+class FakeDomain:
+    NAME = None
+
+    def __init__(self, sumo):
+        self.sumo = sumo
+
+    def _setConnection(self, connection):
+        # traci points its module level domains to the current connection
+        pass
+
+    def get_car(self, vid):
+        car = self.sumo.cars.get(vid)
+        if car is None:
+            raise TraCIException("Vehicle '%s' is not known." % vid)
+        return car
+
+
+class FakeVehicleDomain(FakeDomain):
+    NAME = "vehicle"
+
+    @counted
+    def add(self, vehID, routeID, typeID="DEFAULT_VEHTYPE", departLane="first", departPos="base", departSpeed="0",
+            **kwargs):
+        self.sumo.place(vehID, int(departLane), float(departPos), float(departSpeed), type_id=typeID)
+
+    @counted
+    def remove(self, vehID, reason=tc.REMOVE_VAPORIZED):
+        self.get_car(vehID)
+        del self.sumo.cars[vehID]
+        self.sumo.subscriptions.pop(vehID, None)
+        self.sumo.context_subscriptions.pop(vehID, None)
+
+    @counted
+    def moveTo(self, vehID, laneID, pos, reason=0):
+        car = self.get_car(vehID)
+        car.road, lane = laneID.rsplit("_", 1)
+        car.lane = int(lane)
+        car.position = pos
+        car.target_lane = None
+
+    @counted
+    def setSpeed(self, vehID, speed):
+        car = self.get_car(vehID)
+        car.fixed_speed = speed >= 0
+        if car.fixed_speed:
+            car.speed = car.desired_speed = speed
+
+    @counted
+    def setPreviousSpeed(self, vehID, speed, acceleration=tc.INVALID_DOUBLE_VALUE):
+        self.get_car(vehID).speed = speed
+
+    @counted
+    def setLaneChangeMode(self, vehID, lcm):
+        self.get_car(vehID)
+
+    @counted
+    def changeLane(self, vehID, laneIndex, duration):
+        self.get_car(vehID).target_lane = laneIndex
+
+    @counted
+    def setColor(self, vehID, color):
+        self.get_car(vehID)
+
+    @counted
+    def setParameter(self, objectID, key, value):
+        car = self.get_car(objectID)
+        car.parameters[key] = value
+        if key == "carFollowModel." + cc.PAR_CC_DESIRED_SPEED:
+            car.desired_speed = float(value)
+
+    @counted
+    def getParameter(self, objectID, key):
+        car = self.get_car(objectID)
+        if key == "carFollowModel." + cc.PAR_SPEED_AND_ACCELERATION:
+            x, y = self.sumo.get_xy(car)
+            return cc.pack(car.speed, car.acceleration, car.acceleration, x, y, self.sumo.time, 0, 0, 0)
+        return car.parameters.get(key, "")
+
+    @counted
+    def getIDList(self):
+        return tuple(self.sumo.cars)
+
+    @counted
+    def getRoadID(self, vehID):
+        return self.get_car(vehID).road
+
+    @counted
+    def getLaneIndex(self, vehID):
+        return self.get_car(vehID).lane
+
+    @counted
+    def getLanePosition(self, vehID):
+        return self.get_car(vehID).position
+
+    @counted
+    def getSpeed(self, vehID):
+        return self.get_car(vehID).speed
+
+    @counted
+    def getAcceleration(self, vehID):
+        return self.get_car(vehID).acceleration
+
+    @counted
+    def getDistance(self, vehID):
+        return self.get_car(vehID).distance
+
+    @counted
+    def getPosition(self, vehID):
+        return self.sumo.get_xy(self.get_car(vehID))
+
+    @counted
+    def getLength(self, vehID):
+        return self.get_car(vehID).length
+
+    @counted
+    def getLeader(self, vehID, dist=100.0):
+        nearest = self.sumo.find(vehID, 0, True)
+        if nearest is None or nearest[1] > dist:
+            return None
+        return nearest
+
+    def get_neighbours(self, vid, offset, ahead):
+        nearest = self.sumo.find(vid, offset, ahead)
+        return () if nearest is None else (nearest,)
+
+    @counted
+    def getLeftLeaders(self, vehID):
+        return self.get_neighbours(vehID, 1, True)
+
+    @counted
+    def getLeftFollowers(self, vehID):
+        return self.get_neighbours(vehID, 1, False)
+
+    @counted
+    def getRightLeaders(self, vehID):
+        return self.get_neighbours(vehID, -1, True)
+
+    @counted
+    def getRightFollowers(self, vehID):
+        return self.get_neighbours(vehID, -1, False)
+
+    @counted
+    def subscribe(self, objectID, varIDs=(tc.VAR_ROAD_ID, tc.VAR_LANEPOSITION), begin=None, end=None):
+        self.get_car(objectID)
+        self.sumo.subscriptions[objectID] = tuple(varIDs)
+
+    @counted
+    def unsubscribe(self, objectID):
+        self.sumo.subscriptions.pop(objectID, None)
+
+    @counted
+    def getSubscriptionResults(self, objectID):
+        variables = self.sumo.subscriptions.get(objectID)
+        if variables is None or objectID not in self.sumo.cars:
+            return {}
+        return self.sumo.get_variables(self.sumo.cars[objectID], variables)
+
+    @counted
+    def getAllSubscriptionResults(self):
+        return {vid: self.sumo.get_variables(self.sumo.cars[vid], variables)
+                for vid, variables in self.sumo.subscriptions.items() if vid in self.sumo.cars}
+
+    @counted
+    def subscribeContext(self, objectID, domain, dist, varIDs=(tc.VAR_ROAD_ID, tc.VAR_LANEPOSITION), begin=None,
+                         end=None):
+        self.get_car(objectID)
+        self.sumo.context_subscriptions[objectID] = (dist, tuple(varIDs))
+
+    @counted
+    def unsubscribeContext(self, objectID, domain, dist):
+        self.sumo.context_subscriptions.pop(objectID, None)
+
+    @counted
+    def getContextSubscriptionResults(self, objectID):
+        subscription = self.sumo.context_subscriptions.get(objectID)
+        ego = self.sumo.cars.get(objectID)
+        if subscription is None or ego is None:
+            return {}
+        distance, variables = subscription
+        # the fake has no network, so vehicles on other edges are in range when their lane position is
+        return {vid: self.sumo.get_variables(car, variables) for vid, car in self.sumo.cars.items()
+                if abs(car.position - ego.position) <= distance}
+
+
+class FakeVehicleTypeDomain(FakeDomain):
+    NAME = "vehicletype"
+
+    @counted
+    def getLength(self, typeID):
+        return self.sumo.vehicle_length
+
+    @counted
+    def getMinGap(self, typeID):
+        return self.sumo.min_gap
+
+    @counted
+    def getMaxSpeed(self, typeID):
+        return self.sumo.max_speed
+
+
+class FakeEdgeDomain(FakeDomain):
+    NAME = "edge"
+
+    @counted
+    def getLaneNumber(self, edgeID):
+        return self.sumo.lanes
+
+
+class FakeLaneDomain(FakeDomain):
+    NAME = "lane"
+
+    @counted
+    def getLength(self, laneID):
+        return self.sumo.lane_length
+
+    @counted
+    def subscribe(self, objectID, varIDs=(tc.LAST_STEP_VEHICLE_NUMBER,), begin=None, end=None):
+        self.sumo.lane_subscriptions[objectID] = tuple(varIDs)
+
+    @counted
+    def getSubscriptionResults(self, objectID):
+        if objectID not in self.sumo.lane_subscriptions:
+            return {}
+        road, lane = objectID.rsplit("_", 1)
+        cars = [car for car in self.sumo.cars.values() if car.road == road and car.lane == int(lane)]
+        return {tc.LAST_STEP_VEHICLE_NUMBER: len(cars),
+                tc.LAST_STEP_OCCUPANCY: sum(car.length for car in cars) / self.sumo.lane_length}
+
+
+class FakeSimulationDomain(FakeDomain):
+    NAME = "simulation"
+
+    @counted
+    def getDeltaT(self):
+        return self.sumo.step_length
+
+    @counted
+    def getTime(self):
+        return self.sumo.time
+
+    @counted
+    def saveState(self, fileName):
+        self.sumo.states[fileName] = copy.deepcopy((self.sumo.time, self.sumo.cars))
+
+    @counted
+    def loadState(self, fileName):
+        self.sumo.time, self.sumo.cars = copy.deepcopy(self.sumo.states[fileName])
+
+
+class FakeGuiDomain(FakeDomain):
+    NAME = "gui"
+
+    @counted
+    def trackVehicle(self, viewID, vehID):
+        pass
+
+    @counted
+    def setZoom(self, viewID, zoom):
+        pass
+
+
+class FakeSumo:
+    """
+    Stand-in for a traci connection to a SUMO instance with a single multi-lane freeway edge. Vehicles accelerate
+    towards their desired speed, brake for the vehicle ahead and change lanes within one step, which is enough for
+    the decision logic to run without SUMO. Every traci call is counted by "domain.method" in calls
+    """
+    def __init__(self, road="freeway", lanes=5, lane_length=50000.0, step_length=0.01, vehicle_length=4.0,
+                 min_gap=2.0, max_speed=44.4, lane_width=3.2):
+        self.road = road
+        self.lanes = lanes
+        self.lane_length = lane_length
+        self.step_length = step_length
+        self.vehicle_length = vehicle_length
+        self.min_gap = min_gap
+        self.max_speed = max_speed
+        self.lane_width = lane_width
+
+        self.time = 0.0
+        self.cars = dict()
+        self.subscriptions = dict()
+        self.context_subscriptions = dict()
+        self.lane_subscriptions = dict()
+        self.states = dict()
+        self.calls = Counter()
+        self.closed = False
+
+        self.vehicle = FakeVehicleDomain(self)
+        self.vehicletype = FakeVehicleTypeDomain(self)
+        self.edge = FakeEdgeDomain(self)
+        self.lane = FakeLaneDomain(self)
+        self.simulation = FakeSimulationDomain(self)
+        self.gui = FakeGuiDomain(self)
+
+    def place(self, vid, lane, position, speed=0.0, road=None, type_id="DEFAULT_VEHTYPE", length=None):
+        """
+        Put a vehicle on the freeway, or on the given road
+
+        :param vid: the vehicle id
+        :param lane: the lane index
+        :param position: the position of the front of the vehicle on its lane
+        :param speed: the speed, which is also its desired speed
+        :param road: the edge id, the freeway by default
+        :param type_id: the vehicle type
+        :param length: the length of the vehicle, that of every vehicle type by default
+        """
+        self.cars[vid] = FakeCar(road or self.road, lane, position, speed, type_id, length or self.vehicle_length,
+                                 self.min_gap)
+
+    def get_xy(self, car):
+        return car.position, car.lane * self.lane_width
+
+    def get_variables(self, car, variables):
+        values = {
+            tc.VAR_TYPE: car.type_id,
+            tc.VAR_ROAD_ID: car.road,
+            tc.VAR_LANE_INDEX: car.lane,
+            tc.VAR_LANEPOSITION: car.position,
+            tc.VAR_SPEED: car.speed,
+            tc.VAR_ACCELERATION: car.acceleration,
+            tc.VAR_DISTANCE: car.distance,
+            tc.VAR_POSITION: self.get_xy(car),
+            tc.VAR_LENGTH: car.length,
+            tc.VAR_MINGAP: car.min_gap,
+        }
+        return {variable: values[variable] for variable in variables}
+
+    def find(self, vid, offset, ahead):
+        """
+        Returns the nearest vehicle ahead of or behind the given one in the lane at the given offset as a (vid, gap)
+        tuple like traci does, or None. In an adjacent lane a vehicle alongside counts as ahead
+        """
+        ego = self.cars[vid]
+        lane = ego.lane + offset
+        nearest = None
+        for other, car in self.cars.items():
+            if other == vid or car.road != ego.road or car.lane != lane:
+                continue
+            if ahead and (car.position > ego.position or offset != 0 and car.position == ego.position):
+                gap = car.position - car.length - ego.position - ego.min_gap
+            elif not ahead and car.position < ego.position:
+                gap = ego.position - ego.length - car.position - car.min_gap
+            else:
+                continue
+            if nearest is None or gap < nearest[1]:
+                nearest = (other, gap)
+        return nearest
+
+    def simulationStep(self, step=0.0):
+        self.calls["simulationStep"] += 1
+        for vid, car in self.cars.items():
+            target = car.desired_speed
+            leader = self.find(vid, 0, True)
+            if leader is not None and leader[1] < 20:
+                target = min(target, self.cars[leader[0]].speed + (leader[1] - 1.5) * 0.5)
+            if not car.fixed_speed:
+                car.acceleration = max(-5.0, min(2.0, target - car.speed))
+                car.speed = max(0.0, car.speed + car.acceleration * self.step_length)
+            car.position += car.speed * self.step_length
+            car.distance += car.speed * self.step_length
+            if car.target_lane is not None:
+                car.lane = max(0, min(self.lanes - 1, car.target_lane))
+        self.time += self.step_length
+        return []
+
+    def getVersion(self):
+        return tc.TRACI_VERSION, "FakeSumo"
+
+    def close(self, wait=True):
+        self.closed = True
+
+
+def install(monkeypatch=None, **kwargs):
+    """
+    Make every SimulationContext started from now on drive a FakeSumo instead of a SUMO instance
+
+    :param monkeypatch: the pytest monkeypatch fixture which undoes the change after the test, or None to keep it
+    :param kwargs: the arguments of the FakeSumo
+    """
+    from SimulationContext import SimulationContext
+
+    def start(context, config_file, gui=True, options=()):
+        context.connection = FakeSumo(**kwargs)
+
+    def close(context):
+        context.connection.close()
+
+    patch = setattr if monkeypatch is None else monkeypatch.setattr
+    patch(SimulationContext, "start", start)
+    patch(SimulationContext, "close", close)
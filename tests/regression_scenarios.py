@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+
+"""
+Runs the regression scenarios on the FakeSumo backend and prints the traci calls of each of them by method, together
+with a digest of the decisions, so that the call counts and the decisions of two revisions or of two modes can be
+compared without SUMO. From the root of the repository:
+
+    PYTHONPATH=src python -m tests.regression_scenarios
+    PYTHONPATH=src python -m tests.regression_scenarios --estimate 0.1 --surroundings 160
+
+Only the public Simulation API is used, so the script can be copied into an older revision together with
+tests/fake_sumo.py to measure that revision
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import random
+from collections import Counter
+
+from SimulationContext import SimulationContext
+from VehicleCounter import VehicleCounter
+from .fake_sumo import install
+
+# the number of seeds of the dense scenarios, and the traci methods which look up the vehicles around a platoon
+DENSE_SEEDS = (3, 7, 8, 9)
+BACKGROUND_READS = "vehicle.getParameter of background vehicles"
+NEIGHBOUR_QUERIES = ("vehicle.getLeader", "vehicle.getLeftLeaders", "vehicle.getLeftFollowers",
+                     "vehicle.getRightLeaders", "vehicle.getRightFollowers")
+
+
+def overtake(simulation):
+    """
+    A platoon of six which overtakes a slow vehicle in its lane, with V2V vehicles to either side
+    """
+    simulation.add_platoon(platoon_length=6, platoon_start_position=100, platoon_start_lane=2,
+                           platoon_desired_speed=40)
+    simulation.add_vehicle(vehicle_start_position=200, vehicle_start_lane=2, vehicle_start_speed=20)
+    simulation.add_vehicle(vehicle_start_position=205, vehicle_start_lane=3, vehicle_start_speed=20, v2v=True)
+    simulation.add_vehicle(vehicle_start_position=170, vehicle_start_lane=1, vehicle_start_speed=20)
+    simulation.add_vehicle(vehicle_start_position=80, vehicle_start_lane=3, vehicle_start_speed=20, v2v=True)
+    simulation.set_simulation_time_length(30)
+
+
+def make_dense(seed):
+    """
+    Returns a scenario of a platoon of eight in dense traffic of 60 vehicles placed with the given random seed
+    """
+    def dense(simulation):
+        random.seed(seed)
+        simulation.add_platoon(platoon_length=8, platoon_start_position=100, platoon_start_lane=2,
+                               platoon_desired_speed=40)
+        for _ in range(60):
+            simulation.add_vehicle(vehicle_start_position=120 + random.randint(0, 100) * 6,
+                                   vehicle_start_lane=random.randint(0, 4),
+                                   vehicle_start_speed=random.randint(15, 30), v2v=random.choice([True, False]))
+        simulation.set_simulation_time_length(40)
+    return dense
+
+
+SCENARIOS = [("overtake", overtake)] + [("dense%d" % seed, make_dense(seed)) for seed in DENSE_SEEDS]
+
+
+def run(name, scenario, estimate=None, surroundings=None, lane_monitor=None):
+    """
+    Run a scenario on a FakeSumo and returns the traci calls by method, the metrics of the run and a digest of
+    where every vehicle ended up, which changes with any decision of the platoons
+
+    :param name: the name of the scenario, used as the label of its context
+    :param scenario: the function which adds the platoon and the vehicles to the Simulation
+    :param estimate: the threshold of the state estimator, if vehicle states are estimated
+    :param surroundings: the radar distance, if platoons subscribe to their surroundings
+    :param lane_monitor: the blocked occupancy of the lane monitor, False for a monitor without one
+    """
+    from Simulation import Simulation
+
+    simulation = Simulation(context=SimulationContext(label=name), gui=False)
+    sumo = simulation.connection
+    if estimate is not None:
+        simulation.estimate_vehicle_states(estimate)
+    if surroundings is not None:
+        simulation.subscribe_platoon_surroundings(surroundings)
+    if lane_monitor is not None:
+        simulation.monitor_lanes(lane_monitor or None)
+    scenario(simulation)
+    # the reads of background vehicles are what the state estimator saves
+    background_reads = Counter()
+    get_parameter = sumo.vehicle.getParameter
+
+    def count_background_reads(vid, key):
+        if not vid.startswith(VehicleCounter.ID_PRE_PLATOON):
+            background_reads[BACKGROUND_READS] += 1
+        return get_parameter(vid, key)
+    sumo.vehicle.getParameter = count_background_reads
+    with contextlib.redirect_stdout(io.StringIO()):
+        _, metrics = simulation.run()
+    positions = sorted((vid, car.road, car.lane, round(car.position, 6)) for vid, car in sumo.cars.items())
+    digest = hashlib.sha1(json.dumps(positions).encode()).hexdigest()[:12]
+    return sumo.calls + background_reads, metrics, digest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Count the traci calls of the regression scenarios on FakeSumo")
+    parser.add_argument("--estimate", type=float, help="estimate vehicle states with the given threshold in meters")
+    parser.add_argument("--surroundings", type=float, help="subscribe to platoon surroundings within this radar "
+                                                           "distance")
+    parser.add_argument("--lane-monitor", type=float, help="monitor lanes, blocked from this occupancy on, 0 for "
+                                                           "free lanes only")
+    parser.add_argument("--calls", type=int, default=8, help="the number of methods to list per scenario")
+    arguments = parser.parse_args()
+    install()
+
+    totals = Counter()
+    for name, scenario in SCENARIOS:
+        calls, metrics, digest = run(name, scenario, arguments.estimate, arguments.surroundings,
+                                     arguments.lane_monitor)
+        totals.update(calls)
+        background_reads = calls.pop(BACKGROUND_READS, 0)
+        print("%s: decisions %s, %d lane changes, %d splits, %d traci calls, %d background reads" % (
+            name, digest, metrics["lane_changes"], metrics["splits"], sum(calls.values()), background_reads))
+        for method, count in calls.most_common(arguments.calls):
+            print("    %-44s %9d" % (method, count))
+    background_reads = totals.pop(BACKGROUND_READS, 0)
+    print("all scenarios: %d traci calls, %d neighbour queries, %d parameter reads of background vehicles" % (
+        sum(totals.values()), sum(totals[method] for method in NEIGHBOUR_QUERIES), background_reads))
+    for method, count in totals.most_common(arguments.calls):
+        print("    %-44s %9d" % (method, count))
+
+
+if __name__ == "__main__":
+    main()
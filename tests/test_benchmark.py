@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+
+from Benchmark import DEFAULT_CASE, compare, get_case_name, get_cases
+
+
+def test_get_cases_varies_one_parameter_at_a_time():
+    cases = get_cases({"vehicles": (100, 1000), "v2v_share": (0.0, 0.5)})
+
+    assert cases == [dict(DEFAULT_CASE, vehicles=100), DEFAULT_CASE, dict(DEFAULT_CASE, v2v_share=0.0)]
+
+
+def test_compare_flags_measurements_which_grew_beyond_the_threshold():
+    name = get_case_name(DEFAULT_CASE)
+    baseline = {"results": {name: {"wall_per_simulated_second": 2.0, "calls_per_step": 100.0,
+                                   "python_peak_rss_kb": 50000}}}
+    entry = {"results": {name: {"wall_per_simulated_second": 2.1, "calls_per_step": 150.0,
+                                "python_peak_rss_kb": 40000},
+                         "new case": {"calls_per_step": 1.0}}}
+
+    ratios, regressions = compare(entry, baseline, threshold=0.1)
+
+    assert ratios == {name: {"wall_per_simulated_second": 1.05, "calls_per_step": 1.5, "python_peak_rss_kb": 0.8}}
+    assert regressions == [(name, "calls_per_step", 1.5)]
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+import pickle
+
+from Checkpoint import Checkpoint
+from PlatoonState import PlatoonState
+from Simulation import Simulation
+from SimulationContext import SimulationContext
+from Vehicle import Vehicle
+
+
+def test_vehicle_commands_survive_a_checkpoint(fake_sumo, tmp_path):
+    simulation = Simulation(context=SimulationContext(label="warm-up"), gui=False)
+    platoon = simulation.add_platoon(platoon_length=3, platoon_start_position=100, platoon_start_lane=1)
+    platoon.state = PlatoonState.STATE_OVERTAKING_LEFT
+    commands = {1000: Vehicle.CMD_CHANGE_LANE_LEFT, 1500: Vehicle.CMD_CHANGE_LANE_RIGHT}
+    vid = simulation.add_vehicle(vehicle_start_position=300, vehicle_start_lane=1, v2v=True, commands=commands)
+    simulation.step = 42
+    checkpoint = Checkpoint(str(tmp_path))
+    checkpoint.save(simulation)
+
+    restored = Simulation(context=SimulationContext(label="variant"), gui=False)
+    restored.connection.states = simulation.connection.states
+    checkpoint.load(restored)
+
+    vehicle = restored.context.vehicle_manager.vehicles[vid]
+    assert vehicle.commands == commands
+    assert vehicle.v2v
+    assert restored.step == 42
+    [restored_platoon] = restored.context.platoon_manager.platoons
+    assert restored_platoon.vehicles == platoon.vehicles
+    assert restored_platoon.state == PlatoonState.STATE_OVERTAKING_LEFT
+
+
+def test_vehicle_commands_change_lanes_after_a_checkpoint(context, add_vehicle):
+    vid = add_vehicle(lane=1, position=300, commands={5: Vehicle.CMD_CHANGE_LANE_LEFT})
+    data = pickle.loads(pickle.dumps(context.vehicle_manager.vehicles[vid].to_dict()))
+    vehicle = Checkpoint.restore_vehicle(context, data)
+
+    vehicle.tick(5)
+
+    assert context.connection.cars[vid].target_lane == 2
@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+import struct
+
+import pytest
+import traci
+import traci.constants as tc
+from traci.connection import Connection
+from traci.domain import DOMAINS
+from traci.exceptions import TraCIException
+
+import ccparams as cc
+import CommandPipeline as command_pipeline
+from CommandPipeline import CommandPipeline
+from Instrumentation import Instrumentation, InstrumentedConnection
+from utils import change_lane, get_par, set_par
+
+
+class LoopbackSocket:
+    """
+    Stand-in for the socket of a traci connection, which answers every message like sumo would, keeping vehicle
+    parameters in a dictionary
+    """
+    def __init__(self):
+        self.parameters = dict()
+        self.messages = 0
+        self.answer = bytes()
+        self.unknown = set()
+
+    def send(self, data):
+        self.messages += 1
+        data = data[4:]
+        answer = bytes()
+        while data:
+            length, command = struct.unpack("!BB", data[:2])
+            variable, id_length = struct.unpack("!Bi", data[2:7])
+            vid = data[7:7 + id_length].decode("latin1")
+            values = data[7 + id_length:length]
+            data = data[length:]
+            if vid in self.unknown:
+                error = "Vehicle '%s' is not known" % vid
+                answer += struct.pack("!BBBi", 7 + len(error), command, tc.RTYPE_ERR, len(error)) + error.encode()
+                continue
+            answer += struct.pack("!BBBi", 7, command, tc.RTYPE_OK, 0)
+            if command == tc.CMD_GET_VEHICLE_VARIABLE:
+                key_length = struct.unpack("!i", values[1:5])[0]
+                key = values[5:5 + key_length].decode("latin1")
+                value = self.parameters.get((vid, key), "").encode("latin1")
+                body = struct.pack("!BBi", command + 16, variable, len(vid)) + vid.encode("latin1")
+                body += struct.pack("!Bi", tc.TYPE_STRING, len(value)) + value
+                answer += struct.pack("!B", len(body) + 1) + body
+            elif variable == tc.VAR_PARAMETER:
+                key_length = struct.unpack("!i", values[6:10])[0]
+                key = values[10:10 + key_length].decode("latin1")
+                value = values[15 + key_length:].decode("latin1")
+                self.parameters[(vid, key)] = value
+        self.answer = struct.pack("!i", len(answer) + 4) + answer
+
+    def recv(self, size):
+        data, self.answer = self.answer[:size], self.answer[size:]
+        return data
+
+
+def loopback_connection():
+    connection = Connection.__new__(Connection)
+    connection._socket = LoopbackSocket()
+    connection._string = bytes()
+    connection._queue = []
+    connection._subscriptionMapping = dict()
+    for domain in DOMAINS:
+        domain._register(connection, connection._subscriptionMapping)
+    return connection
+
+
+def test_command_pipeline_sends_one_message_per_phase():
+    connection = loopback_connection()
+    with CommandPipeline(connection) as pipeline:
+        for vid in ("platoon.0", "platoon.1", "platoon.2"):
+            set_par(vid, cc.PAR_CC_DESIRED_SPEED, 30, pipeline)
+            change_lane(vid, 3, pipeline)
+        assert connection._socket.messages == 0
+    assert connection._socket.messages == 1
+    assert pipeline.flushes == 1
+    assert connection._socket.parameters[("platoon.1", "carFollowModel.ccds")] == "30"
+
+
+def test_command_pipeline_resolves_replies_as_futures():
+    connection = loopback_connection()
+    connection._socket.parameters[("v.0", "carFollowModel.ccds")] = "25"
+    pipeline = CommandPipeline(connection)
+    set_par("v.1", cc.PAR_CC_DESIRED_SPEED, 20, pipeline)
+    first = get_par("v.0", cc.PAR_CC_DESIRED_SPEED, pipeline)
+    second = get_par("v.1", cc.PAR_CC_DESIRED_SPEED, pipeline)
+    assert not first.done
+    # asking for one result sends the whole message, in the order the commands were issued
+    assert second.result() == "20"
+    assert first.done and first.result() == "25"
+    assert connection._socket.messages == 1
+    # the connection can still be used directly afterwards
+    assert connection.vehicle.getParameter("v.0", "carFollowModel.ccds") == "25"
+
+
+def test_command_pipeline_raises_after_resolving_the_other_commands():
+    connection = loopback_connection()
+    connection._socket.unknown.add("v.1")
+    pipeline = CommandPipeline(connection)
+    set_par("v.0", cc.PAR_CC_DESIRED_SPEED, 20, pipeline)
+    missing = get_par("v.1", cc.PAR_CC_DESIRED_SPEED, pipeline)
+    known = get_par("v.0", cc.PAR_CC_DESIRED_SPEED, pipeline)
+    with pytest.raises(TraCIException):
+        pipeline.flush()
+    assert known.result() == "20"
+    with pytest.raises(TraCIException):
+        missing.result()
+
+
+def test_instrumented_connections_are_pipelined_and_report_every_command():
+    connection = loopback_connection()
+    instrumentation = Instrumentation()
+    with CommandPipeline(InstrumentedConnection(connection, instrumentation)) as pipeline:
+        for vid in ("platoon.0", "platoon.1", "platoon.2"):
+            set_par(vid, cc.PAR_CC_DESIRED_SPEED, 30, pipeline)
+            change_lane(vid, 3, pipeline)
+    assert connection._socket.messages == 1
+
+    site = "test_command_pipeline.test_instrumented_connections_are_pipelined_and_report_every_command"
+    calls = instrumentation.to_dict()["calls"]
+    assert calls["vehicle.setParameter"] == {site: 3}
+    assert calls["vehicle.changeLane"] == {site: 3}
+    assert calls["CommandPipeline.flush"] == {site: 1}
+
+
+def test_command_pipeline_executes_right_away_on_other_connections():
+    class RecordingConnection:
+        def __init__(self):
+            self.vehicle = self
+            self.calls = []
+
+        def setParameter(self, vid, key, value):
+            self.calls.append(("setParameter", vid, key, value))
+
+        def getParameter(self, vid, key):
+            return "%s/%s" % (vid, key)
+
+    connection = RecordingConnection()
+    pipeline = CommandPipeline(connection)
+    set_par("v.0", cc.PAR_CC_DESIRED_SPEED, 20, pipeline)
+    assert connection.calls == [("setParameter", "v.0", "carFollowModel.ccds", "20")]
+    assert get_par("v.0", cc.PAR_CC_DESIRED_SPEED, pipeline).result() == "v.0/carFollowModel.ccds"
+
+
+@pytest.mark.parametrize("internal", ["_RESULTS", "Connection", "_parse"])
+def test_command_pipeline_executes_right_away_without_the_traci_internals(monkeypatch, internal):
+    # a traci version the internals cannot be imported from
+    monkeypatch.setattr(command_pipeline, internal, None)
+    connection = loopback_connection()
+    connection._socket.parameters[("v.0", "carFollowModel.ccds")] = "25"
+    with CommandPipeline(connection) as pipeline:
+        assert pipeline.raw is None
+        set_par("v.1", cc.PAR_CC_DESIRED_SPEED, 20, pipeline)
+        reply = get_par("v.0", cc.PAR_CC_DESIRED_SPEED, pipeline)
+        assert reply.done and reply.result() == "25"
+        assert connection._socket.messages == 2
+    assert pipeline.flushes == 0
+    assert connection._socket.parameters[("v.1", "carFollowModel.ccds")] == "20"
+
+
+@pytest.mark.parametrize("internal", ["_pack", "_recvExact", "_socket"])
+def test_connections_without_the_internals_are_not_pipelined(monkeypatch, internal):
+    connection = loopback_connection()
+    # a traci version which renamed the internal
+    if internal == "_socket":
+        del connection._socket
+    else:
+        monkeypatch.delattr(Connection, internal)
+
+    assert not command_pipeline.supports_pipelining(connection)
+    assert CommandPipeline(connection).raw is None
+
+
+def test_current_connection_is_not_pipelined_without_the_traci_connections(monkeypatch):
+    monkeypatch.delattr(traci.main, "_connections")
+
+    assert CommandPipeline(traci).raw is None
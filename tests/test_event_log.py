@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+import json
+
+from EventLog import EventLog
+
+
+def test_event_log_drops_events_below_level():
+    event_log = EventLog(level=EventLog.INFO)
+    event_log.log(EventLog.DEBUG, "v2v_gps_match", vehicle="v.0", match="v.1")
+    event_log.log(EventLog.INFO, "platoon_split", leader="v.0", index=2)
+
+    assert not event_log.is_enabled(EventLog.DEBUG)
+    assert event_log.get_events() == [(0, EventLog.INFO, "platoon_split", {"leader": "v.0", "index": 2})]
+
+
+def test_event_log_ring_buffer_keeps_newest_events():
+    event_log = EventLog(buffer_size=3)
+    for i in range(5):
+        event_log.step = i
+        event_log.log(EventLog.INFO, "tick")
+
+    assert [step for step, _, _, _ in event_log.get_events()] == [2, 3, 4]
+
+
+def test_event_log_writes_json_lines(tmp_path):
+    path = tmp_path / "events.jsonl"
+    event_log = EventLog(buffer_size=2)
+    event_log.open(path, EventLog.DEBUG)
+    for i in range(5):
+        event_log.step = i
+        event_log.log(EventLog.DEBUG, "v2v_gps_match", vehicle="v.%d" % i)
+    event_log.close()
+
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [record["step"] for record in records] == list(range(5))
+    assert records[0] == {"step": 0, "level": "DEBUG", "event": "v2v_gps_match", "vehicle": "v.0"}
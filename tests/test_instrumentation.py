@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+import ccparams as cc
+from Instrumentation import Instrumentation, InstrumentedConnection, LogHistogram
+from StateEstimator import StateEstimator
+from .test_command_pipeline import loopback_connection
+
+
+def test_log_histogram_percentiles():
+    histogram = LogHistogram()
+    for value in range(1, 1001):
+        histogram.add(value)
+
+    assert histogram.count == 1000
+    assert histogram.max == 1000
+    assert 500 <= histogram.get_percentile(50) <= 1023
+    assert histogram.get_percentile(100) == 1000
+
+
+class FakeConnection:
+    def simulationStep(self):
+        return []
+
+
+def test_instrumented_connection_counts_calls_by_site():
+    instrumentation = Instrumentation()
+    connection = InstrumentedConnection(FakeConnection(), instrumentation)
+
+    connection.simulationStep()
+    connection.simulationStep()
+
+    site = "test_instrumentation.test_instrumented_connection_counts_calls_by_site"
+    assert instrumentation.calls == {("simulationStep", site): 2}
+
+
+def test_reads_through_the_state_estimator_are_counted_for_their_caller():
+    connection = loopback_connection()
+    state = cc.pack(30.0, 0.5, 0.5, 100.0, 1.6, 2.0, 0, 0, 0)
+    connection._socket.parameters[("platoon.0", "carFollowModel." + cc.PAR_SPEED_AND_ACCELERATION)] = state
+    instrumentation = Instrumentation()
+
+    state = StateEstimator().get_state("platoon.0", InstrumentedConnection(connection, instrumentation))
+
+    assert state[0] == 30.0
+    site = "test_instrumentation.test_reads_through_the_state_estimator_are_counted_for_their_caller"
+    assert instrumentation.calls == {("vehicle.getParameter", site): 1}
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+
+from Direction import Direction
+from LaneMonitor import LaneMonitor
+from Platoon import Platoon
+
+
+def test_lane_monitor_tells_free_and_blocked_lanes(sumo, context):
+    sumo.lanes = 3
+    sumo.lane_length = 1000.0
+    platoon = Platoon(n=3, pos=500.0, lane=1, context=context)
+    # ten trucks of 60 meters occupy 60 percent of the right lane
+    for i in range(10):
+        sumo.place("truck.%d" % i, 0, 100.0 * i + 60, length=60.0)
+
+    monitor = LaneMonitor(context)
+    assert monitor.get_status(platoon, Direction.LEFT) == LaneMonitor.FREE
+    # without a threshold a crowded lane is still checked vehicle by vehicle
+    assert monitor.get_status(platoon, Direction.RIGHT) is None
+
+    monitor = LaneMonitor(context, blocked_occupancy=0.5)
+    assert monitor.get_status(platoon, Direction.RIGHT) == LaneMonitor.BLOCKED
+    assert monitor.get_status(platoon, Direction.RIGHT) == LaneMonitor.BLOCKED
+    assert set(sumo.lane_subscriptions) == {"freeway_0", "freeway_2"}
+    assert sumo.calls["lane.subscribe"] == 3
+
+
+def test_lane_monitor_checks_members_when_the_lane_data_is_ambiguous(sumo, context):
+    sumo.lanes = 3
+    sumo.lane_length = 1000.0
+    platoon = Platoon(n=3, pos=500.0, lane=1, context=context)
+    monitor = LaneMonitor(context)
+
+    # changing lanes
+    sumo.vehicle.moveTo(platoon.vehicles[0], "freeway_2", 500.0)
+    assert monitor.get_status(platoon, Direction.LEFT) is None
+    # close to the end of the edge, vehicles on the next edge may drive alongside
+    for i, vid in enumerate(platoon.vehicles):
+        sumo.vehicle.moveTo(vid, "freeway_1", 990.0 - 6 * i)
+    assert monitor.get_status(platoon, Direction.LEFT) is None
+    # there is no lane left of the leftmost lane
+    for i, vid in enumerate(platoon.vehicles):
+        sumo.vehicle.moveTo(vid, "freeway_2", 500.0 - 6 * i)
+    assert monitor.get_status(platoon, Direction.LEFT) is None
+    assert monitor.ambiguous == 3
@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+import json
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from Checkpoint import Checkpoint
+from Direction import Direction
+from EventLog import EventLog
+from Lookahead import Horizon, Lookahead
+from Manoeuvre import Manoeuvre
+from Simulation import Simulation
+from SimulationContext import SimulationContext
+from Vehicle import Vehicle
+
+OPTIONS = [(Manoeuvre.CHANGE_LANE, Direction.LEFT, None), (Manoeuvre.SPLIT, Direction.LEFT, 2),
+           (Manoeuvre.WAIT, None, None)]
+# the mean distance each manoeuvre makes the platoon drive in score_option
+PROGRESS = {Manoeuvre.CHANGE_LANE: 40.0, Manoeuvre.SPLIT: 60.0}
+
+
+def score_option(config_file, checkpoint_directory, leader, option, horizon):
+    """
+    Stand-in for Simulation.simulate_option which scores an option without simulating it, after checking that the
+    checkpoint holds the deciding platoon. Waiting fails like a crashed simulation
+    """
+    with open(os.path.join(checkpoint_directory, Checkpoint.CONTEXT_FILE)) as f:
+        data = json.load(f)
+    assert leader in [p["vehicles"][0] for p in data["platoons"]]
+    manoeuvre, _, _ = option
+    return PROGRESS[manoeuvre] * horizon / Lookahead.DEFAULT_HORIZON
+
+
+def get_process_id(config_file, checkpoint_directory, leader, option, horizon):
+    return os.getpid()
+
+
+def fail(config_file, checkpoint_directory, leader, option, horizon):
+    raise RuntimeError("sumo not found")
+
+
+@pytest.fixture
+def simulation(fake_sumo):
+    simulation = Simulation(context=SimulationContext(label="lookahead"), gui=False)
+    simulation.step_length = 0.01
+    simulation.step = 100
+    # the checkpoint of every decision holds a vehicle with commands
+    simulation.add_vehicle(vehicle_start_position=300, vehicle_start_lane=1,
+                           commands={500: Vehicle.CMD_CHANGE_LANE_LEFT})
+    return simulation
+
+
+def test_horizon_measures_the_progress_when_it_ends(sumo):
+    for vid, distance in (("platoon.0", 120.0), ("platoon.1", 100.0), ("v.0", 500.0)):
+        sumo.place(vid, 1, distance)
+        sumo.cars[vid].distance = distance
+    simulation = SimpleNamespace(step=100, connection=sumo)
+    horizon = Horizon(5, ["platoon.0", "platoon.1"])
+    horizon.start(simulation, 0.01)
+
+    simulation.step = 599
+    assert not horizon.is_met(simulation)
+    assert horizon.progress is None
+    simulation.step = 600
+    assert horizon.is_met(simulation)
+    assert horizon.progress == 110.0
+
+
+def test_best_option_is_reported_without_being_applied(simulation, tmp_path):
+    platoon = simulation.add_platoon(platoon_length=3, platoon_start_position=100, platoon_start_lane=1)
+    lookahead = Lookahead(simulation, score_option, max_workers=2)
+    try:
+        assert lookahead.choose(platoon, OPTIONS) == OPTIONS[0]
+    finally:
+        lookahead.close()
+
+    [decision] = lookahead.decisions
+    assert decision["step"] == 100
+    assert decision["leader"] == platoon.vehicles[0]
+    assert [option["progress"] for option in decision["options"]] == [40.0, 60.0, None]
+    assert [option["error"] for option in decision["options"]] == [None, None, "KeyError: <Manoeuvre.WAIT: 4>"]
+    assert decision["best"] == 1
+    assert decision["chosen"] == 0
+    lookahead.dump(tmp_path / "decisions.json")
+    with open(tmp_path / "decisions.json") as f:
+        assert json.load(f)["decisions"] == lookahead.decisions
+
+
+def test_best_option_is_applied_and_held_for_the_horizon(simulation):
+    platoon = simulation.add_platoon(platoon_length=3, platoon_start_position=100, platoon_start_lane=1)
+    lookahead = Lookahead(simulation, score_option, horizon=2, apply=True, max_workers=2)
+    try:
+        assert lookahead.choose(platoon, OPTIONS) == OPTIONS[1]
+        assert lookahead.decisions[0]["options"][1]["progress"] == 24.0
+        simulation.step += 199
+        assert lookahead.choose(platoon, OPTIONS) == OPTIONS[1]
+        assert len(lookahead.decisions) == 1
+        # the horizon of the decision has passed
+        simulation.step += 1
+        assert lookahead.choose(platoon, OPTIONS) == OPTIONS[1]
+        # the held option is no longer possible
+        simulation.step += 1
+        assert lookahead.choose(platoon, [OPTIONS[0], OPTIONS[2]]) == OPTIONS[0]
+    finally:
+        lookahead.close()
+    assert [decision["step"] for decision in lookahead.decisions] == [100, 300, 301]
+
+
+def test_options_are_simulated_in_worker_processes(simulation):
+    platoon = simulation.add_platoon(platoon_length=3, platoon_start_position=100, platoon_start_lane=1)
+    lookahead = Lookahead(simulation, get_process_id, max_workers=2)
+    try:
+        process_ids, _ = lookahead.simulate(platoon, OPTIONS)
+    finally:
+        lookahead.close()
+
+    assert len(process_ids) == len(OPTIONS)
+    assert os.getpid() not in process_ids
+    assert lookahead.executor is None
+
+
+def test_failed_simulations_are_reported_and_logged(simulation):
+    platoon = simulation.add_platoon(platoon_length=3, platoon_start_position=100, platoon_start_lane=1)
+    lookahead = Lookahead(simulation, fail, apply=True, max_workers=2)
+    try:
+        assert lookahead.choose(platoon, OPTIONS) == OPTIONS[0]
+    finally:
+        lookahead.close()
+
+    [decision] = lookahead.decisions
+    assert [option["progress"] for option in decision["options"]] == [None, None, None]
+    assert [option["error"] for option in decision["options"]] == ["RuntimeError: sumo not found"] * 3
+    warnings = [(event, fields) for _, level, event, fields in simulation.context.event_log.get_events()
+                if level == EventLog.WARNING]
+    assert [fields["manoeuvre"] for _, fields in warnings] == ["CHANGE_LANE", "SPLIT", "WAIT"]
+    assert all(event == "lookahead_option_failed" and fields["leader"] == platoon.vehicles[0]
+               for event, fields in warnings)
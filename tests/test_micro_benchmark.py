@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+
+import SumoOutput
+from Direction import Direction
+from MicroBenchmark import ALONGSIDE, OUT_OF_REACH, make_platoon, run, write_fcd
+
+
+def test_synthetic_data_makes_the_routines_check_the_whole_platoon():
+    platoon, connection = make_platoon(8, ALONGSIDE)
+    index, vehicles = platoon.get_v2v_vehicles_up_to_index(Direction.LEFT, connection.get_v2v_snapshot())
+    assert index == 8
+    assert vehicles == {f"v.{2 * i}" for i in range(8)}
+
+    platoon, _ = make_platoon(8, OUT_OF_REACH)
+    assert platoon.get_lane_change_split_index(Direction.RIGHT) == 8
+
+
+def test_run_reports_every_size_and_the_scaling():
+    report = run(["ccparams.pack", "Platoon.split"], sizes=(2, 4), min_time=0.001, repeat=2)
+
+    assert set(report) == {"ccparams.pack", "Platoon.split"}
+    for result in report.values():
+        assert set(result["sizes"]) == {2, 4}
+        assert all(measurement["ns_per_op"] > 0 for measurement in result["sizes"].values())
+        assert result["scaling"] is not None
+
+
+def test_synthetic_fcd_output_has_the_requested_records(tmp_path):
+    path = str(tmp_path / "fcd.xml")
+    write_fcd(path, 250, vehicles=100)
+
+    table = SumoOutput.load(path, SumoOutput.FCD)
+    assert len(table) == 250
+    assert table["time"][-1] == 0.02
+    assert len(table.names["id"]) == 100
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+
+from Direction import Direction
+from Platoon import Platoon
+from PlatoonState import PlatoonState
+
+
+def make_platoon(sumo, context):
+    platoon = Platoon(n=3, pos=100.0, lane=1, speed=30, context=context)
+    sumo.place("v.0", 1, 120.0, 20.0)
+    platoon.leader_distance = 10.2
+    return platoon
+
+
+def next_step(platoon):
+    platoon.step += 1
+
+
+def test_should_evaluate_skips_quiet_steps_without_traci_queries(sumo, context):
+    platoon = make_platoon(sumo, context)
+    assert platoon.should_evaluate("v.0")
+    # asked again within the same step, e.g. by the other branch of the tick
+    assert platoon.should_evaluate("v.0")
+
+    calls = sum(sumo.calls.values())
+    for _ in range(Platoon.DEBOUNCE_STEPS - 1):
+        next_step(platoon)
+        assert not platoon.should_evaluate("v.0")
+        platoon.leader_distance -= 0.01
+    assert sum(sumo.calls.values()) == calls
+    # the debounce timer expired
+    next_step(platoon)
+    assert platoon.should_evaluate("v.0")
+
+
+def test_should_evaluate_notices_changes_of_its_inputs(sumo, context):
+    platoon = make_platoon(sumo, context)
+    assert platoon.should_evaluate("v.0")
+
+    # the vehicle ahead comes closer
+    next_step(platoon)
+    platoon.leader_distance = 9.4
+    assert platoon.should_evaluate("v.0")
+    # another vehicle ahead
+    next_step(platoon)
+    assert platoon.should_evaluate("v.1")
+    next_step(platoon)
+    platoon.set_state(PlatoonState.STATE_OVERTAKING_LEFT)
+    assert platoon.should_evaluate("v.1")
+    next_step(platoon)
+    platoon.vehicles = platoon.vehicles[:2]
+    assert platoon.should_evaluate("v.1")
+    # a lane change completes with the next step
+    platoon.change_lane(Direction.LEFT)
+    next_step(platoon)
+    assert platoon.should_evaluate("v.1")
+    next_step(platoon)
+    assert not platoon.should_evaluate("v.1")
+
+
+def test_should_evaluate_notices_neighbours_in_the_subscribed_surroundings(sumo, context):
+    context.radar_distance = 160
+    platoon = make_platoon(sumo, context)
+    assert platoon.should_evaluate("v.0")
+    next_step(platoon)
+    assert not platoon.should_evaluate("v.0")
+    assert not platoon.should_evaluate("v.0")
+    assert sumo.calls["vehicle.getContextSubscriptionResults"] == 2
+
+    # a vehicle drives up alongside the platoon
+    next_step(platoon)
+    sumo.place("v.1", 2, 95.0, 30.0)
+    assert platoon.should_evaluate("v.0")
+    assert not [call for call in sumo.calls if call.startswith(("vehicle.getLeft", "vehicle.getRight"))]
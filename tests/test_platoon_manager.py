@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+import pytest
+
+import ccparams as cc
+from Platoon import Platoon
+from PlatoonManager import PlatoonManager
+from StreamingMetrics import PlatoonMetrics
+from utils import communicate, get_distance, get_par, set_par
+
+
+class ScheduledPlatoon:
+    """
+    Stand-in for a Platoon which only provides what the evaluation scheduler of the PlatoonManager looks at
+    """
+    def __init__(self, name, urgency=None):
+        self.name = name
+        self.urgency = urgency
+        self.metrics = PlatoonMetrics()
+
+    def get_urgency(self):
+        return self.urgency
+
+
+def test_tick_order_serves_urgent_platoons_first():
+    manager = PlatoonManager()
+    manager.platoons = [ScheduledPlatoon("a"), ScheduledPlatoon("b", urgency=50), ScheduledPlatoon("c"),
+                        ScheduledPlatoon("d", urgency=0)]
+
+    assert [p.name for p in manager.get_tick_order()] == ["d", "b", "a", "c"]
+    assert [p.name for p in manager.get_tick_order()] == ["d", "b", "c", "a"]
+
+
+def test_evaluations_over_budget_are_deferred():
+    manager = PlatoonManager(evaluation_budget=2)
+    platoons = [ScheduledPlatoon(name) for name in "abc"]
+    manager.evaluations_left = manager.evaluation_budget
+
+    assert [manager.acquire_evaluation(p) for p in platoons] == [True, True, False]
+    assert platoons[2].metrics.deferred_evaluations == 1
+
+
+def communicate_per_platoon(platoon):
+    """
+    The communication of a single platoon as Platoon.communicate did it before all platoons were served in one pass,
+    returning the leader speed and the GPS front gap per vehicle like utils.communicate
+    """
+    data = dict()
+    for i, vid in enumerate(platoon.vehicles):
+        if i == 0:
+            if platoon.leader is None:
+                continue
+            leader = platoon.leader
+            front = platoon.leader
+        else:
+            leader = platoon.vehicles[0]
+            front = platoon.vehicles[i - 1]
+
+        (l_v, l_a, l_u, l_x, l_y, l_t, _, _, _) = cc.unpack(get_par(leader, cc.PAR_SPEED_AND_ACCELERATION,
+                                                                     platoon.connection))
+        (f_v, f_a, f_u, f_x, f_y, f_t, _, _, _) = cc.unpack(get_par(front, cc.PAR_SPEED_AND_ACCELERATION,
+                                                                     platoon.connection))
+        set_par(vid, cc.PAR_LEADER_SPEED_AND_ACCELERATION, cc.pack(l_v, l_u, l_x, l_y, l_t), platoon.connection)
+        set_par(vid, cc.PAR_PRECEDING_SPEED_AND_ACCELERATION, cc.pack(f_v, f_u, f_x, f_y, f_t), platoon.connection)
+        f_d = get_distance(vid, front, platoon.connection)
+        set_par(vid, cc.PAR_LEADER_FAKE_DATA, cc.pack(l_v, l_u), platoon.connection)
+        set_par(vid, cc.PAR_FRONT_FAKE_DATA, cc.pack(f_v, f_u, f_d), platoon.connection)
+        data[vid] = (l_v, f_d)
+    return data
+
+
+def overlapping_platoons(context):
+    """
+    Two platoons where the leader of the rear one is fed the data of the last vehicle of the front one, each vehicle
+    with a speed and acceleration of its own
+    """
+    front = Platoon(n=3, pos=500, lane=1, speed=30, context=context)
+    rear = Platoon(n=3, pos=470, lane=1, speed=30, context=context)
+    rear.set_leader(front.vehicles[-1])
+    for i, vid in enumerate(front.vehicles + rear.vehicles):
+        car = context.connection.cars[vid]
+        car.speed = 25.0 + i
+        car.acceleration = 0.25 * i - 0.5
+    manager = context.platoon_manager
+    manager.platoons = [front, rear]
+    return manager
+
+
+def get_parameters(sumo):
+    return {vid: dict(car.parameters) for vid, car in sumo.cars.items()}
+
+
+def set_parameters(sumo, parameters):
+    for vid, car in sumo.cars.items():
+        car.parameters = dict(parameters[vid])
+
+
+def test_fleet_pass_feeds_the_cacc_like_the_per_platoon_loop(context, sumo):
+    manager = overlapping_platoons(context)
+    before = get_parameters(sumo)
+    expected = dict()
+    for platoon in manager.platoons:
+        expected.update(communicate_per_platoon(platoon))
+    expected_parameters = get_parameters(sumo)
+    set_parameters(sumo, before)
+    sumo.calls.clear()
+
+    topology = dict()
+    for platoon in manager.platoons:
+        topology.update(platoon.get_topology())
+    data = communicate(topology, sumo)
+
+    assert data.keys() == expected.keys()
+    for vid, (l_v, f_d) in expected.items():
+        assert data[vid][0] == l_v
+        assert data[vid][1] == pytest.approx(f_d)
+    assert get_parameters(sumo) == expected_parameters
+    # the last vehicle of the front platoon is read once, although both platoons need its data
+    assert sumo.calls["vehicle.getParameter"] == 6
+
+
+def test_fleet_pass_updates_each_platoon_like_the_per_platoon_loop(context, sumo):
+    manager = overlapping_platoons(context)
+    expected = [communicate_per_platoon(platoon) for platoon in manager.platoons]
+
+    manager.communicate()
+
+    for platoon, data in zip(manager.platoons, expected):
+        follower_data = [data[vid] for vid in platoon.vehicles[1:]]
+        assert platoon.speed == follower_data[-1][0]
+        assert platoon.metrics.gap.count == len(follower_data)
+        assert platoon.metrics.gap.mean == pytest.approx(sum(f_d for _, f_d in follower_data) / len(follower_data))
+        assert platoon.communicated_step == platoon.step
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+import multiprocessing
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import ccparams as cc
+import SegmentedSimulation as segmented_simulation
+from SegmentedSimulation import SegmentedSimulation, get_halo_segments, get_segment
+from SimulationContext import SimulationContext
+from Vehicle import Vehicle
+
+
+def test_get_segment_clamps_positions_to_the_segments():
+    assert get_segment("freeway", 0.0, 1000, 3) == 0
+    assert get_segment("freeway", 999.9, 1000, 3) == 0
+    assert get_segment("freeway", 1000.0, 1000, 3) == 1
+    assert get_segment("freeway", 5000.0, 1000, 3) == 2
+
+
+def test_get_segment_puts_vehicles_off_the_freeway_in_the_last_segment():
+    assert get_segment("exit", 10.0, 1000, 3) == 2
+
+
+def test_get_halo_segments_returns_the_neighbours_mirroring_a_position():
+    assert get_halo_segments(1, 1500.0, 1000, 3, 300) == []
+    assert get_halo_segments(1, 1100.0, 1000, 3, 300) == [0]
+    assert get_halo_segments(1, 1800.0, 1000, 3, 300) == [2]
+    assert get_halo_segments(0, 100.0, 1000, 3, 300) == []
+    assert get_halo_segments(2, 2900.0, 1000, 3, 300) == []
+    assert get_halo_segments(1, 1500.0, 1000, 3, 600) == [0, 2]
+
+
+@pytest.fixture
+def segment_sumos(fake_sumo, monkeypatch):
+    """
+    Runs the workers of a SegmentedSimulation in threads, talking to it over the same pipes as worker processes do,
+    and returns a dictionary which points the label of each segment to its FakeSumo
+    """
+    monkeypatch.setattr(segmented_simulation, "multiprocessing",
+                        SimpleNamespace(Pipe=multiprocessing.Pipe, Process=threading.Thread))
+    sumos = dict()
+    start = SimulationContext.start
+
+    def start_segment(context, *args, **kwargs):
+        start(context, *args, **kwargs)
+        sumos[context.label] = context.connection
+    monkeypatch.setattr(SimulationContext, "start", start_segment)
+    return sumos
+
+
+def test_handed_off_vehicles_keep_their_commands_and_platoons_their_state(segment_sumos):
+    simulation = SegmentedSimulation(segments=2, segment_length=1000, run_time_seconds=4, halo=300)
+    simulation.add_platoon(platoon_length=3, platoon_start_position=940, platoon_start_lane=1,
+                           platoon_desired_speed=30)
+    # the vehicle changes lanes after it was handed off to the second segment
+    simulation.add_vehicle(vehicle_start_position=970, vehicle_start_lane=3, vehicle_start_speed=30,
+                           commands={300: Vehicle.CMD_CHANGE_LANE_LEFT})
+    _, metrics = simulation.run()
+
+    first, second = segment_sumos["segment.0"], segment_sumos["segment.1"]
+    vehicle = second.cars["v.3"]
+    assert vehicle.position > 1000
+    assert vehicle.lane == 4
+    assert vehicle.parameters["carFollowModel." + cc.PAR_ACTIVE_CONTROLLER] == str(cc.ACC)
+    for vid in ("platoon.0", "platoon.1", "platoon.2"):
+        assert second.cars[vid].position > 1000
+        assert second.cars[vid].parameters["carFollowModel." + cc.PAR_ACTIVE_CONTROLLER] != str(cc.DRIVER)
+    # the first segment mirrors the vehicle as a ghost while it is within its halo
+    assert first.cars["v.3"].lane == 4
+    assert first.cars["v.3"].position == pytest.approx(vehicle.position, abs=1)
+    assert len(metrics["platoons"]) == 1
+
+
+def test_run_needs_a_time_length(segment_sumos):
+    simulation = SegmentedSimulation(segments=2, segment_length=1000)
+    with pytest.raises(ValueError):
+        simulation.run()
+
+    # the segments are still there to run once the time length is set
+    simulation.set_simulation_time_length(0.1)
+    total_simulation_time, _ = simulation.run()
+    assert total_simulation_time == pytest.approx(0.11)
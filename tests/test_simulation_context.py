@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+
+import pytest
+import traci
+from traci.exceptions import TraCIException
+
+from EventLog import EventLog
+import SimulationContext as simulation_context
+from SimulationContext import SimulationContext
+from TraceExporter import NULL_SPAN
+from .fake_sumo import FakeSumo
+
+
+@pytest.fixture
+def connect(monkeypatch):
+    """
+    Let SimulationContext.start register a FakeSumo with traci instead of starting SUMO, and returns the FakeSumo
+    of each label
+    """
+    instances = dict()
+
+    def start_sumo(config_file, already_running, label, gui, options):
+        instances[label] = FakeSumo()
+        monkeypatch.setattr(traci.main, "connect", lambda *args, **kwargs: instances[label])
+        traci.init(label=label, doSwitch=False)
+
+    monkeypatch.setattr(simulation_context, "start_sumo", start_sumo)
+    yield instances
+    for label in instances:
+        try:
+            traci.switch(label)
+            traci.close()
+        except TraCIException:
+            pass
+
+
+def test_contexts_drive_and_close_their_own_connections(connect):
+    first = SimulationContext(label="first")
+    second = SimulationContext(label="second")
+    first.start("map.sumocfg", gui=False)
+    second.start("map.sumocfg", gui=False)
+    traci.switch("second")
+    assert first.connection is connect["first"]
+    assert second.connection is connect["second"]
+
+    first.close()
+    assert connect["first"].closed
+    assert first.connection is traci
+    with pytest.raises(TraCIException):
+        traci.getConnection("first")
+    # the connection which was current stays current
+    assert traci.getLabel() == "second"
+    assert not connect["second"].closed
+
+    # the label is free to be started again
+    first.start("map.sumocfg", gui=False)
+    assert traci.getConnection("first") is connect["first"]
+    first.close()
+
+
+def test_context_owns_its_managers_and_is_not_traced_by_default(context):
+    context.vehicle_counter.get_next_vehicle_id()
+    context.event_log.log(EventLog.INFO, "event")
+    assert context.trace("step") is NULL_SPAN
+    assert context.v2v.vehicle_manager is context.vehicle_manager
+
+    context.reset()
+    assert context.vehicle_counter.get_next_vehicle_id() == "v.0"
+    assert context.event_log.get_events() == []
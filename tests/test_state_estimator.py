@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+import pytest
+
+import ccparams as cc
+from StateEstimator import StateEstimator
+
+
+class ParameterConnection:
+    """
+    Stand-in for a traci connection which answers PAR_SPEED_AND_ACCELERATION from a dictionary of states
+    """
+    def __init__(self):
+        self.vehicle = self
+        self.states = dict()
+        self.reads = 0
+
+    def getParameter(self, vid, key):
+        self.reads += 1
+        return cc.pack(*self.states[vid])
+
+
+def test_state_estimator_predicts_between_reads():
+    connection = ParameterConnection()
+    estimator = StateEstimator()
+    estimator.enable(0.01, threshold=0.1, max_acceleration_change=10)
+    assert estimator.horizon == 14
+
+    for step in range(10):
+        estimator.step = step
+        t = step * 0.01
+        connection.states["v.0"] = (20 + t, 1.0, 1.0, 100 + 20 * t + 0.5 * t ** 2, 8.0, t, 0, 0, 0)
+        state = estimator.get_state("v.0", connection)
+        assert state[3] == pytest.approx(connection.states["v.0"][3])
+        assert state[0] == pytest.approx(connection.states["v.0"][0])
+
+    # two reads are needed to know the direction of travel
+    assert connection.reads == 2
+
+
+def test_state_estimator_reads_platoon_vehicles_and_invalidated_vehicles():
+    connection = ParameterConnection()
+    connection.states = {"platoon.0": (30, 0, 0, 50, 8, 0, 0, 0, 0), "v.1": (20, 0, 0, 80, 8, 0, 0, 0, 0)}
+    estimator = StateEstimator()
+    estimator.enable(0.01)
+
+    for step in range(3):
+        estimator.step = step
+        estimator.get_state("platoon.0", connection)
+    assert connection.reads == 3
+
+    estimator.get_state("v.1", connection)
+    estimator.invalidate("v.1")
+    estimator.get_state("v.1", connection)
+    assert connection.reads == 5
+
+
+def test_state_estimator_stops_decelerating_vehicles():
+    state = StateEstimator.predict((2, -4, -4, 0, 0, 0, 0, 0, 0), 1, 0, 1)
+
+    assert state[0] == 0
+    assert state[3] == pytest.approx(0.5)
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+import numpy
+import pytest
+
+from PlatoonState import PlatoonState
+from StreamingMetrics import PlatoonMetrics, RunningStatistics
+
+
+def test_running_statistics_matches_numpy():
+    values = numpy.random.default_rng(1).normal(10, 3, 10_000)
+    statistics = RunningStatistics()
+    for value in values:
+        statistics.add(value)
+
+    assert statistics.mean == pytest.approx(values.mean())
+    assert statistics.get_variance() == pytest.approx(values.var())
+    assert statistics.min == values.min() and statistics.max == values.max()
+
+
+def test_running_statistics_merge_matches_single_stream():
+    values = numpy.random.default_rng(2).normal(5, 2, 1_000)
+    front, rear = RunningStatistics(), RunningStatistics()
+    for value in values[:300]:
+        front.add(value)
+    for value in values[300:]:
+        rear.add(value)
+
+    front.merge(rear)
+
+    assert front.count == len(values)
+    assert front.mean == pytest.approx(values.mean())
+    assert front.get_variance() == pytest.approx(values.var())
+
+
+def test_platoon_metrics_to_dict():
+    metrics = PlatoonMetrics()
+    metrics.tick(True)
+    metrics.tick(False)
+    metrics.add_state_transition(PlatoonState.STATE_CRUISING, PlatoonState.STATE_OVERTAKING_LEFT)
+
+    result = metrics.to_dict(0.01)
+
+    assert result["time"] == pytest.approx(0.02)
+    assert result["time_below_desired_speed"] == pytest.approx(0.01)
+    assert result["state_transitions"] == {"STATE_CRUISING -> STATE_OVERTAKING_LEFT": 1}
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+import numpy as np
+
+import SumoOutput
+
+FCD = """<?xml version="1.0" encoding="UTF-8"?>
+<fcd-export>
+    <timestep time="0.00">
+        <vehicle id="platoon.0" x="100.00" y="8.00" angle="90.00" type="PlatoonCar" speed="20.00" pos="100.00"
+                 lane="freeway_2" slope="0.00"/>
+        <vehicle id="v.0" x="130.00" y="8.00" angle="90.00" type="V2V_Car" speed="15.00" pos="130.00"
+                 lane="freeway_2" slope="0.00"/>
+    </timestep>
+    <timestep time="0.01">
+        <vehicle id="platoon.0" x="100.20" y="8.00" angle="90.00" type="PlatoonCar" speed="20.01" pos="100.20"
+                 lane="freeway_3" slope="0.00"/>
+    </timestep>
+</fcd-export>
+"""
+
+TRIP_INFO = """<?xml version="1.0" encoding="UTF-8"?>
+<tripinfos>
+    <tripinfo id="v.0" depart="0.00" arrival="52.10" duration="52.10" routeLength="1000.00" waitingTime="0.00"
+              timeLoss="3.20"/>
+</tripinfos>
+"""
+
+
+def test_load_fcd_into_columns(tmp_path):
+    path = tmp_path / "fcd.xml"
+    path.write_text(FCD)
+    table = SumoOutput.load(str(path), SumoOutput.FCD)
+
+    assert len(table) == 3
+    np.testing.assert_allclose(table["time"], [0, 0, 0.01])
+    np.testing.assert_allclose(table["x"], [100, 130, 100.2])
+    assert table["id"].dtype == np.int32
+    assert table.decode("id").tolist() == ["platoon.0", "v.0", "platoon.0"]
+    assert table.decode("lane").tolist() == ["freeway_2", "freeway_2", "freeway_3"]
+    assert table["speed"][table["id"] == table.get_code("id", "platoon.0")].tolist() == [20.0, 20.01]
+    assert table.get_code("id", "v.1") == -1
+
+
+def test_load_tripinfo_and_arguments(tmp_path):
+    path = tmp_path / "tripinfo.xml"
+    path.write_text(TRIP_INFO)
+    table = SumoOutput.load(str(path), SumoOutput.TRIP_INFO)
+    assert table.decode("id").tolist() == ["v.0"]
+    assert table["timeLoss"].tolist() == [3.2]
+
+    directory = str(tmp_path / "run")
+    arguments = SumoOutput.get_arguments(directory, (SumoOutput.FCD, SumoOutput.LANE_CHANGE))
+    assert arguments == ["--fcd-output", directory + "/fcd.xml", "--lanechange-output", directory + "/lanechange.xml"]
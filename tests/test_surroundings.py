@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+
+from Platoon import Platoon
+from Surroundings import SUBSCRIBED_VARIABLES, Surroundings
+
+
+def test_surroundings_answers_neighbour_queries_from_the_subscription(sumo, context):
+    platoon = Platoon(n=2, pos=100.0, lane=1, context=context)
+    sumo.place("v.0", 1, 130.0)
+    sumo.place("v.1", 2, 101.0)
+    sumo.place("v.2", 2, 80.0)
+    sumo.place("v.3", 0, 93.0)
+    surroundings = Surroundings(platoon, radar_distance=50)
+    surroundings.update()
+    assert sumo.context_subscriptions == {"platoon.0": (60, SUBSCRIBED_VARIABLES)}
+
+    # gaps are measured from the back of the leader to the front of the follower, less the gap it keeps
+    assert surroundings.getLeader("platoon.0") == ("v.0", 130 - 4 - 100 - 2)
+    assert surroundings.getLeftLeaders("platoon.0") == (("v.1", 101 - 4 - 100 - 2),)
+    assert surroundings.getLeftFollowers("platoon.1") == (("v.2", 94 - 4 - 80 - 2),)
+    assert surroundings.getRightLeaders("platoon.1") == ()
+    assert surroundings.getRightFollowers("platoon.0") == (("v.3", 100 - 4 - 93 - 2),)
+    assert surroundings.getLaneIndex("v.1") == 2
+    assert sumo.calls["vehicle.getContextSubscriptionResults"] == 1
+    assert not [call for call in sumo.calls if call.startswith(("vehicle.getLeft", "vehicle.getRight"))]
+    # the answers are those traci gives
+    assert surroundings.getLeftFollowers("platoon.1") == sumo.vehicle.getLeftFollowers("platoon.1")
+    assert surroundings.getRightFollowers("platoon.0") == sumo.vehicle.getRightFollowers("platoon.0")
+
+
+def test_surroundings_passes_queries_on_across_edges_and_follows_the_platoon(sumo, context):
+    platoon = Platoon(n=2, pos=100.0, lane=1, context=context)
+    sumo.place("v.0", 2, 60.0, road="exit")
+    surroundings = Surroundings(platoon, radar_distance=50)
+    surroundings.update()
+    assert surroundings.getLeftLeaders("platoon.0") == ()
+    assert sumo.calls["vehicle.getLeftLeaders"] == 1
+
+    # after a split the subscription shrinks, after a new leader it moves
+    platoon.vehicles = ["platoon.0"]
+    surroundings.update()
+    assert sumo.context_subscriptions == {"platoon.0": (54, SUBSCRIBED_VARIABLES)}
+    platoon.vehicles = ["platoon.1"]
+    surroundings.update()
+    assert sumo.context_subscriptions == {"platoon.1": (54, SUBSCRIBED_VARIABLES)}
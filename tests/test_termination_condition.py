@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+from types import SimpleNamespace
+
+from PlatoonState import PlatoonState
+from StreamingMetrics import PlatoonMetrics
+from TerminationCondition import LaneChangesMade, NoStateChange, PlatoonsCruising, TimeLimit
+
+
+def make_simulation(*platoons):
+    """
+    Returns a stand-in for a Simulation which only provides what the termination conditions look at
+    """
+    return SimpleNamespace(step=0, context=SimpleNamespace(platoon_manager=SimpleNamespace(platoons=list(platoons))))
+
+
+def make_platoon(state=PlatoonState.STATE_CRUISING, speed=30, desired_speed=30):
+    return SimpleNamespace(state=state, speed=speed, desired_speed=desired_speed, metrics=PlatoonMetrics())
+
+
+def run_until_met(simulation, condition, max_steps=1000):
+    condition.start(simulation, 0.1)
+    while not condition.is_met(simulation):
+        simulation.step += 1
+        if simulation.step > max_steps:
+            return None
+    return simulation.step
+
+
+def test_time_limit_ends_after_the_last_step():
+    assert run_until_met(make_simulation(), TimeLimit(2)) == 21
+
+
+def test_cruising_platoons_end_after_the_held_time():
+    simulation = make_simulation(make_platoon(), make_platoon(speed=29.8))
+
+    assert run_until_met(simulation, PlatoonsCruising(1)) == 10
+
+
+def test_slow_platoon_is_not_cruising():
+    simulation = make_simulation(make_platoon(), make_platoon(speed=20))
+
+    # the states of the first step have nothing to compare to
+    assert run_until_met(simulation, PlatoonsCruising(1) | NoStateChange(5)) == 51
+
+
+def test_conditions_combine_with_and():
+    platoon = make_platoon()
+    simulation = make_simulation(platoon)
+    condition = LaneChangesMade() & PlatoonsCruising(1)
+
+    assert run_until_met(simulation, condition, max_steps=20) is None
+    platoon.metrics.lane_changes += 1
+    assert condition.is_met(simulation)
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+
+import json
+import os
+
+from TraceExporter import NULL_SPAN, TraceExporter
+
+
+def test_trace_exporter_writes_nested_spans_as_chrome_trace_events(tmp_path):
+    path = str(tmp_path / "trace.json")
+    exporter = TraceExporter(path, buffer_size=3)
+    exporter.set_step(4)
+    with exporter.span("Simulation.step", TraceExporter.CATEGORY_STEP):
+        with exporter.span("Platoon.tick", TraceExporter.CATEGORY_PLATOON, track="platoon.0", vehicles=6):
+            exporter.instant("STATE_OVERTAKING_LEFT", TraceExporter.CATEGORY_DECISION, track="platoon.0")
+    exporter.close()
+
+    with open(path) as f:
+        events = json.load(f)
+    # every track is named by a metadata event before its first event, events are written as they end
+    tracks = {event["args"]["name"]: event["tid"] for event in events if event["ph"] == "M"}
+    assert tracks == {"platoon.0": 0, "simulation": 1}
+    instant, inner, outer = [event for event in events if event["ph"] != "M"]
+    assert all(event["pid"] == os.getpid() for event in events)
+
+    assert (outer["name"], outer["cat"], outer["ph"], outer["tid"]) == ("Simulation.step", "step", "X", 1)
+    assert (inner["name"], inner["cat"], inner["ph"], inner["tid"]) == ("Platoon.tick", "platoon", "X", 0)
+    assert inner["args"] == {"vehicles": 6, "step": 4}
+    assert (instant["ph"], instant["s"], instant["tid"]) == ("i", "t", 0)
+    assert "dur" not in instant
+    # timestamps and durations are in microseconds, and the inner span lies within the outer one
+    assert 0 <= outer["ts"] <= inner["ts"] <= instant["ts"]
+    assert inner["ts"] + inner["dur"] <= outer["ts"] + outer["dur"]
+    assert instant["ts"] <= inner["ts"] + inner["dur"]
+
+
+def test_trace_exporter_samples_spans_but_not_instant_events(tmp_path):
+    path = str(tmp_path / "trace.json")
+    exporter = TraceExporter(path, every=10)
+    exporter.set_step(5)
+    assert exporter.span("Simulation.step", TraceExporter.CATEGORY_STEP) is NULL_SPAN
+    exporter.instant("platoon_split", TraceExporter.CATEGORY_DECISION)
+    exporter.close()
+
+    with open(path) as f:
+        events = json.load(f)
+    assert [event["ph"] for event in events] == ["M", "i"]
+    assert events[1]["args"] == {"step": 5}
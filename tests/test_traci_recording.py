@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+
+import pytest
+from traci.exceptions import TraCIException
+
+from TraciRecording import RecordingConnection, ReplayConnection, ReplayDivergence, TraciRecording
+
+
+class VehicleDomain:
+    def getLeader(self, vid, dist=100):
+        return ("v.1", 12.5)
+
+    def getSubscriptionResults(self, vid):
+        return {66: 3.0, 82: 1}
+
+    def getSpeed(self, vid):
+        raise TraCIException(f"Vehicle '{vid}' is not known")
+
+
+class StubConnection:
+    def __init__(self):
+        self.vehicle = VehicleDomain()
+        self.steps = 0
+
+    def simulationStep(self):
+        self.steps += 1
+        return []
+
+
+def record(path):
+    recording = TraciRecording(path)
+    connection = RecordingConnection(StubConnection(), recording)
+    connection.simulationStep()
+    assert connection.vehicle.getLeader("platoon.0", dist=160) == ("v.1", 12.5)
+    assert connection.vehicle.getSubscriptionResults("platoon.0") == {66: 3.0, 82: 1}
+    with pytest.raises(TraCIException):
+        connection.vehicle.getSpeed("v.9")
+    connection.simulationStep()
+    recording.close()
+
+
+def test_replay_serves_the_recorded_results(tmp_path):
+    path = str(tmp_path / "run.traci")
+    record(path)
+
+    recording = TraciRecording(path, replay=True)
+    connection = ReplayConnection(recording)
+    assert connection.simulationStep() == []
+    assert connection.vehicle.getLeader("platoon.0", dist=160) == ("v.1", 12.5)
+    assert connection.vehicle.getSubscriptionResults("platoon.0") == {66: 3.0, 82: 1}
+    with pytest.raises(TraCIException, match="is not known"):
+        connection.vehicle.getSpeed("v.9")
+    connection.simulationStep()
+    recording.close()
+    assert recording.calls == 5
+    assert recording.steps == 2
+
+
+def test_replay_flags_divergence(tmp_path):
+    path = str(tmp_path / "run.traci")
+    record(path)
+
+    connection = ReplayConnection(TraciRecording(path, replay=True))
+    connection.simulationStep()
+    with pytest.raises(ReplayDivergence, match=r"call 1 in step 1: expected vehicle\.getLeader"):
+        connection.vehicle.getLeader("platoon.1", dist=160)
+
+
+def test_replay_flags_calls_which_were_not_issued(tmp_path):
+    path = str(tmp_path / "run.traci")
+    record(path)
+
+    recording = TraciRecording(path, replay=True)
+    ReplayConnection(recording).simulationStep()
+    with pytest.raises(ReplayDivergence, match="4 recorded calls were not issued"):
+        recording.close()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+import json
+
+import numpy
+
+from PlatoonState import PlatoonState
+from TrajectoryAnalyzer import TrajectoryAnalyzer, decimate_min_max
+from TrajectoryRecorder import METADATA_FILE, RECORD_DTYPE
+
+
+def test_decimate_min_max_keeps_envelope():
+    x = numpy.arange(1_000_000, dtype=float)
+    y = numpy.sin(x / 10_000) + numpy.random.default_rng(1).random(len(x))
+
+    decimated_x, decimated_y = decimate_min_max(x, y, bins=1000)
+
+    assert len(decimated_x) == 2001
+    assert decimated_y.max() == y.max()
+    assert decimated_y.min() == y.min()
+    assert numpy.all(numpy.diff(decimated_x) >= 0)
+
+
+def test_decimate_min_max_short_series_unchanged():
+    x = numpy.arange(100, dtype=float)
+
+    decimated_x, decimated_y = decimate_min_max(x, x, bins=1000)
+
+    assert decimated_x is x and decimated_y is x
+
+
+def test_decimate_min_max_keeps_the_remainder_in_the_last_bin():
+    x = numpy.arange(1050, dtype=float)
+    y = numpy.zeros(len(x))
+    y[1020] = 5
+    y[1030] = -5
+
+    decimated_x, decimated_y = decimate_min_max(x, y, bins=100)
+
+    assert decimated_x[-3:].tolist() == [1020, 1030, 1049]
+    assert decimated_y.max() == 5 and decimated_y.min() == -5
+
+
+CRUISING = PlatoonState.STATE_CRUISING.value
+OVERTAKING = PlatoonState.STATE_OVERTAKING_LEFT.value
+
+# (step, vehicle, platoon, state, speed, position). the third platoon member falls behind and is split off after the
+# first step, while the others overtake. the fourth vehicle is not a platoon member
+ROWS = [
+    (0, 0, 0, CRUISING, 30.0, 100.0), (0, 1, 0, CRUISING, 30.0, 94.0), (0, 2, 0, CRUISING, 15.0, 88.0),
+    (0, 3, -1, 0, 20.0, 150.0),
+    (1, 0, 0, OVERTAKING, 30.0, 115.0), (1, 1, 0, OVERTAKING, 30.0, 109.0), (1, 2, 1, CRUISING, 15.0, 95.5),
+    (1, 3, -1, 0, 20.0, 160.0),
+    (2, 0, 0, OVERTAKING, 30.0, 130.0), (2, 1, 0, OVERTAKING, 30.0, 123.0), (2, 2, 1, CRUISING, 15.0, 103.0),
+    (2, 3, -1, 0, 20.0, 170.0),
+]
+
+
+def write_chunks(directory):
+    """
+    Write ROWS like a TrajectoryRecorder with a chunk size of five rows and a step length of half a second would
+    """
+    rows = numpy.zeros(len(ROWS), dtype=RECORD_DTYPE)
+    for i, (step, vehicle, platoon, state, speed, position) in enumerate(ROWS):
+        rows[i] = (step, vehicle, platoon, 1, 0, state, speed, 0.0, position, position - 50, position, 0.0)
+    chunks = list()
+    for i in range(0, len(rows), 5):
+        chunks.append(f"chunk_{len(chunks):05d}.npy")
+        numpy.save(directory / chunks[-1], rows[i:i + 5])
+    metadata = {"step_length": 0.5, "every": 1, "chunks": chunks,
+                "vehicles": ["platoon.0", "platoon.1", "platoon.2", "v.0"], "vehicle_lengths": [4.0, 4.0, 4.0, 4.7],
+                "desired_speeds": [30.0, 30.0], "states": {state.name: state.value for state in PlatoonState}}
+    (directory / METADATA_FILE).write_text(json.dumps(metadata))
+    return str(directory)
+
+
+def test_time_in_states_counts_each_platoon_once_per_step(tmp_path):
+    analyzer = TrajectoryAnalyzer(write_chunks(tmp_path))
+
+    assert analyzer.get_time_in_states() == {0: {"STATE_CRUISING": 0.5, "STATE_OVERTAKING_LEFT": 1.0},
+                                             1: {"STATE_CRUISING": 1.0}}
+    assert analyzer.get_split_count() == 1
+
+
+def test_gaps_are_measured_between_members_of_the_same_platoon(tmp_path):
+    analyzer = TrajectoryAnalyzer(write_chunks(tmp_path))
+
+    rows, gaps = analyzer.get_gaps()
+
+    # the follower rows of each step: both followers before the split, one after it
+    assert rows.tolist() == [1, 2, 5, 9]
+    assert gaps.tolist() == [2.0, 2.0, 2.0, 3.0]
+    assert analyzer.get_gap_statistics()["count"] == 4
+
+
+def test_time_lost_is_measured_against_the_desired_speed_of_the_platoon(tmp_path):
+    analyzer = TrajectoryAnalyzer(write_chunks(tmp_path))
+
+    assert analyzer.get_time_lost() == {"platoon.0": 0.0, "platoon.1": 0.0, "platoon.2": 0.75}
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+
+import json
+
+import numpy
+
+from TrajectoryComparison import EVENTS_FILE, RUN_FILE, TrajectoryComparison
+from TrajectoryRecorder import METADATA_FILE, RECORD_DTYPE
+
+
+def write_run(directory, speeds, events, time=10.0):
+    """
+    Write a run of one vehicle driving at the given speed in each step, one meter per meter/second
+    """
+    directory.mkdir()
+    rows = numpy.zeros(len(speeds), dtype=RECORD_DTYPE)
+    rows['step'] = numpy.arange(len(speeds))
+    rows['speed'] = speeds
+    rows['lane_position'] = rows['distance'] = numpy.cumsum(speeds)
+    numpy.save(directory / "chunk_00000.npy", rows)
+    metadata = {"step_length": 1.0, "every": 1, "chunks": ["chunk_00000.npy"], "vehicles": ["platoon.0"],
+                "vehicle_lengths": [4.0], "desired_speeds": [30.0], "states": {}}
+    (directory / METADATA_FILE).write_text(json.dumps(metadata))
+    (directory / EVENTS_FILE).write_text("".join(
+        json.dumps({"step": step, "event": "platoon_state_change", "leader": "platoon.0", "previous": previous,
+                    "next": state}) + "\n" for step, previous, state in events))
+    (directory / RUN_FILE).write_text(json.dumps({"time": time, "metrics": {}}))
+    return str(directory)
+
+
+EVENTS = [(3, "STATE_CRUISING", "STATE_OVERTAKING_LEFT"), (6, "STATE_OVERTAKING_LEFT", "STATE_CRUISING")]
+
+
+def test_equal_runs_are_equivalent(tmp_path):
+    baseline = write_run(tmp_path / "baseline", [30.0] * 10, EVENTS)
+    candidate = write_run(tmp_path / "candidate", [30.0] * 5 + [30.005] + [30.0] * 4, EVENTS)
+
+    report = TrajectoryComparison(baseline, candidate).compare()
+
+    assert report == {"equivalent": True, "first": None, "divergences": []}
+
+
+def test_first_divergence_is_reported(tmp_path):
+    baseline = write_run(tmp_path / "baseline", [30.0] * 10, EVENTS)
+    candidate = write_run(tmp_path / "candidate", [30.0] * 5 + [29.0] * 5,
+                          [EVENTS[0], (7, "STATE_OVERTAKING_LEFT", "STATE_CRUISING")], time=10.5)
+
+    report = TrajectoryComparison(baseline, candidate).compare()
+
+    assert not report["equivalent"]
+    assert report["first"] == {"kind": "position", "step": 5, "subject": "platoon.0", "baseline": 180.0,
+                               "candidate": 179.0}
+    assert [d["kind"] for d in report["divergences"]] == ["position", "speed", "platoon_state_change", "time"]
+
+
+def test_tolerances_accept_small_differences(tmp_path):
+    baseline = write_run(tmp_path / "baseline", [30.0] * 10, EVENTS)
+    candidate = write_run(tmp_path / "candidate", [30.0] * 10,
+                          [EVENTS[0], (7, "STATE_OVERTAKING_LEFT", "STATE_CRUISING")], time=10.5)
+
+    report = TrajectoryComparison(baseline, candidate, step_tolerance=1, time_tolerance=1).compare()
+
+    assert report["equivalent"]
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+
+import json
+
+import numpy
+
+import ccparams as cc
+from Platoon import Platoon
+from TrajectoryRecorder import METADATA_FILE, TrajectoryRecorder
+
+
+def load_rows(directory):
+    metadata = json.loads((directory / METADATA_FILE).read_text())
+    return metadata, numpy.concatenate([numpy.load(directory / chunk) for chunk in metadata["chunks"]])
+
+
+def test_recorder_flushes_full_buffers_to_chunks(sumo, context, add_vehicle, tmp_path):
+    platoon = Platoon(n=2, pos=100.0, lane=1, speed=30, context=context)
+    context.platoon_manager.add_platoon(platoon)
+    add_vehicle(0, 50.0, 20)
+    recorder = TrajectoryRecorder(context, str(tmp_path), chunk_size=3)
+
+    for step in range(4):
+        sumo.simulationStep()
+        recorder.record(step)
+    # the platoon members are recorded from the step after they were subscribed to, two rows per step
+    assert recorder.chunks == ["chunk_00000.npy", "chunk_00001.npy"]
+    assert recorder.index == 0
+    assert set(sumo.subscriptions) == {"platoon.0", "platoon.1"}
+    recorder.close(step_length=sumo.step_length)
+
+    metadata, rows = load_rows(tmp_path)
+    assert metadata["vehicles"] == ["platoon.0", "platoon.1"]
+    assert metadata["vehicle_lengths"] == [4.0, 4.0]
+    assert rows['step'].tolist() == [1, 1, 2, 2, 3, 3]
+    assert rows['vehicle'].tolist() == [0, 1] * 3
+    assert rows['controller'].tolist() == [cc.ACC, cc.CACC] * 3
+    assert (rows['platoon'] == 0).all() and (rows['lane'] == 1).all()
+    assert rows['lane_position'][-2:].tolist() == [sumo.cars[vid].position for vid in platoon.vehicles]
+    assert rows['x'][-1] == sumo.cars["platoon.1"].position
+
+
+def test_recorder_selects_all_vehicles_or_the_platoons_and_tracked_ones(sumo, context, add_vehicle, tmp_path):
+    context.platoon_manager.add_platoon(Platoon(n=2, pos=100.0, lane=1, speed=30, context=context))
+    background = add_vehicle(0, 50.0, 20)
+    sumo.place("truck", 2, 80.0, 25.0)
+    platoon_only = TrajectoryRecorder(context, str(tmp_path / "platoon"), every=2)
+    everything = TrajectoryRecorder(context, str(tmp_path / "all"), selection=TrajectoryRecorder.SELECT_ALL,
+                                    every=2)
+    for recorder in (platoon_only, everything):
+        recorder.track("truck")
+
+    for step in range(5):
+        if step == 4:
+            sumo.vehicle.remove("truck")
+        for recorder in (platoon_only, everything):
+            recorder.record(step)
+        sumo.simulationStep()
+    for recorder in (platoon_only, everything):
+        recorder.close(step_length=sumo.step_length)
+
+    # recorded every second step, from step 2 on, and the truck left before step 4
+    metadata, rows = load_rows(tmp_path / "platoon")
+    assert metadata["vehicles"] == ["platoon.0", "platoon.1", "truck"]
+    assert rows['step'].tolist() == [2, 2, 2, 4, 4]
+    metadata, rows = load_rows(tmp_path / "all")
+    assert metadata["vehicles"] == ["platoon.0", "platoon.1", background, "truck"]
+    assert rows['step'].tolist() == [2, 2, 2, 2, 4, 4, 4]
+    assert rows['platoon'].tolist() == [0, 0, -1, -1, 0, 0, -1]
+    assert rows['state'][rows['platoon'] == -1].tolist() == [0, 0, 0]
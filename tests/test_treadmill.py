@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+
+
+import random
+
+import ccparams as cc
+from Platoon import Platoon
+from Simulation import Simulation
+from SimulationContext import SimulationContext
+from Treadmill import Treadmill
+from .fake_sumo import install
+
+
+def make_traffic(sumo, context, add_vehicle):
+    sumo.lanes = 3
+    sumo.lane_length = 10000.0
+    context.platoon_manager.add_platoon(Platoon(n=2, pos=1000.0, lane=1, speed=30, context=context))
+    return [add_vehicle(0, 500.0, 30), add_vehicle(2, 900.0, 30), add_vehicle(0, 1400.0, 30)]
+
+
+def test_treadmill_moves_vehicles_left_behind_ahead_of_the_platoons(sumo, context, add_vehicle):
+    random.seed(1)
+    behind, alongside, ahead = make_traffic(sumo, context, add_vehicle)
+    # beyond the stretch ahead of the platoon which vehicles are recycled to
+    gone = add_vehicle(1, 1700.0, 45)
+    treadmill = Treadmill(context, distance_behind=200, distance_ahead=300, spread=300, speed_range=(25, 45))
+
+    treadmill.tick(0)
+
+    car = sumo.cars[behind]
+    assert 1300.0 <= car.position <= 1600.0
+    assert car.lane != 0 or abs(car.position - 1400.0) >= Treadmill.CLEARANCE
+    assert 25 <= car.speed <= 45
+    assert context.vehicle_manager.get_vehicle(behind).desired_speed == car.speed
+    assert car.parameters["carFollowModel." + cc.PAR_CC_DESIRED_SPEED] == str(car.speed)
+    # within reach of the platoon, so it stays where it is
+    assert (sumo.cars[alongside].lane, sumo.cars[alongside].position) == (2, 900.0)
+    assert (sumo.cars[ahead].lane, sumo.cars[ahead].position) == (0, 1400.0)
+    assert 1300.0 <= sumo.cars[gone].position <= 1600.0
+    assert treadmill.recycled == 2
+
+
+def test_treadmill_waits_for_the_interval_and_the_end_of_the_road(sumo, context, add_vehicle):
+    behind = make_traffic(sumo, context, add_vehicle)[0]
+    treadmill = Treadmill(context, interval=50)
+
+    treadmill.tick(1)
+    assert sumo.cars[behind].position == 500.0
+
+    # not even wrapping the platoons makes room ahead of them
+    treadmill.distance_ahead = 9600
+    treadmill.tick(50)
+    assert sumo.cars[behind].position == 500.0
+    assert sumo.cars["platoon.0"].position == 1000.0
+    assert treadmill.postponed == 1
+    assert treadmill.wraps == 0
+
+
+def test_treadmill_moves_the_platoons_back_before_the_end_of_the_edge(sumo, context, add_vehicle):
+    random.seed(1)
+    sumo.lanes = 3
+    sumo.lane_length = 10000.0
+    platoon = Platoon(n=2, pos=9500.0, lane=1, speed=30, context=context)
+    context.platoon_manager.add_platoon(platoon)
+    alongside = add_vehicle(2, 9400.0, 30)
+    behind = add_vehicle(0, 9000.0, 30)
+    treadmill = Treadmill(context, distance_behind=200, distance_ahead=300, spread=300)
+
+    treadmill.tick(0)
+
+    # the rear platoon member is moved to distance_behind, 9294 meters back
+    assert [(sumo.cars[vid].lane, sumo.cars[vid].position) for vid in platoon.vehicles] == [(1, 206.0), (1, 200.0)]
+    assert (sumo.cars[alongside].lane, sumo.cars[alongside].position) == (2, 106.0)
+    assert 506.0 <= sumo.cars[behind].position <= 806.0
+    assert (treadmill.wraps, treadmill.recycled, treadmill.postponed) == (1, 1, 0)
+
+
+def test_platoon_keeps_going_across_wraps(monkeypatch):
+    install(monkeypatch, lanes=3, lane_length=1500.0, step_length=0.1)
+    random.seed(1)
+    simulation = Simulation(platoon_run_distance=4000, context=SimulationContext(label="treadmill"), gui=False)
+    platoon = simulation.add_platoon(platoon_length=3, platoon_start_position=100, platoon_start_lane=1,
+                                     platoon_desired_speed=30)
+    for position in (300, 600, 900):
+        simulation.add_vehicle(vehicle_start_position=position, vehicle_start_lane=0, vehicle_start_speed=25)
+    treadmill = simulation.enable_treadmill(interval=10)
+    sumo = simulation.connection
+    steps = 0
+    while steps < 2000 and sumo.cars[platoon.vehicles[0]].distance < 4000:
+        simulation.simulate_step()
+        steps += 1
+        assert all(car.position < 1500.0 for car in sumo.cars.values())
+        gaps = [sumo.cars[front].position - sumo.cars[back].position
+                for front, back in zip(platoon.vehicles, platoon.vehicles[1:])]
+        assert all(0 < gap < 10 for gap in gaps)
+
+    assert sumo.cars[platoon.vehicles[0]].distance >= 4000
+    assert treadmill.wraps >= 2
+    assert len(sumo.cars) == 6
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2022 Abhishek Bharambe <abhishek.bharambe@sjsu.edu>
+# Copyright (c) 2022 Eugene Clewlow <eugene.clewlow@sjsu.edu>
+# Copyright (c) 2022 Kanak Kshirsagar <kanak.kshirsagar@sjsu.edu>
+# Copyright (c) 2022 Spoorthi Devanand <spoorthi.devanand@sjsu.edu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+import pytest
+
+from V2VSnapshot import V2VSnapshot
+
+
+def test_v2v_snapshot_iterates_like_response_list():
+    rows = [(20.0, 0.5, 0.4, 100.0, 5.0, 1.0), (25.0, 0.0, 0.0, 140.0, 8.2, 1.0)]
+    snapshot = V2VSnapshot(["v.0", "v.1"], rows)
+
+    assert len(snapshot) == 2
+    assert list(snapshot) == [("v.0",) + rows[0], ("v.1",) + rows[1]]
+
+
+def test_v2v_snapshot_find_by_gps_position():
+    snapshot = V2VSnapshot(["v.0", "v.1"], [(20, 0, 0, 100, 5, 1), (25, 0, 0, 140, 8.2, 1)])
+
+    assert snapshot.find(140.05, 8.2, 0.1) == "v.1"
+    assert snapshot.find(120, 5, 0.1) is None
+    assert V2VSnapshot([], []).find(0, 0, 0.1) is None
+
+
+def test_v2v_snapshot_is_immutable():
+    snapshot = V2VSnapshot(["v.0"], [(20, 0, 0, 100, 5, 1)])
+
+    with pytest.raises(AttributeError):
+        snapshot.x = None
+    with pytest.raises(ValueError):
+        snapshot.x[0] = 0